@@ -0,0 +1,472 @@
+""" Общие анализы грамматик, работающие за линейное время от размера грамматики.
+
+Функции принимают правила в том же виде, что и Grammar (main.py) и CFG (grammar.py):
+словарь "нетерминал -> список правых частей", где правая часть - любая
+итерируемая последовательность символов (строка, список строк или список Token).
+"""
+from collections import deque
+
+
+def productive_non_terminals(rules: dict, terminals) -> set:
+    """ Возвращает все хорошие (порождающие) нетерминалы за один проход по очереди """
+    # для каждого символа - номера правых частей, которые ждут, пока он станет хорошим
+    waiting = dict()
+
+    # сколько ещё не хороших символов осталось в каждой правой части
+    pending = []
+
+    # левая часть для каждой правой части
+    heads = []
+
+    productive = set()
+    queue = []
+
+    for rule_left_side in rules:
+        for rule_right_side in rules[rule_left_side]:
+            # пустая правая часть не считается хорошей (как и в is_contain_nn)
+            if not rule_right_side:
+                continue
+            production = len(pending)
+            heads.append(rule_left_side)
+            count = 0
+            for symbol in set(rule_right_side):
+                if symbol not in terminals:
+                    waiting.setdefault(symbol, []).append(production)
+                    count += 1
+            pending.append(count)
+
+            # правая часть из одних терминалов - левая часть сразу хорошая
+            if count == 0 and rule_left_side not in productive:
+                productive.add(rule_left_side)
+                queue.append(rule_left_side)
+
+    # распространяем "хорошесть" от уже найденных нетерминалов к правилам, которые их ждут
+    while queue:
+        symbol = queue.pop()
+        for production in waiting.get(symbol, ()):
+            pending[production] -= 1
+            if pending[production] == 0 and heads[production] not in productive:
+                productive.add(heads[production])
+                queue.append(heads[production])
+
+    return productive
+
+
+def reachable_symbols(rules: dict, axiom, terminals, non_terminals) -> tuple:
+    """ Возвращает пару (достижимые терминалы, достижимые нетерминалы) за один обход в ширину """
+    reachable_terminals = set()
+    reachable_non_terminals = {axiom}
+
+    # каждый нетерминал попадает в очередь (и его правила просматриваются) ровно один раз
+    queue = deque([axiom])
+    while queue:
+        rule_left_side = queue.popleft()
+        for rule_output in rules.get(rule_left_side, ()):
+            for symbol in rule_output:
+                if symbol in reachable_non_terminals or symbol in reachable_terminals:
+                    continue
+                if symbol in terminals:
+                    reachable_terminals.add(symbol)
+                if symbol in non_terminals:
+                    reachable_non_terminals.add(symbol)
+                    queue.append(symbol)
+
+    return reachable_terminals, reachable_non_terminals
+
+
+def strongly_connected_components(nodes, successors) -> list:
+    """ Компоненты сильной связности (алгоритм Тарьяна без рекурсии).
+    Компоненты возвращаются в обратном топологическом порядке: сначала те, из которых
+    никуда нельзя выйти; внутри компоненты - в порядке снятия со стека """
+    index = dict()
+    low_link = dict()
+    stack = []
+    on_stack = set()
+    components = []
+
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = low_link[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        # стек обхода в глубину: (вершина, итератор по её соседям)
+        work = [(root, iter(successors(root)))]
+        while work:
+            node, neighbours = work[-1]
+            for neighbour in neighbours:
+                if neighbour not in index:
+                    index[neighbour] = low_link[neighbour] = len(index)
+                    stack.append(neighbour)
+                    on_stack.add(neighbour)
+                    work.append((neighbour, iter(successors(neighbour))))
+                    break
+                if neighbour in on_stack:
+                    low_link[node] = min(low_link[node], index[neighbour])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low_link[parent] = min(low_link[parent], low_link[node])
+                if low_link[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def is_chain_rule(rule_output, non_terminals) -> bool:
+    """ Цепное правило - правая часть из одного нетерминала """
+    return len(rule_output) == 1 and rule_output[0] in non_terminals
+
+
+def chain_closure(rules: dict, nodes, non_terminals) -> dict:
+    """ Для каждого нетерминала из nodes - множество нетерминалов, выводимых из него цепными
+    правилами (включая его самого). Граф цепных правил строится один раз, его компоненты
+    сильной связности обходятся от стоков к истокам, так что замыкание компоненты - это её
+    нетерминалы и уже готовые замыкания соседей. У всех нетерминалов одной компоненты -
+    один и тот же объект frozenset """
+    def successors(non_terminal):
+        return [rule_output[0] for rule_output in rules.get(non_terminal, ())
+                if is_chain_rule(rule_output, non_terminals)]
+
+    closure = dict()
+    for component in strongly_connected_components(nodes, successors):
+        reachable = set(component)
+        for member in component:
+            for successor in successors(member):
+                # замыкание транзитивно: если сосед уже попал в множество, то и всё, что из него выводится
+                if successor not in reachable:
+                    reachable.update(closure[successor])
+        reachable = frozenset(reachable)
+        for member in component:
+            closure[member] = reachable
+    return closure
+
+
+class LeftRecursionPlan:
+    """ План устранения левой рекурсии, посчитанный до каких-либо подстановок.
+    components - леворекурсивные компоненты (нетерминалы, между которыми есть цикл по левым углам),
+    каждая - в порядке обработки; predicted_rules - число правил результата (точное: так же, как
+    eliminate_left_recursion, учитываются выброшенные правила A -> A, а повторы правил не схлопываются) """
+    __slots__ = ('components', 'predicted_rules')
+
+    def __init__(self, components: list, predicted_rules: int):
+        self.components = components
+        self.predicted_rules = predicted_rules
+
+    def __repr__(self):
+        return 'LeftRecursionPlan(components={components!r}, predicted_rules={predicted_rules!r})'.format(
+            components=self.components, predicted_rules=self.predicted_rules)
+
+
+def left_recursion_plan(rules: dict) -> LeftRecursionPlan:
+    """ Подстановки нужны только внутри компонент сильной связности графа левых углов, в которых
+    есть цикл: в остальные нетерминалы ничего не подставляется. Порядок внутри компоненты -
+    жадный (greedy_left_recursion_order) или исходный, если с ним предсказано меньше правил.
+    Размер считается по началам правил: подстановка и устранение прямой рекурсии зависят
+    только от первого символа правой части и от того, нет ли после него других символов """
+    def left_corners(non_terminal):
+        for rule_output in rules[non_terminal]:
+            if rule_output and rule_output[0] in rules:
+                yield rule_output[0]
+
+    position = {non_terminal: index for index, non_terminal in enumerate(rules)}
+    components = []
+    predicted_rules = 0
+    for component in strongly_connected_components(rules, left_corners):
+        if len(component) == 1 and component[0] not in set(left_corners(component[0])):
+            predicted_rules += len(rules[component[0]])
+            continue
+        members = set(component)
+        # сколько правил нетерминала начинается с каждого нетерминала компоненты (None - с чего-то другого);
+        # ключ - (начало, состоит ли правило из одного этого нетерминала)
+        heads = dict()
+        for non_terminal in component:
+            counts = heads[non_terminal] = dict()
+            for rule_output in rules[non_terminal]:
+                head = (rule_output[0], len(rule_output) == 1) if rule_output and rule_output[0] in members \
+                    else (None, False)
+                counts[head] = counts.get(head, 0) + 1
+
+        # жадный порядок сравнивается с исходным порядком нетерминалов, берётся меньший
+        greedy_order = greedy_left_recursion_order(component, heads, position)
+        given_order = sorted(component, key=position.__getitem__)
+        size, order = min((component_size(greedy_order, heads), greedy_order),
+                          (component_size(given_order, heads), given_order), key=lambda pair: pair[0])
+        predicted_rules += size
+        components.append(order)
+    return LeftRecursionPlan(components, predicted_rules)
+
+
+def greedy_left_recursion_order(component: list, heads: dict, position: dict) -> list:
+    """ Следующим берётся нетерминал, для которого меньше всего правил получится у него самого
+    и у ещё не обработанных нетерминалов, правила которых с него начинаются """
+    heads = dict(heads)
+    order = []
+    remaining = sorted(component, key=position.__getitem__)
+    while remaining:
+        best = None
+        for candidate in remaining:
+            counts, new_rules = eliminate_heads(candidate, heads, order)
+            size = sum(counts.values())
+            references = sum(heads[other].get((candidate, unit), 0)
+                             for other in remaining if other != candidate for unit in (False, True))
+            cost = size + new_rules + references * (size - 1)
+            if best is None or cost < best[0]:
+                best = (cost, candidate, counts)
+        cost, candidate, heads[candidate] = best
+        order.append(candidate)
+        remaining.remove(candidate)
+    return order
+
+
+def component_size(order: list, heads: dict) -> int:
+    """ Предсказанное число правил компоненты (вместе с новыми нетерминалами) при порядке order """
+    heads = dict(heads)
+    size = 0
+    for index, non_terminal in enumerate(order):
+        heads[non_terminal], new_rules = eliminate_heads(non_terminal, heads, order[:index])
+        size += sum(heads[non_terminal].values()) + new_rules
+    return size
+
+
+def eliminate_heads(non_terminal, heads: dict, processed: list) -> tuple:
+    """ Начала правил нетерминала после подстановки уже обработанных нетерминалов и устранения
+    прямой рекурсии, и число правил нового нетерминала со штрихом """
+    counts = dict(heads[non_terminal])
+    for earlier in processed:
+        for unit in (False, True):
+            count = counts.pop((earlier, unit), 0)
+            if count:
+                # A -> B даёт ровно правые части B, A -> B a - правила длиннее одного символа
+                for (head, head_unit), number in heads[earlier].items():
+                    key = (head, head_unit and unit)
+                    counts[key] = counts.get(key, 0) + count * number
+    # правила A -> A выбрасываются
+    counts.pop((non_terminal, True), None)
+    recursive = counts.pop((non_terminal, False), 0)
+    if not recursive:
+        return counts, 0
+    # A -> b | bA', A' -> a | aA'
+    doubled = dict()
+    for (head, unit), count in counts.items():
+        doubled[(head, unit)] = doubled.get((head, unit), 0) + count
+        doubled[(head, False)] = doubled.get((head, False), 0) + count
+    return doubled, 2 * recursive
+
+
+def eliminate_left_recursion(rules: dict, plan: LeftRecursionPlan, new_non_terminal) -> dict:
+    """ Новые правила (правые части - кортежи) нетерминалов леворекурсивных компонент плана
+    и созданных нетерминалов со штрихом; правила остальных нетерминалов не меняются.
+    new_non_terminal(нетерминал) заводит в грамматике новый нетерминал и возвращает его """
+    new_rules = dict()
+    created = dict()
+    for component in plan.components:
+        for index, non_terminal in enumerate(component):
+            rule_outputs = [tuple(rule_output) for rule_output in rules[non_terminal]]
+            # A -> B a, где B обработан раньше, заменяется на A -> b a для каждого B -> b
+            for earlier in component[:index]:
+                substituted = []
+                for rule_output in rule_outputs:
+                    if rule_output and rule_output[0] == earlier:
+                        substituted.extend(prefix + rule_output[1:] for prefix in new_rules[earlier])
+                    else:
+                        substituted.append(rule_output)
+                rule_outputs = substituted
+
+            # прямая рекурсия A -> A a | b заменяется на A -> b | bA', A' -> a | aA'
+            recursive = [rule_output[1:] for rule_output in rule_outputs
+                         if rule_output and rule_output[0] == non_terminal]
+            if recursive:
+                rule_outputs = [rule_output for rule_output in rule_outputs
+                                if not (rule_output and rule_output[0] == non_terminal)]
+                # правило A -> A ничего не порождает, его достаточно выбросить
+                recursive = [rule_output for rule_output in recursive if rule_output]
+            if recursive:
+                new = new_non_terminal(non_terminal)
+                rule_outputs = [variant for rule_output in rule_outputs
+                                for variant in (rule_output, rule_output + (new,))]
+                created[new] = [variant for rule_output in recursive
+                                for variant in (rule_output, rule_output + (new,))]
+            new_rules[non_terminal] = rule_outputs
+    new_rules.update(created)
+    return new_rules
+
+
+# бит конца входа во FOLLOW (номер следует за всеми терминалами)
+END_OF_INPUT = '$'
+
+
+class FirstFollow:
+    """ Множества nullable, FIRST и FOLLOW всех нетерминалов.
+    FIRST и FOLLOW хранятся битовыми масками: бит i - терминал terminals[i],
+    бит len(terminals) во FOLLOW - конец входа """
+
+    def __init__(self, rules: dict, axiom, terminals, non_terminals):
+        self.terminals = sorted(terminals)
+        self.terminal_bits = {terminal: 1 << index for index, terminal in enumerate(self.terminals)}
+        self.end_bit = 1 << len(self.terminals)
+        self.non_terminals = set(non_terminals)
+
+        # правые части без символов пустой цепочки (пустая лексема в CFG)
+        self.rules = {rule_left_side: [[symbol for symbol in rule_output
+                                        if symbol in self.terminal_bits or symbol in self.non_terminals]
+                                       for rule_output in rule_outputs]
+                      for rule_left_side, rule_outputs in rules.items()}
+
+        self.nullable = self.compute_nullable()
+        self.first = self.compute_first()
+        self.follow = self.compute_follow(axiom)
+
+    def compute_nullable(self) -> set:
+        """ Та же очередь со счётчиками, что и в productive_non_terminals """
+        waiting = dict()
+        pending = []
+        heads = []
+        nullable = set()
+        queue = []
+        for rule_left_side, rule_outputs in self.rules.items():
+            for rule_output in rule_outputs:
+                if any(symbol in self.terminal_bits for symbol in rule_output):
+                    continue
+                production = len(pending)
+                heads.append(rule_left_side)
+                pending.append(len(rule_output))
+                for symbol in rule_output:
+                    waiting.setdefault(symbol, []).append(production)
+                if not rule_output and rule_left_side not in nullable:
+                    nullable.add(rule_left_side)
+                    queue.append(rule_left_side)
+
+        while queue:
+            symbol = queue.pop()
+            for production in waiting.get(symbol, ()):
+                pending[production] -= 1
+                if pending[production] == 0 and heads[production] not in nullable:
+                    nullable.add(heads[production])
+                    queue.append(heads[production])
+        return nullable
+
+    def first_prefix(self, rule_output):
+        """ Символы правой части до первого необнуляемого включительно """
+        for symbol in rule_output:
+            yield symbol
+            if symbol not in self.nullable:
+                return
+
+    def compute_first(self) -> dict:
+        first = {non_terminal: 0 for non_terminal in self.non_terminals}
+
+        def depends_on(non_terminal):
+            for rule_output in self.rules.get(non_terminal, ()):
+                for symbol in self.first_prefix(rule_output):
+                    if symbol in self.non_terminals:
+                        yield symbol
+
+        # компоненты идут так, что всё, от чего зависит компонента, уже посчитано;
+        # неподвижная точка нужна только внутри компоненты
+        for component in strongly_connected_components(sorted(self.non_terminals), depends_on):
+            changed = True
+            while changed:
+                changed = False
+                for non_terminal in component:
+                    bits = first[non_terminal]
+                    for rule_output in self.rules.get(non_terminal, ()):
+                        for symbol in self.first_prefix(rule_output):
+                            bits |= self.terminal_bits.get(symbol) or first[symbol]
+                    if bits != first[non_terminal]:
+                        first[non_terminal] = bits
+                        changed = len(component) > 1
+        return first
+
+    def first_of(self, symbols) -> tuple:
+        """ Пара (FIRST цепочки символов маской, обнуляема ли цепочка) """
+        bits = 0
+        for symbol in symbols:
+            if symbol in self.terminal_bits:
+                return bits | self.terminal_bits[symbol], False
+            if symbol in self.non_terminals:
+                bits |= self.first[symbol]
+                if symbol not in self.nullable:
+                    return bits, False
+        return bits, True
+
+    def compute_follow(self, axiom) -> dict:
+        follow = {non_terminal: 0 for non_terminal in self.non_terminals}
+        follow[axiom] = self.end_bit
+
+        # FOLLOW(B) получает FIRST(бета) для каждого A -> альфа B бета сразу,
+        # а FOLLOW(A) - если бета обнуляема; такие A и есть зависимости B
+        inherits = {non_terminal: set() for non_terminal in self.non_terminals}
+        for rule_left_side, rule_outputs in self.rules.items():
+            for rule_output in rule_outputs:
+                # FIRST и обнуляемость суффиксов считаются справа налево
+                suffix_bits, suffix_nullable = 0, True
+                for symbol in reversed(rule_output):
+                    if symbol in self.non_terminals:
+                        follow[symbol] |= suffix_bits
+                        if suffix_nullable and symbol != rule_left_side:
+                            inherits[symbol].add(rule_left_side)
+                        if symbol in self.nullable:
+                            suffix_bits |= self.first[symbol]
+                        else:
+                            suffix_bits, suffix_nullable = self.first[symbol], False
+                    else:
+                        suffix_bits, suffix_nullable = self.terminal_bits[symbol], False
+
+        for component in strongly_connected_components(sorted(self.non_terminals),
+                                                       lambda non_terminal: sorted(inherits[non_terminal])):
+            changed = True
+            while changed:
+                changed = False
+                for non_terminal in component:
+                    bits = follow[non_terminal]
+                    for parent in inherits[non_terminal]:
+                        bits |= follow[parent]
+                    if bits != follow[non_terminal]:
+                        follow[non_terminal] = bits
+                        changed = len(component) > 1
+        return follow
+
+    def terminals_of(self, bits: int) -> set:
+        """ Множество терминалов (и END_OF_INPUT) по маске """
+        result = {terminal for terminal, bit in self.terminal_bits.items() if bits & bit}
+        if bits & self.end_bit:
+            result.add(END_OF_INPUT)
+        return result
+
+    def first_set(self, non_terminal) -> set:
+        return self.terminals_of(self.first[non_terminal])
+
+    def follow_set(self, non_terminal) -> set:
+        return self.terminals_of(self.follow[non_terminal])
+
+
+class AnalysisCache:
+    """ Результаты анализов грамматики для одной версии её содержимого (watched.Version).
+    При смене версии все результаты выбрасываются. Результаты нельзя изменять:
+    методы грамматик отдают наружу копии """
+
+    def __init__(self):
+        self.version = None
+        self.results = dict()
+
+    def get(self, version: int, name: str, compute):
+        if version != self.version:
+            self.version = version
+            self.results = dict()
+        if name not in self.results:
+            self.results[name] = compute()
+        return self.results[name]
+
+    def inherit(self, other, other_version: int, version: int):
+        """ Забирает результаты другой грамматики с тем же содержимым (например, копии) """
+        if other.version == other_version:
+            self.version = version
+            self.results = dict(other.results)
@@ -0,0 +1,84 @@
+""" Пакетная проверка принадлежности слов языку грамматики в нескольких процессах.
+
+Грамматика один раз компилируется в распознаватель (CYKRecognizer для Grammar в нормальной
+форме Хомского, иначе EarleyParser). Распознаватель передаётся каждому процессу один раз
+при его запуске, а дальше процессам отправляются только пачки слов. Результаты отдаются
+генератором в порядке входных слов; одновременно в работе держится не больше
+2 * workers пачек, так что вход может быть сколь угодно длинным потоком.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from cyk import CYKRecognizer
+from earley import EarleyParser
+from main import Grammar
+
+# распознаватель, полученный процессом-исполнителем при запуске
+_worker_recognizer = None
+
+
+def compile_grammar(grammar):
+    """ Распознаватель с методом accepts(word), который можно передать в другой процесс """
+    if isinstance(grammar, Grammar):
+        try:
+            return CYKRecognizer(grammar)
+        except ValueError:
+            # грамматика не в нормальной форме Хомского
+            pass
+    return EarleyParser(grammar)
+
+
+def _init_worker(recognizer):
+    global _worker_recognizer
+    _worker_recognizer = recognizer
+
+
+def _check_chunk(words: list) -> list:
+    return [_worker_recognizer.accepts(word) for word in words]
+
+
+def chunks(words, chunk_size: int):
+    words = iter(words)
+    while True:
+        chunk = list(islice(words, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BatchRecognizer:
+    def __init__(self, grammar, workers: int = None, chunk_size: int = 1000):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        self.recognizer = compile_grammar(grammar)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            initializer=_init_worker, initargs=(self.recognizer,))
+
+    def accepts(self, words):
+        """ Генератор флагов принадлежности языку в порядке слов """
+        in_flight = deque()
+        for chunk in chunks(words, self.chunk_size):
+            in_flight.append(self.executor.submit(_check_chunk, chunk))
+            if len(in_flight) >= 2 * self.workers:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def accepts_all(grammar, words, workers: int = None, chunk_size: int = 1000):
+    """ Проверяет поток слов на принадлежность языку грамматики, результаты - по порядку """
+    with BatchRecognizer(grammar, workers, chunk_size) as batch:
+        yield from batch.accepts(words)
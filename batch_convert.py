@@ -0,0 +1,182 @@
+""" Пакетное преобразование файлов с грамматиками в нескольких процессах.
+
+    python batch_convert.py cnf grammars/ extra.bnf -o normalized/ --workers 8 --timeout 60
+
+Входы - файлы и каталоги (каталоги обходятся рекурсивно). Файл с грамматикой - текст BNF
+(bnf.py) или двоичный файл grammar_file.py (узнаётся по сигнатуре). Каждый файл - отдельное
+задание в пуле процессов; задание ограничено по времени таймером signal внутри процесса-
+исполнителя, так что зависшее преобразование не останавливает остальные. Результаты
+пишутся в выходной каталог по мере готовности (с той же структурой подкаталогов),
+а в конце туда же пишется summary.json со временем и размером результата для каждого файла.
+Если имя результата совпадает с уже занятым другим входом, файл не преобразуется (ошибка в сводке).
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import bnf
+import grammar_file
+from compact import CompactGrammar
+from conversion_cache import TRANSFORMATIONS, ConversionCache
+
+# целевая форма -> преобразование из conversion_cache.TRANSFORMATIONS
+TARGETS = {
+    'useless-free': 'remove_useless_symbols',
+    'chain-free': 'remove_chain_rules',
+    'left-recursion-free': 'remove_left_recursion',
+    'cnf': 'algorithm_chomsky',
+    'gnf': 'greibach',
+}
+
+# расширение результата для каждого формата вывода
+FORMATS = {'bnf': '.bnf', 'binary': '.grm'}
+
+SUMMARY_FILE = 'summary.json'
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signal_number, frame):
+    raise JobTimeout()
+
+
+def is_binary_grammar(path: str) -> bool:
+    with open(path, 'rb') as file:
+        return file.read(len(grammar_file.FILE_MAGIC)) == grammar_file.FILE_MAGIC
+
+
+def load(path: str):
+    """ Grammar (main.py) из файла любого из двух форматов """
+    if is_binary_grammar(path):
+        return grammar_file.load_grammar(path)
+    with open(path, encoding='utf-8') as file:
+        return bnf.read_grammar(file)
+
+
+def save(grammar, path: str, output_format: str):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if output_format == 'binary':
+        grammar_file.save(grammar, path)
+    else:
+        with open(path, 'w', encoding='utf-8') as file:
+            bnf.write_bnf(grammar, file)
+
+
+def convert_file(input_path: str, output_path: str, transformation: str, timeout: float = None,
+                 output_format: str = 'bnf', cache_directory: str = None) -> dict:
+    """ Одно задание: загрузить, преобразовать, записать. Ошибки и таймаут попадают в отчёт """
+    result = {'input': input_path, 'output': None, 'status': 'ok'}
+    start = time.perf_counter()
+    if timeout:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        grammar = load(input_path)
+        result['rules_before'] = CompactGrammar.from_any(grammar).production_count()
+        if cache_directory:
+            converted = ConversionCache(cache_directory).convert(grammar, transformation)
+        else:
+            converted = TRANSFORMATIONS[transformation](grammar)
+        if converted is None:
+            # remove_useless_symbols для пустого языка
+            result['status'] = 'empty'
+        else:
+            result['rules_after'] = CompactGrammar.from_any(converted).production_count()
+            save(converted, output_path, output_format)
+            result['output'] = output_path
+            result['output_bytes'] = os.path.getsize(output_path)
+    except JobTimeout:
+        result['status'] = 'timeout'
+    except Exception as error:
+        result['status'] = 'error'
+        result['error'] = type(error).__name__ + ': ' + str(error)
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+    result['wall_time'] = time.perf_counter() - start
+    return result
+
+
+def grammar_files(inputs):
+    """ Пары (путь к файлу, путь относительно своего входа) """
+    for path in inputs:
+        if os.path.isdir(path):
+            for directory, subdirectories, file_names in os.walk(path):
+                subdirectories[:] = sorted(name for name in subdirectories if not name.startswith('.'))
+                for file_name in sorted(file_names):
+                    if not file_name.startswith('.'):
+                        file_path = os.path.join(directory, file_name)
+                        yield file_path, os.path.relpath(file_path, path)
+        else:
+            yield path, os.path.basename(path)
+
+
+def convert_all(inputs, output_directory: str, target: str, workers: int = None, timeout: float = None,
+                output_format: str = 'bnf', cache_directory: str = None) -> dict:
+    """ Преобразует все файлы и возвращает (и пишет в summary.json) сводку """
+    transformation = TARGETS[target]
+    os.makedirs(output_directory, exist_ok=True)
+    start = time.perf_counter()
+    results = []
+    # выходной файл -> вход, который в него пишет: у одноимённых входов из разных мест
+    # (a/x.bnf и b/x.bnf, x.bnf и x.grm) выход один и тот же, и второй не преобразуется
+    outputs = dict()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        futures = dict()
+        for input_path, relative_path in grammar_files(inputs):
+            output_path = os.path.join(output_directory, os.path.splitext(relative_path)[0] + FORMATS[output_format])
+            key = os.path.normcase(os.path.normpath(output_path))
+            if key in outputs:
+                results.append({'input': input_path, 'output': None, 'status': 'error',
+                                'error': 'output ' + output_path + ' is already written for ' + outputs[key]})
+                continue
+            outputs[key] = input_path
+            future = executor.submit(convert_file, input_path, output_path, transformation, timeout,
+                                     output_format, cache_directory)
+            futures[future] = input_path
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as error:
+                # процесс-исполнитель упал (например, кончилась память)
+                results.append({'input': futures[future], 'output': None, 'status': 'error',
+                                'error': type(error).__name__ + ': ' + str(error)})
+
+    results.sort(key=lambda result: result['input'])
+    statuses = dict()
+    for result in results:
+        statuses[result['status']] = statuses.get(result['status'], 0) + 1
+    summary = {'target': target, 'transformation': transformation, 'timeout': timeout,
+               'wall_time': time.perf_counter() - start, 'statuses': statuses, 'files': results}
+    with open(os.path.join(output_directory, SUMMARY_FILE), 'w', encoding='utf-8') as file:
+        json.dump(summary, file, indent=2)
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('target', choices=sorted(TARGETS))
+    parser.add_argument('inputs', nargs='+', help='grammar files or directories')
+    parser.add_argument('-o', '--output', required=True, help='output directory')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--timeout', type=float, default=None, help='seconds per file')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='bnf')
+    parser.add_argument('--cache', help='conversion cache directory')
+    arguments = parser.parse_args(argv)
+
+    summary = convert_all(arguments.inputs, arguments.output, arguments.target, arguments.workers,
+                          arguments.timeout, arguments.format, arguments.cache)
+    print(', '.join('{count} {status}'.format(count=count, status=status)
+                    for status, count in sorted(summary['statuses'].items())))
+    return 0 if set(summary['statuses']) <= {'ok'} else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
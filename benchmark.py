@@ -0,0 +1,147 @@
+""" Замеры скорости преобразований грамматик на случайных грамматиках растущего размера.
+
+    python benchmark.py --sizes 4 8 16 --seed 1 --left-recursion 0.3 --unit-rules 0.2
+
+Для каждого размера генерируется грамматика (одна и та же при одном seed), и на ней
+запускаются remove_useless_symbols, remove_chain_rules, remove_left_recursion,
+algorithm_chomsky и Greibach.convert. Для каждого запуска в JSON пишутся время,
+пиковая память (tracemalloc, отдельным прогоном, чтобы не искажать время)
+и число правил до и после.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from itertools import islice
+
+from conversion_cache import TRANSFORMATIONS
+from greibach import util
+from main import Grammar
+
+BENCHMARKED = ('remove_useless_symbols', 'remove_chain_rules', 'remove_left_recursion',
+               'algorithm_chomsky', 'greibach')
+
+AXIOM = 'S'
+
+
+def random_grammar(seed: int, non_terminal_count: int, rhs_length: int = 3, rules_per_non_terminal: int = 3,
+                   terminal_count: int = 3, left_recursion_density: float = 0.0,
+                   unit_rule_density: float = 0.0) -> Grammar:
+    """ Случайная грамматика Grammar (main.py) с аксиомой S.
+    left_recursion_density - доля правил, начинающихся с нетерминала не позже левой части
+    (сама левая часть или нетерминал перед ней - прямая и косвенная левая рекурсия),
+    unit_rule_density - доля цепных правил A -> B. Первое правило каждого нетерминала
+    начинается с терминала, чтобы у рекурсии был выход """
+    generator = random.Random(seed)
+    names = (name for name in util.indexed_non_terminals(Grammar.var) if name != AXIOM)
+    non_terminals = [AXIOM] + list(islice(names, non_terminal_count - 1))
+    terminals = list(Grammar.term[:terminal_count])
+
+    rules = dict()
+    for index, non_terminal in enumerate(non_terminals):
+        bodies = dict()
+        for rule_number in range(rules_per_non_terminal):
+            length = generator.randint(1, rhs_length)
+            body = [generator.choice(non_terminals + terminals) for _ in range(length)]
+            if rule_number == 0:
+                body[0] = generator.choice(terminals)
+            elif generator.random() < unit_rule_density:
+                body = [generator.choice(non_terminals)]
+            elif generator.random() < left_recursion_density:
+                body[0] = generator.choice(non_terminals[:index + 1])
+            bodies[tuple(body)] = None
+        # многосимвольные имена (A1, B2...) Grammar принимает только в правых частях-списках
+        rules[non_terminal] = [list(body) if any(len(symbol) > 1 for symbol in body) else ''.join(body)
+                               for body in bodies]
+    return Grammar(set(non_terminals), set(terminals), rules, AXIOM)
+
+
+def single_char_grammar(grammar: Grammar) -> Grammar:
+    """ Та же грамматика с односимвольными нетерминалами (их требует модель greibach) """
+    free = (name for name in util.single_char_non_terminals() if name not in (AXIOM, '$'))
+    renaming = {non_terminal: (non_terminal if non_terminal == AXIOM else next(free))
+                for non_terminal in sorted(grammar.non_terminals)}
+    rules = {renaming[non_terminal]: [''.join(renaming.get(symbol, symbol) for symbol in tokens(grammar, rule_output))
+                                      for rule_output in rule_outputs]
+             for non_terminal, rule_outputs in grammar.rules.items()}
+    return Grammar(set(renaming.values()), set(grammar.terminals), rules, renaming[grammar.axiom])
+
+
+def tokens(grammar: Grammar, rule_output) -> list:
+    return rule_output if isinstance(rule_output, list) else grammar.tokenize(rule_output)
+
+
+def rule_count(grammar) -> int:
+    if grammar is None:
+        return 0
+    if isinstance(grammar.rules, dict):
+        return sum(len(rule_outputs) for rule_outputs in grammar.rules.values())
+    return len(grammar.rules)
+
+
+def measure(transformation: str, grammar, memory: bool = True) -> dict:
+    function = TRANSFORMATIONS[transformation]
+    if transformation == 'greibach':
+        grammar = single_char_grammar(grammar)
+    result = {'transformation': transformation, 'rules_before': rule_count(grammar)}
+    try:
+        start = time.perf_counter()
+        output = function(grammar)
+        result['wall_time'] = time.perf_counter() - start
+        result['rules_after'] = rule_count(output)
+        if memory:
+            tracemalloc.start()
+            try:
+                function(grammar)
+                result['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    except Exception as error:
+        result['error'] = type(error).__name__ + ': ' + str(error)
+    return result
+
+
+def run_benchmark(sizes, seed: int = 0, memory: bool = True, transformations=BENCHMARKED, **parameters) -> dict:
+    """ Результаты для всех размеров в виде, готовом для json.dumps """
+    results = []
+    for size in sizes:
+        grammar = random_grammar(seed, size, **parameters)
+        for transformation in transformations:
+            result = measure(transformation, grammar, memory)
+            result['non_terminals'] = size
+            results.append(result)
+    return {'seed': seed, 'parameters': parameters, 'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rhs-length', type=int, default=3)
+    parser.add_argument('--rules-per-non-terminal', type=int, default=3)
+    parser.add_argument('--terminals', type=int, default=3)
+    parser.add_argument('--left-recursion', type=float, default=0.2)
+    parser.add_argument('--unit-rules', type=float, default=0.1)
+    parser.add_argument('--transformations', nargs='+', choices=BENCHMARKED, default=list(BENCHMARKED))
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    arguments = parser.parse_args(argv)
+
+    report = run_benchmark(arguments.sizes, arguments.seed, not arguments.no_memory, arguments.transformations,
+                           rhs_length=arguments.rhs_length,
+                           rules_per_non_terminal=arguments.rules_per_non_terminal,
+                           terminal_count=arguments.terminals,
+                           left_recursion_density=arguments.left_recursion,
+                           unit_rule_density=arguments.unit_rules)
+    text = json.dumps(report, indent=2)
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,298 @@
+""" Потоковое чтение и запись грамматик в текстовом виде BNF/EBNF.
+
+    expr ::= expr "+" term | term
+    term ::= <term item> { "*" <term item> }
+    <term item> ::= "(" expr ")" | "a"
+            | ""                       # пустая цепочка: "" или ε
+
+Нетерминал - идентификатор (буквы, цифры, _, ') или любое имя в угловых скобках,
+терминал - строка в двойных или одинарных кавычках (\\ экранирует символ), # - комментарий.
+Правило начинается строкой "имя ::=" и продолжается следующими строками до следующего правила.
+Аксиома - левая часть первого правила.
+EBNF: [ x ] - необязательная часть, { x } - повторение, ( x | y ) - группа; для каждой
+конструкции заводится вспомогательный нетерминал с именем левой части и штрихами (expr', expr'', ...).
+
+BNFReader - генератор правил: текст читается построчно, в памяти лежит только текущая строка,
+а грамматика сразу укладывается в массивы CompactGrammar. write_bnf пишет в файл по одной
+строке на правило. Поэтому и чтение, и запись грамматики из сотен тысяч правил не требуют
+держать в памяти её текст.
+"""
+import re
+from array import array
+
+from compact import CFG_EPSILON, GREIBACH_EPSILON, CompactGrammar, symbol_name
+
+EMPTY = 'ε'
+DEFINES = '::='
+
+TOKEN = re.compile(r'''\s*(?:
+    (?P<name><(?:[^>\\]|\\.)*>|[^\W\d]['\w]*) |
+    (?P<terminal>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*') |
+    (?P<operator>::=|[|\[\]{}()]) |
+    (?P<comment>\#.*) |
+    (?P<error>\S)
+)''', re.VERBOSE)
+
+ESCAPED = re.compile(r'\\(.)')
+
+IDENTIFIER = re.compile(r"[^\W\d][\'\w]*\Z")
+
+# закрывающая скобка для каждой открывающей
+CLOSING = {'[': ']', '{': '}', '(': ')'}
+
+# внутри BNFReader терминал - пара (TERMINAL, имя), нетерминал - само имя:
+# терминал "S" и нетерминал S - разные символы
+TERMINAL = 'terminal'
+
+
+class BNFSyntaxError(ValueError):
+    def __init__(self, message: str, line_number: int):
+        super().__init__('line {line_number}: {message}'.format(line_number=line_number, message=message))
+        self.line_number = line_number
+
+
+def tokenize(line: str, line_number: int):
+    """ Лексемы строки: пары (вид, значение), вид - 'name', 'terminal', 'empty' или сама операция """
+    position = 0
+    while True:
+        match = TOKEN.match(line, position)
+        if match is None or match.end() == position:
+            return
+        position = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'comment':
+            return
+        if kind == 'error':
+            raise BNFSyntaxError('unexpected ' + repr(text), line_number)
+        if kind == 'name':
+            if text == EMPTY:
+                yield 'empty', EMPTY
+            else:
+                yield 'name', ESCAPED.sub(r'\1', text[1:-1]) if text.startswith('<') else text
+        elif kind == 'terminal':
+            text = ESCAPED.sub(r'\1', text[1:-1])
+            yield ('terminal', text) if text else ('empty', EMPTY)
+        else:
+            yield text, text
+
+
+class BNFReader:
+    """ for lhs, rhs in BNFReader(file) - правила по одному (rhs - кортеж имён символов).
+    Множества non_terminals и terminals (имена) заполняются по мере чтения.
+    symbols() - те же правила, но терминалы в них - пары (TERMINAL, имя) """
+
+    def __init__(self, file):
+        self.file = file
+        self.axiom = None
+        self.non_terminals = set()
+        self.terminals = set()
+        # имена вспомогательных нетерминалов EBNF
+        self.generated = set()
+        # одинаковые имена - один объект str на всю грамматику
+        self.names = dict()
+
+    def __iter__(self):
+        for lhs, rhs in self.symbols():
+            # кортеж из списка сразу нужного размера: кортеж из генератора растёт перевыделением,
+            # и освобождённые кортежи копятся в кеше свободных кортежей интерпретатора
+            yield lhs, tuple([symbol if isinstance(symbol, str) else symbol[1] for symbol in rhs])
+
+    def intern(self, name: str) -> str:
+        return self.names.setdefault(name, name)
+
+    def intern_terminal(self, name: str) -> tuple:
+        key = (TERMINAL, name)
+        return self.names.setdefault(key, key)
+
+    def fresh_non_terminal(self, base: str) -> str:
+        name = base + '\''
+        while name in self.non_terminals or name in self.terminals:
+            name += '\''
+        self.generated.add(name)
+        self.non_terminals.add(name)
+        return self.intern(name)
+
+    def symbols(self):
+        # стек открытых конструкций: [нетерминал, вид скобки, символы текущей альтернативы]
+        stack = []
+        line_number = 0
+        for line_number, line in enumerate(self.file, 1):
+            tokens = list(tokenize(line, line_number))
+            if len(tokens) >= 2 and tokens[0][0] == 'name' and tokens[1][0] == DEFINES:
+                if stack:
+                    yield from self.close_rule(stack, line_number)
+                lhs = self.intern(tokens[0][1])
+                if lhs in self.generated:
+                    raise BNFSyntaxError(repr(lhs) + ' clashes with a generated EBNF non-terminal', line_number)
+                self.non_terminals.add(lhs)
+                if self.axiom is None:
+                    self.axiom = lhs
+                stack.append([lhs, None, []])
+                tokens = tokens[2:]
+            elif tokens and not stack:
+                raise BNFSyntaxError('expected "name ::="', line_number)
+
+            for kind, value in tokens:
+                symbols = stack[-1][2]
+                if kind == 'name':
+                    value = self.intern(value)
+                    self.non_terminals.add(value)
+                    symbols.append(value)
+                elif kind == 'terminal':
+                    self.terminals.add(value)
+                    symbols.append(self.intern_terminal(value))
+                elif kind == '|':
+                    yield self.alternative(stack[-1])
+                    stack[-1][2] = []
+                elif kind in CLOSING:
+                    stack.append([self.fresh_non_terminal(stack[0][0]), kind, []])
+                elif kind in (']', '}', ')'):
+                    if len(stack) == 1 or CLOSING[stack[-1][1]] != kind:
+                        raise BNFSyntaxError('unbalanced ' + repr(kind), line_number)
+                    yield from self.close_group(stack)
+                elif kind == DEFINES:
+                    raise BNFSyntaxError('unexpected "::="', line_number)
+        if stack:
+            yield from self.close_rule(stack, line_number)
+
+    @staticmethod
+    def alternative(frame):
+        non_terminal, bracket, symbols = frame
+        if bracket == '{':
+            # X' ::= x X' | ε
+            symbols = symbols + [non_terminal]
+        return non_terminal, tuple(symbols)
+
+    def close_group(self, stack):
+        frame = stack.pop()
+        yield self.alternative(frame)
+        if frame[1] in '[{':
+            yield frame[0], ()
+        stack[-1][2].append(frame[0])
+
+    def close_rule(self, stack, line_number: int):
+        if len(stack) > 1:
+            raise BNFSyntaxError('unclosed ' + repr(stack[-1][1]), line_number)
+        yield self.alternative(stack.pop())
+
+
+def read_compact(file) -> CompactGrammar:
+    """ Читает грамматику сразу в массивы CompactGrammar """
+    reader = BNFReader(file)
+    # временные номера символов в порядке появления
+    ids = dict()
+    # правые части каждого нетерминала подряд: длина, затем символы
+    bodies = dict()
+    for lhs, rhs in reader.symbols():
+        body = bodies.get(lhs)
+        if body is None:
+            body = bodies[lhs] = array('i')
+        body.append(len(rhs))
+        body.extend(ids.setdefault(symbol, len(ids)) for symbol in rhs)
+    if reader.axiom is None:
+        raise ValueError('The grammar has no rules.')
+
+    symbols = list(bodies) + sorted(reader.non_terminals.difference(bodies))
+    non_terminal_count = len(symbols)
+    symbols.extend(sorted(reader.terminals))
+    new_ids = {symbol: index for index, symbol in enumerate(symbols[:non_terminal_count])}
+    new_ids.update(((TERMINAL, symbol), index) for index, symbol in enumerate(symbols)
+                   if index >= non_terminal_count)
+    remap = array('i', [0]) * len(ids)
+    for symbol, index in ids.items():
+        remap[index] = new_ids[symbol]
+
+    rule_offsets = array('i', [0])
+    rhs_offsets = array('i', [0])
+    rhs = array('i')
+    for non_terminal in symbols[:non_terminal_count]:
+        body = bodies.pop(non_terminal, ())
+        position = 0
+        while position < len(body):
+            length = body[position]
+            rhs.extend(remap[symbol] for symbol in body[position + 1:position + 1 + length])
+            rhs_offsets.append(len(rhs))
+            position += length + 1
+        rule_offsets.append(len(rhs_offsets) - 1)
+    return CompactGrammar(symbols, non_terminal_count, new_ids[reader.axiom], rule_offsets, rhs_offsets, rhs)
+
+
+def read_grammar(file):
+    """ Grammar (main.py); правые части с многосимвольными именами становятся списками """
+    return read_compact(file).to_grammar()
+
+
+def read_cfg(file):
+    return read_compact(file).to_cfg()
+
+
+def read_greibach(file):
+    return read_compact(file).to_greibach()
+
+
+# ---------- запись ----------
+
+def productions(grammar):
+    """ Пары (левая часть, список пар (имя, терминал ли) правой части) любой модели без промежуточных
+    копий. Терминал это или нет, решает сам символ, а не имя: у CompactGrammar - номер символа,
+    у CFG - Token """
+    if isinstance(grammar, CompactGrammar):
+        for non_terminal in range(grammar.non_terminal_count):
+            for production in grammar.productions_of(non_terminal):
+                yield grammar.name(non_terminal), [(grammar.name(symbol), grammar.is_terminal(symbol))
+                                                   for symbol in grammar.rhs_of(production)]
+    elif hasattr(grammar, 'start_symbol'):
+        for rule in grammar.rules:
+            yield rule.lhs, [] if rule.rhs == GREIBACH_EPSILON else \
+                [(symbol, symbol not in grammar.non_terminals) for symbol in rule.rhs]
+    else:
+        for rule_left_side, rule_outputs in grammar.rules.items():
+            for rule_output in rule_outputs:
+                yield symbol_name(rule_left_side), [(symbol_name(symbol), symbol not in grammar.non_terminals)
+                                                    for symbol in rule_output
+                                                    if symbol_name(symbol) != CFG_EPSILON]
+
+
+def axiom_name(grammar) -> str:
+    if isinstance(grammar, CompactGrammar):
+        return grammar.name(grammar.axiom)
+    if hasattr(grammar, 'start_symbol'):
+        return grammar.start_symbol
+    return symbol_name(grammar.axiom)
+
+
+def format_non_terminal(name: str) -> str:
+    if IDENTIFIER.match(name) and name != EMPTY:
+        return name
+    return '<' + name.replace('\\', '\\\\').replace('>', '\\>') + '>'
+
+
+def format_terminal(name: str) -> str:
+    return '"' + name.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def write_bnf(grammar, file):
+    """ Пишет правила в файл по одному: первая альтернатива - "lhs ::= ...", следующие правила
+    того же нетерминала - строками "| ...". Первым идёт нетерминал-аксиома """
+    axiom = axiom_name(grammar)
+
+    def write(productions, axiom_rules: bool):
+        previous = None
+        indent = ''
+        for lhs, rhs in productions:
+            if (lhs == axiom) != axiom_rules:
+                continue
+            body = ' '.join(format_terminal(symbol) if terminal else format_non_terminal(symbol)
+                            for symbol, terminal in rhs) or '""'
+            if lhs == previous:
+                file.write(indent + '| ' + body + '\n')
+            else:
+                head = format_non_terminal(lhs) + ' ' + DEFINES + ' '
+                indent = ' ' * (len(head) - 2)
+                file.write(head + body + '\n')
+                previous = lhs
+
+    # аксиома - левая часть первого правила: её правила пишутся первыми
+    write(productions(grammar), axiom_rules=True)
+    write(productions(grammar), axiom_rules=False)
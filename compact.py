@@ -0,0 +1,324 @@
+""" Компактное представление КС-грамматики на массивах целых чисел.
+
+Символы интернируются в плотные номера: сначала нетерминалы (0 .. non_terminal_count - 1),
+затем терминалы. Правые части всех правил лежат подряд в одном array('i') rhs,
+правило p занимает rhs[rhs_offsets[p]:rhs_offsets[p + 1]]. Правила сгруппированы
+по левой части: правила нетерминала A - это номера rule_offsets[A] .. rule_offsets[A + 1] - 1.
+Пустая правая часть - это лямбда-правило.
+
+Умеет строиться из Grammar (main.py), CFG (grammar.py) и Grammar из greibach
+и превращаться обратно в любую из них.
+
+Известное ограничение: на 5000 нетерминалах и 100 тыс. правил массивы занимают примерно
+в 6-7 раз меньше словаря списков (1.6 МБ против 10.8 МБ), а не на порядок: каждый символ
+правой части - 4 байта int32, и каждое правило - ещё 4 байта смещения. Список символов
+с именами добавляет к этому ещё около 0.7 МБ.
+"""
+from array import array
+from bisect import bisect_right
+
+# пустой символ в моделях, где пустая правая часть записывается явно
+CFG_EPSILON = ''
+GREIBACH_EPSILON = 'ε'
+
+
+def symbol_name(symbol) -> str:
+    """ Имя символа: лексема для Token, сама строка для остальных моделей """
+    return getattr(symbol, 'lexem', symbol)
+
+
+class CompactGrammar:
+    def __init__(self, symbols: list, non_terminal_count: int, axiom: int,
+                 rule_offsets: array, rhs_offsets: array, rhs: array, defined: bytearray = None):
+        # символы по номерам (str или Token - в зависимости от того, откуда пришла грамматика)
+        self.symbols = symbols
+        self.non_terminal_count = non_terminal_count
+        self.axiom = axiom
+
+        self.rule_offsets = rule_offsets
+        self.rhs_offsets = rhs_offsets
+        self.rhs = rhs
+
+        # у каких нетерминалов в исходной грамматике был ключ в словаре правил
+        # (нужно, чтобы обратное преобразование вернуло тот же словарь)
+        if defined is None:
+            defined = bytearray(1 if rule_offsets[a] != rule_offsets[a + 1] else 0
+                                for a in range(non_terminal_count))
+        self.defined = defined
+
+    # ---------- построение ----------
+
+    @classmethod
+    def from_productions(cls, axiom, non_terminals, terminals, productions, defined=()):
+        """ Строит грамматику из итерируемых пар (левая часть, последовательность символов правой части).
+        Порядок нетерминалов: сначала defined (ключи словаря правил), затем в порядке
+        первого появления левых частей, затем остальные """
+        non_terminal_ids = dict()
+        bodies = []
+        for rule_left_side in defined:
+            non_terminal_ids[rule_left_side] = len(bodies)
+            bodies.append([])
+        for rule_left_side, rule_right_side in productions:
+            if rule_left_side not in non_terminal_ids:
+                non_terminal_ids[rule_left_side] = len(bodies)
+                bodies.append([])
+            bodies[non_terminal_ids[rule_left_side]].append(tuple(rule_right_side))
+        defined_count = len(bodies)
+
+        for non_terminal in sorted(set(non_terminals) | {axiom}, key=symbol_name):
+            if non_terminal not in non_terminal_ids:
+                non_terminal_ids[non_terminal] = len(non_terminal_ids)
+                bodies.append([])
+
+        symbols = list(non_terminal_ids)
+        non_terminal_count = len(symbols)
+        symbols.extend(sorted((t for t in set(terminals) if t not in non_terminal_ids), key=symbol_name))
+        ids = {symbol: index for index, symbol in enumerate(symbols)}
+
+        rule_offsets = array('i', [0])
+        rhs_offsets = array('i', [0])
+        rhs = array('i')
+        for rule_right_sides in bodies:
+            for rule_right_side in rule_right_sides:
+                for symbol in rule_right_side:
+                    if symbol not in ids:
+                        raise Exception("At least one symbol from the right side of the " +
+                                        "rules is not in symbols of grammar.")
+                    rhs.append(ids[symbol])
+                rhs_offsets.append(len(rhs))
+            rule_offsets.append(len(rhs_offsets) - 1)
+
+        defined = bytearray(1 if a < defined_count else 0 for a in range(non_terminal_count))
+        return cls(symbols, non_terminal_count, ids[axiom], rule_offsets, rhs_offsets, rhs, defined)
+
+    @classmethod
+    def from_grammar(cls, grammar):
+        """ Из Grammar (main.py): правые части - строки или списки строк, '' - пустая цепочка """
+        productions = ((rule_left_side, rule_right_side)
+                       for rule_left_side in grammar.rules
+                       for rule_right_side in grammar.rules[rule_left_side])
+        return cls.from_productions(grammar.axiom, grammar.non_terminals, grammar.terminals, productions,
+                                    grammar.rules)
+
+    @classmethod
+    def from_cfg(cls, grammar):
+        """ Из CFG (grammar.py): правые части - списки Token, [Token('')] - пустая цепочка """
+        productions = ((rule_left_side, [token for token in rule_right_side if token.lexem != CFG_EPSILON])
+                       for rule_left_side in grammar.rules
+                       for rule_right_side in grammar.rules[rule_left_side])
+        return cls.from_productions(grammar.axiom, grammar.non_terminals, grammar.terminals, productions,
+                                    grammar.rules)
+
+    @classmethod
+    def from_greibach(cls, grammar):
+        """ Из Grammar (greibach): список Rule со строковыми частями, 'ε' - пустая цепочка """
+        productions = [(rule.lhs, '' if rule.rhs == GREIBACH_EPSILON else rule.rhs) for rule in grammar.rules]
+        # в greibach терминалом считается только строчная буква, остальные символы правых частей
+        # (скобки, знаки операций) в grammar.terminals не попадают
+        terminals = {symbol for _, rule_right_side in productions for symbol in rule_right_side
+                     if symbol not in grammar.non_terminals}
+        return cls.from_productions(grammar.start_symbol, grammar.non_terminals, terminals, productions)
+
+    @classmethod
+    def from_any(cls, grammar):
+        """ Из любой из трёх моделей (или уже компактной грамматики) """
+        if isinstance(grammar, cls):
+            return grammar
+        if hasattr(grammar, 'start_symbol'):
+            return cls.from_greibach(grammar)
+        if hasattr(grammar, 'token_constructor'):
+            return cls.from_cfg(grammar)
+        return cls.from_grammar(grammar)
+
+    # ---------- доступ ----------
+
+    def is_terminal(self, symbol: int) -> bool:
+        return symbol >= self.non_terminal_count
+
+    def production_count(self) -> int:
+        return len(self.rhs_offsets) - 1
+
+    def productions_of(self, non_terminal: int) -> range:
+        return range(self.rule_offsets[non_terminal], self.rule_offsets[non_terminal + 1])
+
+    def lhs_of(self, production: int) -> int:
+        """ Левая часть правила - двоичный поиск по rule_offsets (отдельный массив левых частей
+        не хранится: он был бы размером с rhs_offsets) """
+        return bisect_right(self.rule_offsets, production) - 1
+
+    def rhs_of(self, production: int) -> array:
+        return self.rhs[self.rhs_offsets[production]:self.rhs_offsets[production + 1]]
+
+    def name(self, symbol: int) -> str:
+        return symbol_name(self.symbols[symbol])
+
+    def memory_size(self) -> int:
+        """ Размер массивов с правилами в байтах """
+        return sum(a.itemsize * len(a) for a in (self.rule_offsets, self.rhs_offsets, self.rhs)) \
+            + len(self.defined)
+
+    # ---------- анализы на массивах ----------
+
+    def productive(self, with_empty: bool = False) -> bytearray:
+        """ Флаги хороших нетерминалов (та же очередь со счётчиками, что и в analysis.py).
+        Как и там, пустое правило по умолчанию не делает нетерминал хорошим; with_empty
+        считает порождающими и нетерминалы, выводящие только пустую цепочку """
+        productive = bytearray(self.non_terminal_count)
+        pending = array('i', [0]) * self.production_count()
+        waiting = [[] for _ in range(self.non_terminal_count)]
+        queue = []
+        for non_terminal in range(self.non_terminal_count):
+            for production in self.productions_of(non_terminal):
+                body = self.rhs_of(production)
+                if not body and not with_empty:
+                    continue
+                non_terminals = {symbol for symbol in body if symbol < self.non_terminal_count}
+                for symbol in non_terminals:
+                    waiting[symbol].append(production)
+                pending[production] = len(non_terminals)
+                if not non_terminals and not productive[non_terminal]:
+                    productive[non_terminal] = 1
+                    queue.append(non_terminal)
+
+        while queue:
+            symbol = queue.pop()
+            for production in waiting[symbol]:
+                pending[production] -= 1
+                if pending[production] == 0:
+                    lhs = self.lhs_of(production)
+                    if not productive[lhs]:
+                        productive[lhs] = 1
+                        queue.append(lhs)
+        return productive
+
+    def nullable(self) -> bytearray:
+        """ Флаги нетерминалов, из которых выводится пустая цепочка """
+        nullable = bytearray(self.non_terminal_count)
+        pending = array('i', [0]) * self.production_count()
+        waiting = [[] for _ in range(self.non_terminal_count)]
+        queue = []
+        for non_terminal in range(self.non_terminal_count):
+            for production in self.productions_of(non_terminal):
+                body = self.rhs_of(production)
+                # правило с терминалом никогда не даст пустую цепочку
+                if any(symbol >= self.non_terminal_count for symbol in body):
+                    pending[production] = -1
+                    continue
+                for symbol in body:
+                    waiting[symbol].append(production)
+                pending[production] = len(body)
+                if not body and not nullable[non_terminal]:
+                    nullable[non_terminal] = 1
+                    queue.append(non_terminal)
+
+        while queue:
+            symbol = queue.pop()
+            for production in waiting[symbol]:
+                pending[production] -= 1
+                if pending[production] == 0:
+                    lhs = self.lhs_of(production)
+                    if not nullable[lhs]:
+                        nullable[lhs] = 1
+                        queue.append(lhs)
+        return nullable
+
+    def reachable(self) -> bytearray:
+        """ Флаги достижимых из аксиомы символов (терминалов и нетерминалов) """
+        reachable = bytearray(len(self.symbols))
+        reachable[self.axiom] = 1
+        queue = [self.axiom]
+        while queue:
+            non_terminal = queue.pop()
+            start, end = self.rhs_offsets[self.rule_offsets[non_terminal]], \
+                self.rhs_offsets[self.rule_offsets[non_terminal + 1]]
+            for symbol in self.rhs[start:end]:
+                if not reachable[symbol]:
+                    reachable[symbol] = 1
+                    if symbol < self.non_terminal_count:
+                        queue.append(symbol)
+        return reachable
+
+    # ---------- обратные преобразования ----------
+
+    def check_names(self):
+        """ В остальных моделях символ - это имя, и терминал с именем нетерминала слился бы с ним """
+        non_terminals = {self.name(symbol) for symbol in range(self.non_terminal_count)}
+        for symbol in range(self.non_terminal_count, len(self.symbols)):
+            if self.name(symbol) in non_terminals:
+                raise ValueError("Terminal " + repr(self.name(symbol)) + " has the name of a non-terminal.")
+
+    def _rules(self, convert_rhs) -> dict:
+        """ Словарь правил с номерами нетерминалов в качестве ключей """
+        rules = dict()
+        for non_terminal in range(self.non_terminal_count):
+            if self.defined[non_terminal]:
+                rules[non_terminal] = [convert_rhs(self.rhs_of(production))
+                                                    for production in self.productions_of(non_terminal)]
+        return rules
+
+    def to_grammar(self, list_rhs: bytearray = None):
+        """ В Grammar (main.py): правая часть - строка, если все символы односимвольные, иначе список.
+        list_rhs (флаг на каждое правило) задаёт вид правых частей явно """
+        from main import Grammar
+        self.check_names()
+        productions = iter(range(self.production_count()))
+
+        def convert_rhs(body):
+            names = [self.name(symbol) for symbol in body]
+            production = next(productions)
+            if list_rhs is not None:
+                return names if list_rhs[production] else ''.join(names)
+            return ''.join(names) if all(len(name) == 1 for name in names) else names
+
+        non_terminals = {self.name(symbol) for symbol in range(self.non_terminal_count)}
+        terminals = {self.name(symbol) for symbol in range(self.non_terminal_count, len(self.symbols))}
+        rules = {self.name(key): value for key, value in self._rules(convert_rhs).items()}
+        return Grammar(non_terminals, terminals, rules, self.name(self.axiom))
+
+    def to_cfg(self):
+        """ В CFG (grammar.py): символы становятся Token (или остаются ими) """
+        from grammar import CFG, Token
+        self.check_names()
+
+        def token(symbol):
+            symbol = self.symbols[symbol]
+            return symbol if isinstance(symbol, Token) else Token(symbol, 'char')
+
+        def convert_rhs(body):
+            return [token(symbol) for symbol in body] or [Token(CFG_EPSILON, 'char')]
+
+        axiom = token(self.axiom)
+        grammar = CFG({axiom.lexem}, set(), {}, axiom.lexem)
+        grammar.non_terminals = {token(symbol) for symbol in range(self.non_terminal_count)}
+        grammar.terminals = {token(symbol) for symbol in range(self.non_terminal_count, len(self.symbols))}
+        grammar.rules = {token(key): value for key, value in self._rules(convert_rhs).items()}
+        grammar.axiom = axiom
+        return grammar
+
+    def to_greibach(self):
+        """ В Grammar (greibach): там символы односимвольные, 'ε' - пустая цепочка,
+        а начальным символом всегда считается S (или $, если он есть). Поэтому аксиома
+        с другим именем меняется именами с S """
+        from greibach.Grammar import Grammar
+        from greibach.util import is_non_terminal, is_terminal
+        self.check_names()
+        names = [self.name(symbol) for symbol in range(len(self.symbols))]
+        # символ другого вида (знак операции, скобка) greibach не отличил бы от части правила
+        for symbol, name in enumerate(names):
+            if len(name) != 1 or not (is_terminal(name) if self.is_terminal(symbol) else is_non_terminal(name)) \
+                    or name == GREIBACH_EPSILON:
+                raise ValueError("greibach.Grammar supports only single-character symbols: capital letters "
+                                 "for non-terminals and lowercase letters for terminals, not " + repr(name) + ".")
+        start_symbol = '$' if '$' in names[:self.non_terminal_count] else 'S'
+        if names[self.axiom] != start_symbol:
+            if start_symbol in names:
+                names[names.index(start_symbol)] = names[self.axiom]
+            names[self.axiom] = start_symbol
+
+        rules = []
+        for non_terminal in range(self.non_terminal_count):
+            right_sides = [''.join(names[symbol] for symbol in self.rhs_of(production)) or GREIBACH_EPSILON
+                           for production in self.productions_of(non_terminal)]
+            if right_sides:
+                rules.append({"lhs": names[non_terminal], "rhs": right_sides})
+        return Grammar(rules)
@@ -0,0 +1,209 @@
+""" Дисковый кеш результатов преобразований грамматик.
+
+Ключ записи - (отпечаток грамматики, имя преобразования, версия библиотеки).
+Отпечаток не зависит от порядка правил и символов: правила сортируются, символы берутся
+по именам (лексемам). Версия библиотеки - хеш исходных файлов, поэтому любое изменение
+алгоритмов делает старые записи недоступными (их вытеснит LRU).
+
+Результат хранится в компактном виде: CompactGrammar (массивы целых чисел), сжатый zlib.
+Файлы, к которым давно не обращались, удаляются, когда общий размер кеша превышает лимит
+(время последнего обращения - mtime файла).
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import zlib
+
+from compact import CompactGrammar, symbol_name
+
+ENTRY_SUFFIX = '.grammar'
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_library_version = None
+
+
+def library_version() -> str:
+    """ Хеш исходных файлов библиотеки (без тестов), считается один раз за процесс """
+    global _library_version
+    if _library_version is None:
+        root = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        for directory in (root, os.path.join(root, 'greibach')):
+            for file_name in sorted(os.listdir(directory)):
+                if file_name.endswith('.py') and not file_name.startswith('test_'):
+                    digest.update(file_name.encode('utf-8') + b'\0')
+                    with open(os.path.join(directory, file_name), 'rb') as file:
+                        digest.update(file.read())
+        _library_version = digest.hexdigest()
+    return _library_version
+
+
+def grammar_kind(grammar) -> str:
+    if hasattr(grammar, 'start_symbol'):
+        return 'greibach'
+    if hasattr(grammar, 'token_constructor'):
+        return 'cfg'
+    return 'grammar'
+
+
+def fingerprint(grammar) -> str:
+    """ Хеш содержимого грамматики, не зависящий от порядка правил и символов """
+    compact = CompactGrammar.from_any(grammar)
+    rules = sorted((compact.name(compact.lhs_of(production)),
+                    tuple(compact.name(symbol) for symbol in compact.rhs_of(production)))
+                   for production in range(compact.production_count()))
+    content = (grammar_kind(grammar),
+               compact.name(compact.axiom),
+               sorted(compact.name(symbol) for symbol in range(compact.non_terminal_count)),
+               sorted(compact.name(symbol) for symbol in range(compact.non_terminal_count, len(compact.symbols))),
+               rules)
+    return hashlib.sha256(repr(content).encode('utf-8')).hexdigest()
+
+
+# ---------- преобразования ----------
+
+def to_chomsky(grammar):
+    """ algorithm_chomsky есть только у Grammar (main.py), поэтому CFG переводится в неё и обратно,
+    а его символы остаются прежними Token (новые нетерминалы получают тип 'char') """
+    kind = grammar_kind(grammar)
+    if kind == 'grammar':
+        new_grammar = grammar.copy()
+        new_grammar.algorithm_chomsky()
+        return new_grammar
+    if kind != 'cfg':
+        raise ValueError("algorithm_chomsky is not available for grammars of kind " + repr(kind) + ".")
+
+    compact = CompactGrammar.from_cfg(grammar)
+    # правые части - списки, чтобы имена из нескольких символов не разбирались заново
+    new_grammar = compact.to_grammar(bytearray([1]) * compact.production_count())
+    new_grammar.algorithm_chomsky()
+    result = CompactGrammar.from_grammar(new_grammar)
+    tokens = {symbol_name(symbol): symbol for symbol in compact.symbols}
+    result.symbols = [tokens.get(name, name) for name in result.symbols]
+    return result.to_cfg()
+
+
+def to_greibach(grammar):
+    """ Greibach меняет переданную грамматику, поэтому работает на её копии в модели greibach.
+    Там символы - одна буква (заглавная - нетерминал, строчная - терминал), а начальный символ - S,
+    поэтому грамматика другой модели переименовывается в такие буквы, а результат возвращается
+    в её же модель с прежними именами; новые нетерминалы получают имена A, B, ..., A1, ... """
+    from greibach.Greibach import Greibach
+    from greibach.util import FreshSymbols, indexed_non_terminals, single_char_non_terminals, single_char_terminals
+    compact = CompactGrammar.from_any(grammar)
+    kind = grammar_kind(grammar)
+    if kind == 'greibach':
+        return Greibach(compact.to_greibach()).convert()
+    compact.check_names()
+
+    non_terminal_letters = (letter for letter in single_char_non_terminals() if letter != 'S')
+    terminal_letters = single_char_terminals()
+    letters = ['S' if symbol == compact.axiom else next(non_terminal_letters)
+               for symbol in range(compact.non_terminal_count)]
+    letters.extend(next(terminal_letters) for _ in range(compact.non_terminal_count, len(compact.symbols)))
+    renamed = CompactGrammar(letters, compact.non_terminal_count, compact.axiom,
+                             compact.rule_offsets, compact.rhs_offsets, compact.rhs, compact.defined)
+    converted = CompactGrammar.from_greibach(Greibach(renamed.to_greibach()).convert())
+
+    originals = dict(zip(letters, compact.symbols))
+    fresh_names = FreshSymbols(indexed_non_terminals())
+    used = {compact.name(symbol) for symbol in range(len(compact.symbols))}
+    converted.symbols = [originals[letter] if letter in originals else fresh_names.allocate(used)
+                         for letter in converted.symbols]
+    return converted.to_grammar() if kind == 'grammar' else converted.to_cfg()
+
+
+# имя преобразования -> функция, которая не меняет исходную грамматику
+TRANSFORMATIONS = {
+    'remove_useless_symbols': lambda grammar: grammar.remove_useless_symbols(),
+    'remove_chain_rules': lambda grammar: grammar.remove_chain_rules(),
+    'remove_left_recursion': lambda grammar: grammar.remove_left_recursion(),
+    'algorithm_chomsky': to_chomsky,
+    'greibach': to_greibach,
+}
+
+
+def dump_grammar(grammar) -> bytes:
+    kind = grammar_kind(grammar)
+    # в Grammar (main.py) правая часть бывает и строкой, и списком - запоминаем, чем именно
+    list_rhs = bytearray(isinstance(rule_output, list)
+                         for rule_outputs in grammar.rules.values() for rule_output in rule_outputs) \
+        if kind == 'grammar' else None
+    return zlib.compress(pickle.dumps((kind, CompactGrammar.from_any(grammar), list_rhs)))
+
+
+def load_grammar(data: bytes):
+    kind, compact, list_rhs = pickle.loads(zlib.decompress(data))
+    if kind == 'grammar':
+        return compact.to_grammar(list_rhs)
+    if kind == 'cfg':
+        return compact.to_cfg()
+    return compact.to_greibach()
+
+
+class ConversionCache:
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, grammar, transformation: str) -> str:
+        key = '\0'.join((fingerprint(grammar), transformation, library_version()))
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + ENTRY_SUFFIX)
+
+    def get(self, grammar, transformation: str):
+        """ Сохранённый результат преобразования или None """
+        path = self.path(grammar, transformation)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+        # отмечаем обращение для LRU
+        os.utime(path)
+        return load_grammar(data)
+
+    def put(self, grammar, transformation: str, result):
+        path = self.path(grammar, transformation)
+        handle, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as file:
+            file.write(dump_grammar(result))
+        # запись атомарна: параллельный читатель видит либо старый файл, либо новый целиком
+        os.replace(temporary_path, path)
+        self.evict()
+
+    def convert(self, grammar, transformation: str):
+        """ Результат преобразования из кеша, а при промахе - посчитанный и сохранённый """
+        result = self.get(grammar, transformation)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = TRANSFORMATIONS[transformation](grammar)
+        if result is not None:
+            self.put(grammar, transformation, result)
+        return result
+
+    def size(self) -> int:
+        return sum(entry.stat().st_size for entry in self.entries())
+
+    def entries(self) -> list:
+        return [entry for entry in os.scandir(self.directory)
+                if entry.is_file() and entry.name.endswith(ENTRY_SUFFIX)]
+
+    def evict(self):
+        """ Удаляет самые давно использованные записи, пока кеш больше лимита """
+        entries = sorted(self.entries(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            total -= entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
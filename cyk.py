@@ -0,0 +1,88 @@
+""" Алгоритм Кока-Янгера-Касами (CYK) для грамматик в нормальной форме Хомского.
+
+Строится по результату Grammar.algorithm_chomsky (main.py). Таблица хранится "по столбцам":
+для каждой длины подцепочки и каждого нетерминала A - одно целое число, у которого бит i
+установлен, если A выводит word[i:i + длина]. Тогда правило A -> BC для всех начальных
+позиций сразу проверяется одной операцией над битовыми масками:
+
+    table[l][A] |= table[k][B] & (table[l - k][C] >> k)
+
+и внутренний цикл по позициям выполняется внутри длинной арифметики Python, а не в байт-коде.
+"""
+
+
+class CYKRecognizer:
+    def __init__(self, grammar):
+        # номера нетерминалов
+        self.ids = dict()
+        for non_terminal in list(grammar.rules) + sorted(grammar.non_terminals):
+            self.ids.setdefault(non_terminal, len(self.ids))
+        self.axiom = self.ids.setdefault(grammar.axiom, len(self.ids))
+
+        # терминал -> нетерминалы, которые его выводят (A -> a)
+        self.terminal_rules = dict()
+
+        # B -> [(C, [A, ...])] для правил A -> BC
+        self.pair_rules = dict()
+
+        self.accepts_empty = False
+
+        # грамматика не в НФХ (цепное правило, терминал в правиле длины 2, пустое правило не у аксиомы
+        # или у аксиомы, которая встречается в правых частях) отвергается: разбирать её будет Earley
+        pairs = dict()
+        for rule_left_side, rule_outputs in grammar.rules.items():
+            left = self.ids[rule_left_side]
+            for rule_output in rule_outputs:
+                symbols = grammar.tokenize(rule_output) if isinstance(rule_output, str) and rule_output \
+                    else list(rule_output)
+                if not symbols:
+                    if left != self.axiom:
+                        raise ValueError("Grammar is not in Chomsky normal form: "
+                                         + rule_left_side + " derives the empty string.")
+                    self.accepts_empty = True
+                elif len(symbols) == 1 and symbols[0] not in self.ids:
+                    self.terminal_rules.setdefault(symbols[0], []).append(left)
+                elif len(symbols) == 2 and all(symbol in self.ids for symbol in symbols):
+                    pairs.setdefault((self.ids[symbols[0]], self.ids[symbols[1]]), []).append(left)
+                else:
+                    raise ValueError("Grammar is not in Chomsky normal form: "
+                                     + rule_left_side + " -> " + ''.join(symbols))
+
+        if self.accepts_empty and any(self.axiom in (first, second) for first, second in pairs):
+            raise ValueError("Grammar is not in Chomsky normal form: "
+                             + grammar.axiom + " derives the empty string and occurs on a right side.")
+
+        for (first, second), lefts in pairs.items():
+            self.pair_rules.setdefault(first, []).append((second, lefts))
+
+    def accepts(self, word) -> bool:
+        """ Проверяет, выводится ли слово (строка или список терминалов) из аксиомы """
+        length = len(word)
+        if length == 0:
+            return self.accepts_empty
+
+        # table[l] - словарь "нетерминал -> маска начальных позиций" для подцепочек длины l
+        table = [None, dict()]
+        for position, terminal in enumerate(word):
+            if terminal not in self.terminal_rules:
+                return False
+            bit = 1 << position
+            for left in self.terminal_rules[terminal]:
+                table[1][left] = table[1].get(left, 0) | bit
+
+        for span in range(2, length + 1):
+            cells = dict()
+            for split in range(1, span):
+                right_cells = table[span - split]
+                for first, first_positions in table[split].items():
+                    for second, lefts in self.pair_rules.get(first, ()):
+                        second_positions = right_cells.get(second)
+                        if second_positions is None:
+                            continue
+                        positions = first_positions & (second_positions >> split)
+                        if positions:
+                            for left in lefts:
+                                cells[left] = cells.get(left, 0) | positions
+            table.append(cells)
+
+        return bool(table[length].get(self.axiom, 0) & 1)
@@ -0,0 +1,312 @@
+""" Алгоритм Эрли для произвольной КС-грамматики без предварительной нормализации.
+
+Работает прямо с CFG (grammar.py), Grammar (main.py) или CompactGrammar: допускаются
+лямбда-правила, цепные правила и левая рекурсия. Пустые правила обрабатываются по
+Эйкоку-Хорспулу: при предсказании обнуляемого нетерминала точка сразу переносится через него.
+
+Ситуация (item) - пара (позиция точки, номер множества-начала). Позиция точки - это один номер
+на всю грамматику: у правила p с правой частью длины k позиции rhs_offsets[p] + p .. rhs_offsets[p] + p + k.
+Каждое множество Эрли хранит словарь ситуаций (он же убирает дубликаты) и индекс
+"символ после точки -> ситуации", по которому работают сканер и завершитель.
+"""
+from array import array
+
+from compact import CompactGrammar
+
+# после точки ничего нет - правило разобрано
+COMPLETE = -1
+
+
+class EarleySet:
+    __slots__ = ('items', 'agenda', 'waiting', 'predicted')
+
+    def __init__(self):
+        # ситуация -> обратная ссылка для построения дерева (или None)
+        self.items = dict()
+        # ситуации в порядке добавления, ещё не обработанные предсказателем/завершителем
+        self.agenda = []
+        # символ после точки -> ситуации этого множества
+        self.waiting = dict()
+        # нетерминалы, уже предсказанные в этом множестве
+        self.predicted = set()
+
+
+class EarleyParser:
+    def __init__(self, grammar):
+        self.grammar = CompactGrammar.from_any(grammar)
+        compact = self.grammar
+
+        # для каждой позиции точки: символ после неё, левая часть и номер правила
+        self.next_symbol = array('i')
+        self.dot_lhs = array('i')
+        self.dot_production = array('i')
+        # позиции точки в начале правил каждого нетерминала (индекс предсказаний)
+        self.prediction = [[] for _ in range(compact.non_terminal_count)]
+        for non_terminal in range(compact.non_terminal_count):
+            for production in compact.productions_of(non_terminal):
+                self.prediction[non_terminal].append(len(self.next_symbol))
+                body = compact.rhs_of(production)
+                for symbol in body:
+                    self.next_symbol.append(symbol)
+                self.next_symbol.append(COMPLETE)
+                self.dot_lhs.extend([non_terminal] * (len(body) + 1))
+                self.dot_production.extend([production] * (len(body) + 1))
+
+        self.nullable = compact.nullable()
+        self.terminal_ids = {compact.name(symbol): symbol
+                             for symbol in range(compact.non_terminal_count, len(compact.symbols))}
+
+    # ---------- основной цикл ----------
+
+    def add(self, earley_set: EarleySet, item: tuple, back):
+        if item not in earley_set.items:
+            earley_set.items[item] = back
+            earley_set.agenda.append(item)
+
+    def process(self, chart: dict, position: int):
+        """ Предсказатель и завершитель для множества chart[position] до неподвижной точки """
+        earley_set = chart[position]
+        agenda = earley_set.agenda
+        index = 0
+        while index < len(agenda):
+            item = agenda[index]
+            index += 1
+            dot, origin = item
+            symbol = self.next_symbol[dot]
+
+            if symbol == COMPLETE:
+                lhs = self.dot_lhs[dot]
+                for waiting_dot, waiting_origin in chart[origin].waiting.get(lhs, ()):
+                    self.add(earley_set, (waiting_dot + 1, waiting_origin), (origin, item))
+                continue
+
+            earley_set.waiting.setdefault(symbol, []).append(item)
+            if symbol < self.grammar.non_terminal_count:
+                if symbol not in earley_set.predicted:
+                    earley_set.predicted.add(symbol)
+                    for start in self.prediction[symbol]:
+                        self.add(earley_set, (start, position), None)
+                if self.nullable[symbol]:
+                    self.add(earley_set, (dot + 1, origin), (position, symbol))
+        earley_set.agenda = []
+
+    def scan(self, chart: dict, position: int, terminal: int) -> EarleySet:
+        """ Сканер: переносит точку через терминал, создаёт множество position + 1 """
+        next_set = EarleySet()
+        for dot, origin in chart[position].waiting.get(terminal, ()):
+            self.add(next_set, (dot + 1, origin), (position, terminal))
+        chart[position + 1] = next_set
+        return next_set
+
+    def start(self) -> dict:
+        chart = {0: EarleySet()}
+        for start in self.prediction[self.grammar.axiom]:
+            self.add(chart[0], (start, 0), None)
+        chart[0].predicted.add(self.grammar.axiom)
+        self.process(chart, 0)
+        return chart
+
+    def is_accepting(self, earley_set: EarleySet) -> bool:
+        """ Есть ли в множестве разобранное правило аксиомы, начатое с нуля """
+        return any(origin == 0 and self.next_symbol[dot] == COMPLETE and self.dot_lhs[dot] == self.grammar.axiom
+                   for dot, origin in earley_set.items)
+
+    def run(self, word, keep_items: bool = True) -> dict:
+        """ Строит множества Эрли для слова. Без keep_items словари ситуаций обработанных
+        множеств выбрасываются: завершителю нужны только индексы waiting """
+        chart = self.start()
+        for position, terminal in enumerate(word):
+            terminal = self.terminal_ids.get(terminal)
+            if terminal is None:
+                return chart
+            next_set = self.scan(chart, position, terminal)
+            if not keep_items:
+                chart[position].items = None
+            if not next_set.items:
+                return chart
+            self.process(chart, position + 1)
+        return chart
+
+    # ---------- интерфейс ----------
+
+    def recognize(self, word) -> bool:
+        """ Выводится ли слово (строка или последовательность терминалов) из аксиомы """
+        chart = self.run(word, keep_items=False)
+        return len(word) in chart and self.is_accepting(chart[len(word)])
+
+    # тот же интерфейс, что у CYKRecognizer
+    accepts = recognize
+
+    def parse(self, word):
+        """ Дерево вывода слова или None, если слово не выводится.
+        Узел - пара (имя нетерминала, список детей), лист - имя терминала """
+        chart = self.run(word)
+        if len(word) not in chart:
+            return None
+        final_set = chart[len(word)]
+        for item in final_set.items:
+            dot, origin = item
+            if origin == 0 and self.next_symbol[dot] == COMPLETE and self.dot_lhs[dot] == self.grammar.axiom:
+                return self.build_tree(chart, len(word), item)
+        return None
+
+    # ---------- построение дерева ----------
+
+    def empty_tree(self, non_terminal: int):
+        """ Дерево вывода пустой цепочки из обнуляемого нетерминала (без рекурсии Python) """
+        trees = self.empty_trees()
+        return trees[non_terminal]
+
+    def empty_trees(self) -> dict:
+        if getattr(self, '_empty_trees', None) is not None:
+            return self._empty_trees
+        compact = self.grammar
+        # для каждого обнуляемого нетерминала - правило, через которое он стал обнуляемым впервые,
+        # тогда все символы его правой части стали обнуляемыми раньше и циклов нет
+        first_production = dict()
+        changed = True
+        while changed:
+            changed = False
+            for lhs in range(compact.non_terminal_count):
+                for production in compact.productions_of(lhs):
+                    if lhs not in first_production and \
+                            all(symbol in first_production for symbol in compact.rhs_of(production)):
+                        first_production[lhs] = production
+                        changed = True
+
+        trees = dict()
+        for non_terminal in first_production:
+            stack = [non_terminal]
+            while stack:
+                symbol = stack[-1]
+                body = compact.rhs_of(first_production[symbol])
+                missing = [child for child in body if child not in trees]
+                if missing:
+                    stack.extend(missing)
+                    continue
+                stack.pop()
+                trees[symbol] = (compact.name(symbol), [trees[child] for child in body])
+        self._empty_trees = trees
+        return trees
+
+    def build_tree(self, chart: dict, position: int, item: tuple):
+        """ Идёт по обратным ссылкам от разобранной ситуации. Ссылка каждой ситуации - первая,
+        с которой она появилась, поэтому она указывает только на более ранние ситуации """
+        compact = self.grammar
+        root = [compact.name(self.dot_lhs[item[0]]), []]
+        # кадр: (узел, номер множества, текущая ситуация)
+        stack = [(root, position, item)]
+        while stack:
+            node, set_position, (dot, origin) = stack.pop()
+            production = self.dot_production[dot]
+            start = compact.rhs_offsets[production] + production
+            children = []
+            while dot != start:
+                back_set, child = chart[set_position].items[(dot, origin)]
+                if isinstance(child, tuple):
+                    child_node = [compact.name(self.dot_lhs[child[0]]), []]
+                    stack.append((child_node, set_position, child))
+                    children.append(child_node)
+                elif child < compact.non_terminal_count:
+                    children.append(self.empty_tree(child))
+                else:
+                    children.append(compact.name(child))
+                dot -= 1
+                set_position = back_set
+            children.reverse()
+            node[1] = children
+
+        return self.freeze(root)
+
+    @staticmethod
+    def freeze(root):
+        """ Превращает списки-узлы [имя, дети] в кортежи (имя, дети) без рекурсии """
+        stack = [root]
+        order = []
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                order.append(node)
+                stack.extend(node[1])
+        frozen = dict()
+        for node in reversed(order):
+            frozen[id(node)] = (node[0], [frozen.get(id(child), child) if isinstance(child, list) else child
+                                          for child in node[1]])
+        return frozen[id(root)]
+
+
+def recognize(grammar, word) -> bool:
+    return EarleyParser(grammar).recognize(word)
+
+
+class IncrementalRecognizer:
+    """ Распознаватель, которому слово подаётся частями: feed(chunk) продолжает разбор с того
+    места, где он остановился. Хранится только та часть таблицы Эрли, на которую ещё могут
+    сослаться будущие шаги: множества, из которых начаты незавершённые ситуации """
+
+    def __init__(self, grammar):
+        self.parser = EarleyParser(grammar)
+        compact = self.parser.grammar
+        # правила с непорождающими символами никогда не закончатся, и их предсказание
+        # сделало бы ответ is_viable_prefix слишком оптимистичным
+        productive = compact.productive(with_empty=True)
+        for non_terminal, starts in enumerate(self.parser.prediction):
+            starts[:] = [start for start in starts
+                         if all(symbol >= compact.non_terminal_count or productive[symbol]
+                                for symbol in compact.rhs_of(self.parser.dot_production[start]))]
+
+        self.chart = self.parser.start()
+        self.position = 0
+        self.dead = not self.chart[0].items
+        # размер таблицы после последней сборки мусора
+        self.collected_size = 1
+
+    def feed(self, chunk):
+        """ Дочитывает очередную часть слова (строку или последовательность терминалов) """
+        parser = self.parser
+        for terminal in chunk:
+            if self.dead:
+                return
+            terminal = parser.terminal_ids.get(terminal)
+            if terminal is None:
+                self.dead = True
+                return
+            next_set = parser.scan(self.chart, self.position, terminal)
+            self.forget(self.chart[self.position])
+            self.position += 1
+            if not next_set.items:
+                self.dead = True
+                return
+            parser.process(self.chart, self.position)
+            if len(self.chart) >= 2 * self.collected_size:
+                self.collect()
+
+    def forget(self, earley_set: EarleySet):
+        """ После сканирования множеству нужны только ситуации, ждущие нетерминал """
+        earley_set.items = None
+        earley_set.predicted = None
+        compact = self.parser.grammar
+        for symbol in [symbol for symbol in earley_set.waiting if symbol >= compact.non_terminal_count]:
+            del earley_set.waiting[symbol]
+
+    def collect(self):
+        """ Удаляет множества, которые не являются началом ни одной живой ситуации """
+        live = {self.position}
+        queue = [self.position]
+        while queue:
+            for waiting in self.chart[queue.pop()].waiting.values():
+                for _, origin in waiting:
+                    if origin not in live:
+                        live.add(origin)
+                        queue.append(origin)
+        for position in [position for position in self.chart if position not in live]:
+            del self.chart[position]
+        self.collected_size = len(self.chart)
+
+    def is_viable_prefix(self) -> bool:
+        """ Можно ли дописать прочитанное до слова языка """
+        return not self.dead
+
+    def accepts(self) -> bool:
+        """ Выводится ли из аксиомы всё прочитанное на данный момент """
+        return not self.dead and self.parser.is_accepting(self.chart[self.position])
@@ -1,7 +1,31 @@
+from analysis import (AnalysisCache, FirstFollow, LeftRecursionPlan, chain_closure, eliminate_left_recursion,
+                      is_chain_rule, left_recursion_plan, productive_non_terminals, reachable_symbols)
+from watched import Version, WatchedDict, WatchedSet
+
+
 class Token:
-    def __init__(self, token_lexem:str, token_type:str):
-        self.lexem = token_lexem
-        self.token_type = token_type
+    """ Лексема грамматики. Токены интернируются: каждой паре (лексема, тип) соответствует
+    ровно один объект с плотным целочисленным id, поэтому сравнение и хеш - O(1) """
+    __slots__ = ('lexem', 'token_type', 'id')
+
+    # таблица символов: (лексема, тип) -> токен, и токены по порядку их id
+    _table = dict()
+    _tokens = []
+
+    def __new__(cls, token_lexem: str, token_type: str):
+        token = cls._table.get((token_lexem, token_type))
+        if token is None:
+            token = object.__new__(cls)
+            token.lexem = token_lexem
+            token.token_type = token_type
+            token.id = len(cls._tokens)
+            cls._table[(token_lexem, token_type)] = token
+            cls._tokens.append(token)
+        return token
+
+    @classmethod
+    def from_id(cls, token_id: int):
+        return cls._tokens[token_id]
 
     def __str__(self):
         return '({lexem},{lexem_type})'.format(lexem=self.lexem,lexem_type=self.token_type)
@@ -11,24 +35,23 @@ class Token:
 
     def __eq__(self, other):
         if type(other)==Token:
-            return other.lexem == self.lexem and other.token_type==self.token_type
+            return self is other
         return NotImplemented
 
     def __ne__(self, other):
         if type(other)==Token:
-            return not (other.lexem == self.lexem and other.token_type==self.token_type)
+            return self is not other
         return NotImplemented
 
     def __hash__(self):
-        isum = 0
-        for ch in self.lexem:
-            isum+=ord(ch)
-        for ch in self.token_type:
-            isum+=ord(ch)
-        return isum
+        return self.id
+
+    def __reduce__(self):
+        # при распаковке (например, в другом процессе) токен снова проходит через таблицу символов
+        return Token, (self.lexem, self.token_type)
 
     def copy(self):
-        return Token(self.lexem,self.token_type)
+        return self
         
 
 def to_array_of_tokens(sstr):
@@ -67,6 +90,10 @@ class CFG:
                     if symbol not in terminals and symbol not in non_terminals:
                         raise Exception("At least one symbol from the right side of the " +
                                         "rules is not in symbols of grammar.")
+        # счётчик изменений правил и символов и результаты анализов для текущей версии
+        self.changes = Version()
+        self.analysis_cache = AnalysisCache()
+
         # нетерминалы
         self.non_terminals = to_set_of_tokens(non_terminals)
 
@@ -78,6 +105,47 @@ class CFG:
 
         # аксиома (начальный символ грамматики)
         self.axiom = Token(axiom,'char')
+
+     @property
+     def rules(self):
+         return self._rules
+
+     @rules.setter
+     def rules(self, rules):
+         self._rules = WatchedDict(self.changes, rules)
+         self.changes.bump()
+
+     @property
+     def terminals(self):
+         return self._terminals
+
+     @terminals.setter
+     def terminals(self, terminals):
+         self._terminals = WatchedSet(self.changes, terminals)
+         self.changes.bump()
+
+     @property
+     def non_terminals(self):
+         return self._non_terminals
+
+     @non_terminals.setter
+     def non_terminals(self, non_terminals):
+         self._non_terminals = WatchedSet(self.changes, non_terminals)
+         self.changes.bump()
+
+     @property
+     def axiom(self):
+         return self._axiom
+
+     @axiom.setter
+     def axiom(self, axiom):
+         # от аксиомы зависят достижимость, FOLLOW и план устранения левой рекурсии
+         self._axiom = axiom
+         self.changes.bump()
+
+     def cached(self, name, compute):
+         """ Результат анализа, посчитанный для текущей версии грамматики (или compute()) """
+         return self.analysis_cache.get(self.changes.value, name, compute)
      
      def token_constructor(self, non_term, term, rules, axiom):
          temp = CFG({'A'},{},{},'A')
@@ -88,7 +156,10 @@ class CFG:
          return temp
      
      def copy(self):
-         return self.token_constructor(self.non_terminals, self.terminals, self.rules, self.axiom)
+         new_grammar = self.token_constructor(self.non_terminals, self.terminals, self.rules, self.axiom)
+         # у копии то же содержимое, поэтому уже посчитанные анализы ей подходят
+         new_grammar.analysis_cache.inherit(self.analysis_cache, self.changes.value, new_grammar.changes.value)
+         return new_grammar
 
      def __eq__(self, other):
         if self.non_terminals == other.non_terminals and self.terminals == other.terminals \
@@ -152,31 +223,10 @@ class CFG:
 
      def get_good_non_terminals(self):
         """ Возвращает все хорошие нетерминалы """
-        good_tokens = set()
-        good_tokens_temp = good_tokens.copy()
-
-        while True:
-
-            # идем по всем правилам
-            for rule in self.rules:
-                for i, rule_item in enumerate(self.rules[rule]):
-
-                    # если правая часть содержит только хорошие символы и терминалы,
-                    # то добавляем нетерминал к хорошим символам
-                    if self.is_contain_good_tokens(self.rules[rule][i], good_tokens):
-                        good_tokens.add(rule)
-                        break
-
-            # условие прерывания алгоритма:
-            # если за проход мы не добавили никакого нового хорошего символа
-            if good_tokens == good_tokens_temp:
-                break
-
-            good_tokens_temp = good_tokens.copy()
-        return good_tokens_temp
+        return set(self.cached('productive', lambda: productive_non_terminals(self.rules, self.terminals)))
     
      def is_not_empty(self):
-        return self.axiom in self.get_good_non_terminals()
+        return self.axiom in self.cached('productive', lambda: productive_non_terminals(self.rules, self.terminals))
 
      def remove_bad_non_terminals_and_rules(self):
         good_non_terminals = self.get_good_non_terminals()
@@ -206,42 +256,7 @@ class CFG:
     
      def remove_unreachable_symbols(self):
         """ Возвращает грамматику без недостижимых символов (при этом нынешнюю грамматику не меняет) """
-        # достижимые нетерминалы
-        reachable_non_terminals = {self.axiom}
-
-        # используется, чтобы не проходится по одним и тем же нетерминалам на каждой итерации
-        reachable_non_terminals_original = reachable_non_terminals.copy()
-
-        # достижимые терминалы
-        reachable_terminals = set()
-
-        while True:
-            for rule_left_side in self.rules:
-
-                # проходимся по правилам и проверяем,
-                # есть ли левая сторона правила в достижимых нетерминалах
-                if rule_left_side in reachable_non_terminals_original:
-                    for rule_output in self.rules[rule_left_side]:
-
-                        # проходимся по выводам правила и добавляем символы из этих выводов в достижимые
-                        for symbol in rule_output:
-                            if symbol in self.terminals:
-                                reachable_terminals.add(symbol)
-                            if symbol in self.non_terminals:
-                                reachable_non_terminals_original.add(symbol)
-
-            # убираем все достижимые нетерминалы,
-            # которые уже проходили через верхний цикл (difference - разность множеств)
-            reachable_non_terminals_original = reachable_non_terminals_original.difference(reachable_non_terminals)
-
-            # проверяем, были ли найдены все достижимые нетерминалы
-            if len(reachable_non_terminals_original) == 0:
-                break
-
-            # если нет, то добавляем достижимые нетерминалы,
-            # которые были найденны на последней итерации (union - объединение множеств)
-            else:
-                reachable_non_terminals = reachable_non_terminals.union(reachable_non_terminals_original)
+        reachable_terminals, reachable_non_terminals = self.get_reachable_symbols()
 
         # если достижимые нетерминалы совпадают с теми,
         # что были изначально определены в грамматике, то возвращаем новую, идентичную этой грамматику
@@ -253,8 +268,8 @@ class CFG:
         # чья левая сторона не является достижимым нетерминалом
         else:
             new_rules = dict()
-            for non_terminal in reachable_non_terminals:
-                if non_terminal in self.rules:
+            for non_terminal in self.rules:
+                if non_terminal in reachable_non_terminals:
                     new_rules[non_terminal] = self.rules[non_terminal].copy()
 
             if len(reachable_non_terminals) == 1 and len(reachable_terminals) == 0 and len(new_rules) == 0:
@@ -264,6 +279,22 @@ class CFG:
             # и новыми правилами вывода
             return self.token_constructor(reachable_non_terminals, reachable_terminals, new_rules, self.axiom)
 
+     def get_first_follow(self) -> FirstFollow:
+        """ nullable, FIRST и FOLLOW (см. analysis.FirstFollow); результат переиспользуется,
+        пока грамматика не изменилась """
+        return self.cached('first_follow',
+                           lambda: FirstFollow(self.rules, self.axiom, self.terminals, self.non_terminals))
+
+     def get_nullable_non_terminals(self):
+        """ Нетерминалы, из которых выводится пустая цепочка """
+        return set(self.get_first_follow().nullable)
+
+     def get_reachable_symbols(self):
+        """ Возвращает достижимые терминалы и нетерминалы, не копируя грамматику """
+        reachable_terminals, reachable_non_terminals = self.cached(
+            'reachable', lambda: reachable_symbols(self.rules, self.axiom, self.terminals, self.non_terminals))
+        return set(reachable_terminals), set(reachable_non_terminals)
+
      def remove_useless_symbols(self):
         """ Очень сложный алгоритм, спасибо, Алексей, Евгений """
         try:
@@ -276,123 +307,83 @@ class CFG:
                  return CFG({self.axiom}, set(), {self.axiom: ['']},self.axiom)
         return without_useless
 
-     def remove_left_recursion(self):
-        if  not self.is_not_empty():
+     def left_recursion_input(self):
+        """ Грамматика, с которой работает устранение левой рекурсии: без бесполезных символов
+        (None для пустого языка). Цепные правила не удаляются: циклы из них выбрасываются
+        при устранении рекурсии как правила A -> A """
+        if not self.is_not_empty():
+            return None
+        return self.remove_useless_symbols()
+
+     def left_recursion_plan(self) -> LeftRecursionPlan:
+        """ Порядок подстановок и предсказанное число правил результата remove_left_recursion
+        (см. analysis.left_recursion_plan); сами подстановки при этом не выполняются """
+        def compute():
+            new_grammar = self.left_recursion_input()
+            if new_grammar is None:
+                return LeftRecursionPlan([], 1)
+            return left_recursion_plan(new_grammar.rules)
+        return self.cached('left_recursion_plan', compute)
+
+     def remove_left_recursion(self, max_rules: int = None):
+        """ Возвращает грамматику без левой рекурсии. Подстановки выполняются только внутри
+        леворекурсивных компонент и в порядке из left_recursion_plan; если max_rules задано
+        и предсказанное число правил больше, грамматика не строится (ValueError) """
+        new_grammar = self.left_recursion_input()
+        if new_grammar is None:
             if type(self.axiom) == Token:
                  return self.token_constructor({self.axiom}, set(), {self.axiom: [[Token('','char')]]},self.axiom)
             else:
                  return CFG({self.axiom}, set(), {self.axiom: ['']},self.axiom)
 
-        new_grammar = self.copy()  # новая грамматика чтобы её вернуть
-        new_grammar = new_grammar.remove_useless_symbols()
-        new_grammar = new_grammar.remove_chain_rules()
-        rule_array = tuple(new_grammar.rules)  # упорядочил) нетерминалы
-        i = 0  # счетчик (кто мог ожидать?)
-        while True:
-            for o, rule_item in enumerate(new_grammar.rules[rule_array[i]]):  # проверяю каждое правило
-                if rule_item[0] == rule_array[i]:  # если правило вызывает левую рекурсию, то
-                    new_non_terminal = Token(rule_array[i].lexem + '\'','char')  # создаем новый нетерминал
-                    new_non_terminal_rules = []
-                    new_rules = []
-                    for m, temp_rule in enumerate(
-                            new_grammar.rules[rule_array[i]]):  # проходим опять по каждому правилу
-                        if temp_rule[0] == rule_array[i]:  # если вызывается левая рекурсия
-                            k = 1
-                            #while k < len(temp_rule):  # скипаем первые k повторений нашего нетерминала
-                            #    if temp_rule[k] == rule_array[i]:
-                            #        k += 1
-                            #    else:
-                            #        break
-
-                            new_temp_rule = (
-                                temp_rule[k:len(temp_rule)])  # оставляем только правую часть, после k повторений
-                            new_non_terminal_rules.append(
-                                new_temp_rule)  # добавляем это правило в правила нового нетерминала
-                            temp_list = new_temp_rule.copy()
-                            temp_list.append(
-                                new_non_terminal)  # создаем массив строк с нашего правила (чтобы туда можно было добавить правило со штрихом (то есть состоящее из 2 символов))
-                            new_non_terminal_rules.append(temp_list)  # добавляем его в правило нового нетерминала
-                        else:  # если правило не вызывает левую рекурсию, то добавляем его как есть
-                            new_rules.append(
-                                temp_rule)  # (раньше тут был опять массив строк, но я убрал и вроде не ломается)
-                            temp_list = temp_rule.copy()
-                            temp_list.append(new_non_terminal)  # добавляем правило с нетерминалом со штрихом в конце
-                            new_rules.append(temp_list)
-                    new_grammar.rules[rule_array[i]] = new_rules  # обновляем правила у изначального нетерминала
-                    new_grammar.non_terminals.add(new_non_terminal)
-                    new_grammar.rules.update(
-                        {new_non_terminal: new_non_terminal_rules})  # добавляем новый нетерминал с его правилами
-                    break
-                else:
-                    pass
-            if i == len(rule_array) - 1:  # выход из алгоритма
-                break
-            j = 0
-            i += 1
-            while True:
-                temp_rule = {rule_array[i]: []}  # временные правила
-                for o, rule_item in enumerate(new_grammar.rules[rule_array[i]]):
-                    if rule_item[0] == rule_array[j]:  # если в нашем правиле в начале стоит нетерминал,
-                        # который имеет индекс меньше, то заменяем его на правые части правил из НЕГО
-                        for n, rule_item_temp in enumerate(new_grammar.rules[rule_array[j]]):
-                            temp_right_side = rule_item_temp.copy()
-                            k = 1
-                            #while k < len(rule_item):  # скипаем первые k повторений нашего нетерминала
-                            #    # (не проверил, может ли тут быть пустота по итогу)
-                            #    if rule_item[k] == rule_array[j]:
-                            #        k += 1
-                            #    else:
-                            #        break
-                            for k in range(k,len(rule_item)):
-                                temp_right_side.append(rule_item[k])
-                            if len(temp_right_side) >0:
-                                temp_rule[rule_array[i]].append(temp_right_side)
-                    else:  # если не стоит нетерминал, то добавляем правило как есть без изменений
-                        temp_rule[rule_array[i]].append(rule_item)
-                new_grammar.rules.update(temp_rule)  # обновляем
-                if j == i - 1:
-                    break  #
-                else:
-                    j += 1
+        plan = self.cached('left_recursion_plan', lambda: left_recursion_plan(new_grammar.rules))
+        if max_rules is not None and plan.predicted_rules > max_rules:
+            raise ValueError("Removing left recursion would create " + str(plan.predicted_rules) +
+                             " rules, more than the limit of " + str(max_rules) + ".")
+        return new_grammar.eliminate_left_recursion(plan)
 
+     def eliminate_left_recursion(self, plan: LeftRecursionPlan):
+        """ Подстановки по плану left_recursion_plan(self.rules) без удаления бесполезных символов;
+        возвращает новую грамматику (при этом нынешнюю грамматику не меняет) """
+        new_grammar = self.copy()
+        epsilon = Token('', 'char')
+        symbols = new_grammar.non_terminals | new_grammar.terminals
+
+        def new_non_terminal(non_terminal):
+            name = non_terminal.lexem + '\''
+            while Token(name, 'char') in symbols:
+                name += '\''
+            new = Token(name, 'char')
+            symbols.add(new)
+            new_grammar.non_terminals.add(new)
+            return new
+
+        for non_terminal, rule_outputs in eliminate_left_recursion(new_grammar.rules, plan, new_non_terminal).items():
+            # пустая цепочка остаётся только как единственный символ правой части
+            new_grammar.rules[non_terminal] = [[symbol for symbol in rule_output if symbol != epsilon] or [epsilon]
+                                               for rule_output in rule_outputs]
         return new_grammar
 
      def remove_chain_rules(self):
         """ Возвращает грамматику без цепных правил (при этом нынешнюю грамматику не меняет) """
-        chain_non_terminals = dict()  # тут будут хранится все множества из цепных нетерминалов (т.е. NA, NB, ... по обозначениям из видео по этому алгосу)
-
-        # здесь заполняем chain_non_terminals
-        for non_terminal in self.non_terminals:
-            chain_non_terminals_key = non_terminal  # с этого нетерминала начинается множество цепных нетерминалов (мцн)
-            chain_non_terminals_value = set()  # здесь будут все цепные нетерминалы исходящие из chain_non_terminals_key
-            self.fill_chain_non_terminals_value(chain_non_terminals_key, chain_non_terminals_value,
-                                                non_terminal)  # заполняем chain_non_terminals_value (т.е. ищем все цепные нетерминалы исходящие из chain_non_terminals_key)
-            chain_non_terminals[
-                chain_non_terminals_key] = chain_non_terminals_value  # "объединяем" chain_non_terminals_key и chain_non_terminals_value
+        chain_non_terminals = self.get_chain_non_terminals()
 
         new_rules = dict()
-        for first_chain_non_terminal in chain_non_terminals:  # проходимся по первым
-            # нетерминалам из всех множеств цепных нетерминалов
-            rule_outputs = list()  # здесь будут правые части правила в новой
-            # грамматике исходящие из first_chain_non_terminal
-            if first_chain_non_terminal in self.rules:
-                for rule_output in self.rules[first_chain_non_terminal]:  # сначала проходимся по правым
-                    # частям правил исходящих из first_chain_non_terminal
-                    if not (len(rule_output) == 1 and rule_output[0] in self.non_terminals):
-                        rule_outputs.append(
-                            rule_output)  # и добавляем в rule_outputs правые части,
-                        # которые не состоят из одного нетерминала
-
-                for non_terminal in chain_non_terminals[first_chain_non_terminal]:
-                    # затем проходимся по правым частям правил исходящих из всех
-                    # остальных цепных нетерминалов из множества с первым нетерминалом first_chain_non_terminal
-                    if non_terminal in self.rules:
-                        for rule_output in self.rules[non_terminal]:
-                            if not (len(rule_output) == 1 and rule_output[0] in self.non_terminals):
-                                rule_outputs.append(rule_output)  # и делаем тоже самое
-
-                if rule_outputs:  # если не пуст, то добавляем в правила новой грамматики
-                    new_rules[first_chain_non_terminal] = rule_outputs
+        # у нетерминалов одной компоненты сильной связности общее множество цепных нетерминалов,
+        # поэтому и список новых правых частей для них собирается один раз
+        shared_rule_outputs = dict()
+        for first_chain_non_terminal, chain in chain_non_terminals.items():
+            if first_chain_non_terminal not in self.rules:
+                continue
+            rule_outputs = shared_rule_outputs.get(chain)
+            if rule_outputs is None:
+                # все не цепные правые части всех нетерминалов, выводимых цепными правилами
+                rule_outputs = [rule_output for non_terminal in sorted(chain)
+                                for rule_output in self.rules.get(non_terminal, ())
+                                if not is_chain_rule(rule_output, self.non_terminals)]
+                shared_rule_outputs[chain] = rule_outputs
+            if rule_outputs:  # если не пуст, то добавляем в правила новой грамматики
+                new_rules[first_chain_non_terminal] = rule_outputs
 
         new_grammar = self.copy()
         new_grammar.rules = new_rules
@@ -400,18 +391,17 @@ class CFG:
         new_grammar.terminals = self.terminals.copy()  # в возваращаемой грамматике изменяются только нетерминалы и правила вывода
         return new_grammar
 
-     def fill_chain_non_terminals_value(self, key, value,
-                                       non_terminal):  # рот шатал в вайл тру это делать, поэтому рекурсия
-        if non_terminal in self.rules:
-            for rule_output in self.rules[non_terminal]:
-                # проходимся по правым частям правил исходящих из non_terminal
-                # и проверяем состоят ли они из одного нетерминала
-                if len(rule_output) == 1 and rule_output[0] in self.non_terminals:
-                    if rule_output[0] not in value and rule_output[0] != key:  # проверка на зацикленность рекурсии
-                        value.add(rule_output[0])  # и если состоят, то добавляем этот нетерминал
-                        # в множество цепных нетерминалов (мцн)
-                        self.fill_chain_non_terminals_value(key, value, rule_output[
-                            0])  # и далее ищем цепные нетерминалы исходящие из добавленного в мцн нетерминала
+     def get_chain_non_terminals(self):
+        """ Для каждого нетерминала - frozenset нетерминалов, выводимых из него цепными правилами,
+        включая его самого (у нетерминалов одной компоненты сильной связности - один общий объект).
+        Словарь - копия закешированного, чтобы вызывающий не мог испортить кеш; множества неизменяемы
+        и остаются общими """
+        return dict(self.cached('chain', self.compute_chain_non_terminals))
+
+     def compute_chain_non_terminals(self):
+        # множества NA, NB, ... (по обозначениям из видео по этому алгосу): нетерминал и все нетерминалы,
+        # выводимые из него цепными правилами; считаются по компонентам сильной связности графа цепных правил
+        return chain_closure(self.rules, self.rules, self.non_terminals)
 
 if __name__ == "__main__":
     A = CFG({'E', 'T', 'F'}, 
@@ -0,0 +1,222 @@
+""" Двоичный файл грамматики с ленивым доступом через mmap.
+
+Файл - это CompactGrammar на диске. После заголовка идут (little-endian):
+    int32 name_offsets[символов + 1]   - таблица символов: имя символа s - names[name_offsets[s]:name_offsets[s + 1]]
+    int32 sorted_symbols[символов]     - номера символов в порядке имён (двоичный поиск по имени)
+    int32 rule_offsets[нетерминалов + 1]
+    int32 rhs_offsets[правил + 1]      - индекс смещений правых частей
+    int32 rhs[...]                     - все правые части подряд
+    byte  defined[нетерминалов]        - был ли у нетерминала ключ в словаре правил
+    byte  list_rhs[правил]             - для Grammar (main.py): правая часть была списком
+    byte  names[...]                   - имена символов в UTF-8
+
+GrammarFile ничего не читает заранее: запросы (имя символа, поиск по имени, правила
+нетерминала) обращаются к отображённым в память страницам, поэтому открыть файл
+с миллионами правил и посмотреть правила одного нетерминала - дёшево.
+"""
+import mmap
+import struct
+import sys
+from array import array
+
+from compact import CompactGrammar, symbol_name
+from conversion_cache import grammar_kind
+
+FILE_MAGIC = b'GRMR'
+FILE_VERSION = 1
+# магия, версия, вид грамматики, символов, нетерминалов, аксиома, правил, длина rhs, байт имён
+FILE_HEADER = struct.Struct('<4sHHIIIIII')
+
+# вид грамматики - модель, из которой её сохранили (как в conversion_cache.grammar_kind)
+KINDS = ('grammar', 'cfg', 'greibach')
+
+
+def int_array(values) -> bytes:
+    values = array('i', values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def save(grammar, path: str):
+    """ Записывает Grammar (main.py), CFG, Grammar из greibach или CompactGrammar """
+    kind = 'grammar' if isinstance(grammar, CompactGrammar) else grammar_kind(grammar)
+    compact = CompactGrammar.from_any(grammar)
+    if kind == 'grammar' and not isinstance(grammar, CompactGrammar):
+        list_rhs = bytes(isinstance(rule_output, list)
+                         for rule_outputs in grammar.rules.values() for rule_output in rule_outputs)
+    elif kind == 'grammar':
+        # у компактной грамматики вида правых частей нет: списком записывается правая часть,
+        # которую нельзя склеить в строку без потери границ между именами
+        list_rhs = bytes(any(len(compact.name(symbol)) != 1 for symbol in compact.rhs_of(production))
+                         for production in range(compact.production_count()))
+    else:
+        list_rhs = bytes(compact.production_count())
+
+    names = [compact.name(symbol).encode('utf-8') for symbol in range(len(compact.symbols))]
+    name_offsets = [0]
+    for name in names:
+        name_offsets.append(name_offsets[-1] + len(name))
+    sorted_symbols = sorted(range(len(names)), key=names.__getitem__)
+
+    with open(path, 'wb') as file:
+        file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, KINDS.index(kind), len(names),
+                                    compact.non_terminal_count, compact.axiom, compact.production_count(),
+                                    len(compact.rhs), name_offsets[-1]))
+        for values in (name_offsets, sorted_symbols, compact.rule_offsets, compact.rhs_offsets, compact.rhs):
+            file.write(int_array(values))
+        file.write(bytes(compact.defined))
+        file.write(list_rhs)
+        file.write(b''.join(names))
+
+
+class GrammarFile:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, kind, symbol_count, self.non_terminal_count, self.axiom,
+             production_count, rhs_length, names_length) = FILE_HEADER.unpack_from(self.data)
+        except struct.error:
+            magic = version = None
+        if magic != FILE_MAGIC or version != FILE_VERSION or kind >= len(KINDS):
+            self.data.close()
+            raise ValueError("Not a grammar file (or an unsupported version): " + path)
+        self.kind = KINDS[kind]
+        self.symbol_count = symbol_count
+        size = FILE_HEADER.size + 4 * (2 * symbol_count + 1 + self.non_terminal_count + 1 + production_count + 1
+                                       + rhs_length) + self.non_terminal_count + production_count + names_length
+        if len(self.data) < size:
+            self.data.close()
+            raise ValueError("Truncated grammar file: " + path)
+
+        self.view = memoryview(self.data)
+        self.offset = FILE_HEADER.size
+        self.name_offsets = self.ints(symbol_count + 1)
+        self.sorted_symbols = self.ints(symbol_count)
+        self.rule_offsets = self.ints(self.non_terminal_count + 1)
+        self.rhs_offsets = self.ints(production_count + 1)
+        self.rhs = self.ints(rhs_length)
+        self.defined = self.byte_section(self.non_terminal_count)
+        self.list_rhs = self.byte_section(production_count)
+        self.names = self.byte_section(names_length)
+
+    def ints(self, length: int):
+        """ Следующий массив int32 файла: срез отображения без копирования
+        (на big-endian машинах - перевёрнутая копия) """
+        size = length * 4
+        values = self.view[self.offset:self.offset + size]
+        self.offset += size
+        if sys.byteorder == 'big':
+            return array('i', struct.unpack('<%di' % length, values))
+        return values.cast('i')
+
+    def byte_section(self, length: int):
+        values = self.view[self.offset:self.offset + length]
+        self.offset += length
+        return values
+
+    def close(self):
+        # срезы держат буфер отображения, их нужно отпустить до закрытия
+        for name in ('name_offsets', 'sorted_symbols', 'rule_offsets', 'rhs_offsets', 'rhs',
+                     'defined', 'list_rhs', 'names', 'view'):
+            values = self.__dict__.pop(name, None)
+            if isinstance(values, memoryview):
+                values.release()
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # ---------- ленивые запросы ----------
+
+    def production_count(self) -> int:
+        return len(self.rhs_offsets) - 1
+
+    def is_terminal(self, symbol: int) -> bool:
+        return symbol >= self.non_terminal_count
+
+    def encoded_name(self, symbol: int) -> bytes:
+        return bytes(self.names[self.name_offsets[symbol]:self.name_offsets[symbol + 1]])
+
+    def name(self, symbol: int) -> str:
+        return self.encoded_name(symbol).decode('utf-8')
+
+    def symbol_id(self, name: str) -> int:
+        """ Номер символа по имени (двоичный поиск по отсортированным именам) """
+        key = name.encode('utf-8')
+        low, high = 0, self.symbol_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.encoded_name(self.sorted_symbols[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.symbol_count and self.encoded_name(self.sorted_symbols[low]) == key:
+            return self.sorted_symbols[low]
+        raise KeyError(name)
+
+    def productions_of(self, non_terminal: int) -> range:
+        return range(self.rule_offsets[non_terminal], self.rule_offsets[non_terminal + 1])
+
+    def rhs_of(self, production: int) -> list:
+        return self.rhs[self.rhs_offsets[production]:self.rhs_offsets[production + 1]].tolist()
+
+    def rules_of(self, non_terminal) -> list:
+        """ Правые части нетерминала (номер или имя) - списки имён символов """
+        if not isinstance(non_terminal, int):
+            non_terminal = self.symbol_id(symbol_name(non_terminal))
+        if self.is_terminal(non_terminal):
+            raise KeyError(self.name(non_terminal) + ' is a terminal')
+        return [[self.name(symbol) for symbol in self.rhs_of(production)]
+                for production in self.productions_of(non_terminal)]
+
+    # ---------- загрузка целиком ----------
+
+    def to_compact(self) -> CompactGrammar:
+        return CompactGrammar([self.name(symbol) for symbol in range(self.symbol_count)],
+                              self.non_terminal_count, self.axiom,
+                              array('i', self.rule_offsets), array('i', self.rhs_offsets), array('i', self.rhs),
+                              bytearray(self.defined))
+
+    def to_grammar(self):
+        """ Grammar (main.py); вид правых частей (строка или список) восстанавливается как был """
+        return self.to_compact().to_grammar(bytearray(self.list_rhs) if self.kind == 'grammar' else None)
+
+    def to_cfg(self):
+        return self.to_compact().to_cfg()
+
+    def to_greibach(self):
+        return self.to_compact().to_greibach()
+
+    def load(self):
+        """ Грамматика той модели, из которой файл был сохранён """
+        if self.kind == 'cfg':
+            return self.to_cfg()
+        if self.kind == 'greibach':
+            return self.to_greibach()
+        return self.to_grammar()
+
+
+def load_grammar(path: str):
+    with GrammarFile(path) as grammar_file:
+        return grammar_file.to_grammar()
+
+
+def load_cfg(path: str):
+    with GrammarFile(path) as grammar_file:
+        return grammar_file.to_cfg()
+
+
+def load_greibach(path: str):
+    with GrammarFile(path) as grammar_file:
+        return grammar_file.to_greibach()
+
+
+def load(path: str):
+    with GrammarFile(path) as grammar_file:
+        return grammar_file.load()
@@ -1,47 +1,63 @@
-from Converter import Converter
-from Simplifier import Simplifier
-from Rule import Rule
-from util import *
+from .Converter import Converter
+from .Simplifier import Simplifier
+from .Rule import Rule
+from .util import *
 
 
 class Chomsky(Converter):
+    def __init__(self, grammar, observers=None):
+        super().__init__(grammar, observers)
+        # rules of length two or more split into binary ones
+        self.rewrites = {"cnf": 0}
+
     def convert(self):
-        simplifier = Simplifier(self.grammar)
+        simplifier = Simplifier(self.grammar, observers=self.observers)
         self.grammar = simplifier.simplify()
         self.messages = simplifier.messages
+        self.run_phase("cnf", self.to_normal_form)
+        return self.grammar
 
+    def to_normal_form(self):
         if self.check_start_symbol_is_used():
             self.messages.append("'$' is now the start symbol.")
             self.grammar.rules.insert(0, Rule("$", self.grammar.start_symbol))
             self.grammar.non_terminals.add("$")
 
-        while True:
-            for rule in self.grammar.rules:
-                if len(rule.rhs) == 2 and (is_terminal(rule.rhs[0]) or is_terminal(rule.rhs[1])):
-                    if is_terminal(rule.rhs[0]):
-                        new_symbol = self.grammar.get_unused_non_terminal()
-                        new_rule = Rule(new_symbol, rule.rhs[0])
-                        self.grammar.rules.append(new_rule)
-                        rule.rhs = new_symbol + rule.rhs[1]
-
-                    if is_terminal(rule.rhs[1]):
-                        new_symbol = self.grammar.get_unused_non_terminal()
-                        new_rule = Rule(new_symbol, rule.rhs[1])
-                        self.grammar.rules.append(new_rule)
-                        rule.rhs = rule.rhs[0] + new_symbol
-
-                    break
-
-                elif len(rule.rhs) > 2:
-                    new_symbol = self.grammar.get_unused_non_terminal()
-                    new_rule = Rule(new_symbol, rule.rhs[1:])
-                    rule.rhs = rule.rhs[0] + new_symbol
-                    self.grammar.rules.append(new_rule)
-                    break
-            else:
-                break
+        # every production is visited once; the rules it spawns are already in normal form,
+        # so they are collected in a pending queue and added after the pass
+        terminal_proxies = dict()
+        # one helper per distinct tail: equal tails of different rules share it
+        tail_helpers = dict()
+        pending_rules = []
+        for rule in self.grammar.rules:
+            if len(rule.rhs) < 2:
+                continue
 
-        return self.grammar
+            symbols = [self.get_terminal_proxy(symbol, terminal_proxies, pending_rules)
+                       if is_terminal(symbol) else symbol
+                       for symbol in rule.rhs]
+
+            tail = symbols[-1]
+            for symbol in reversed(symbols[1:-1]):
+                tail = self.get_tail_helper(symbol + tail, tail_helpers, pending_rules)
+            rule.rhs = symbols[0] + tail
+            self.rewrites["cnf"] += 1
+
+        self.grammar.rules.extend(pending_rules)
+
+    def get_terminal_proxy(self, terminal, terminal_proxies, pending_rules):
+        if terminal not in terminal_proxies:
+            new_symbol = self.grammar.get_unused_non_terminal()
+            pending_rules.append(Rule(new_symbol, terminal))
+            terminal_proxies[terminal] = new_symbol
+        return terminal_proxies[terminal]
+
+    def get_tail_helper(self, tail, tail_helpers, pending_rules):
+        if tail not in tail_helpers:
+            new_symbol = self.grammar.get_unused_non_terminal()
+            pending_rules.append(Rule(new_symbol, tail))
+            tail_helpers[tail] = new_symbol
+        return tail_helpers[tail]
 
     def check_start_symbol_is_used(self):
         for rule in self.grammar.rules:
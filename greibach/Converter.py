@@ -1,10 +1,14 @@
 from abc import ABC, abstractmethod
 
+from .Observer import Observable
 
-class Converter(ABC):
-    def __init__(self, grammar):
+
+class Converter(Observable, ABC):
+    def __init__(self, grammar, observers=None):
         self.grammar = grammar
         self.messages = []
+        # callables receiving a PhaseEvent after every phase, shared with nested converters
+        self.observers = observers if observers is not None else []
 
     @abstractmethod
     def convert(self):
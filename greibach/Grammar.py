@@ -1,7 +1,6 @@
-from util import *
-from Rule import Rule
-import random
-import string
+from .util import *
+from .Rule import Rule
+from .RuleStore import RuleStore
 
 
 def split_rules(rules):
@@ -16,19 +15,29 @@ def split_rules(rules):
 
 class Grammar:
     def __init__(self, rules):
-        self.rules = []
+        self.rules = RuleStore()
         self.terminals = set()
         self.non_terminals = set()
 
+        self.fresh_symbols = FreshSymbols(single_char_non_terminals())
+
         self.build_rules(rules)
         self.detect_symbols()
         self.start_symbol = self.detect_start_symbol()
 
+    @property
+    def rules(self):
+        return self._rules
+
+    @rules.setter
+    def rules(self, rules):
+        self._rules = rules if isinstance(rules, RuleStore) else RuleStore(rules)
+
     def detect_start_symbol(self):
         return '$' if '$' in self.non_terminals else 'S'
 
     def __getitem__(self, lhs):
-        return [self.rules[i] for i in self.find_rules_by_lhs(lhs)]
+        return self.rules_by_lhs(lhs)
 
     def detect_symbols(self):
         for rule in self.rules:
@@ -43,31 +52,25 @@ class Grammar:
         self.rules = [Rule(rule["lhs"], rule["rhs"]) for rule in rules]
 
     def get_unused_non_terminal(self):
-        new_symbol = random.choice(string.ascii_uppercase)
-        while new_symbol in self.non_terminals:
-            new_symbol = random.choice(string.ascii_uppercase)
-        self.non_terminals.add(new_symbol)
-        return new_symbol
+        return self.fresh_symbols.allocate(self.non_terminals)
 
     def find_rules_by_lhs(self, lhs):
-        result = []
-        for index, rule in enumerate(self.rules):
-            if rule.lhs == lhs:
-                result.append(index)
-        return result
+        return self.rules.positions(self.rules_by_lhs(lhs))
 
     def find_rules_by_rhs(self, rhs):
-        result = []
-        for index, rule in enumerate(self.rules):
-            if rule.rhs == rhs:
-                result.append(index)
-        return result
+        return self.rules.positions(self.rules_by_rhs(rhs))
+
+    def rules_by_lhs(self, lhs):
+        return self.rules.find_by_lhs(lhs)
+
+    def rules_by_rhs(self, rhs):
+        return self.rules.find_by_rhs(rhs)
 
     def get_json_rules(self):
         return [{"rhs": rule.rhs, "lhs": rule.lhs} for rule in self.rules]
 
     def is_tag(self, sym):
         if is_non_terminal(sym):
-            rules = [self.rules[i] for i in self.find_rules_by_lhs(sym)]
+            rules = self.rules_by_lhs(sym)
             return all(is_terminal(s) for r in rules for s in r.rhs)
         return False
@@ -1,24 +1,32 @@
-from Chomsky import Chomsky
-from Converter import Converter
-from Rule import Rule
-from util import *
+from collections import deque
+
+from .Chomsky import Chomsky
+from .Converter import Converter
+from .Rule import Rule
+from .util import *
 
 
 class Greibach(Converter):
-    def __init__(self, grammar):
-        super().__init__(grammar)
+    def __init__(self, grammar, observers=None):
+        super().__init__(grammar, observers)
         self.mapping = dict()
         self.reverse_mapping = dict()
+        # non-terminals introduced by left recursion removal, in creation order
+        self.new_non_terminals = []
+        # number of rules rewritten by each phase of the conversion
+        self.rewrites = {"sort": 0, "left_recursion": 0, "terminal_first": 0}
 
     def convert(self):
-        chomsky_converter = Chomsky(self.grammar)
+        chomsky_converter = Chomsky(self.grammar, self.observers)
         self.grammar = chomsky_converter.convert()
         self.messages = chomsky_converter.messages
 
         self.map_non_terminal_to_ordered_symbols()
-        self.sort_rules()
-        self.remove_left_recursion()
-        self.make_rhs_first_symbol_terminal()
+        for number in range(len(self.reverse_mapping)):
+            non_terminal = self.reverse_mapping[number]
+            self.run_phase("sort", self.sort_rules, non_terminal, non_terminal=non_terminal)
+            self.run_phase("left_recursion", self.remove_left_recursion, non_terminal, non_terminal=non_terminal)
+        self.run_phase("terminal_first", self.make_rhs_first_symbol_terminal)
         return self.grammar
 
     def map_non_terminal_to_ordered_symbols(self):
@@ -31,44 +39,71 @@ class Greibach(Converter):
                     self.reverse_mapping[current_number] = symbol
                     current_number += 1
 
-    def sort_rules(self):
-        while True:
-            for index, rule in enumerate(self.grammar.rules):
-                if is_non_terminal(rule.rhs[0]) and self.mapping[rule.lhs] > self.mapping[rule.rhs[0]]:
-                    indices = self.grammar.find_rules_by_lhs(rule.rhs[0])
-                    for idx in indices:
-                        new_rule_rhs = self.grammar.rules[idx].rhs + rule.rhs[1:]
-                        self.grammar.rules.append(Rule(rule.lhs, new_rule_rhs))
-                    self.grammar.rules.remove(rule)
-                    break
-            else:
-                break
+    def sort_rules(self, non_terminal):
+        """
+        Substitutes every rule non_terminal -> A_j... with A_j ordered before non_terminal.
+        Rules of A_j are already sorted and free of left recursion, so each substitution
+        moves the first symbol strictly forward in the mapping and the queue drains.
+        """
+        number = self.mapping[non_terminal]
+        queue = deque(self.grammar[non_terminal])
+        # right-hand sides non_terminal has ever had: a rule reached by two substitution
+        # paths is added once, otherwise the copies multiply with every later substitution
+        seen = {rule.rhs for rule in queue}
+        while queue:
+            rule = queue.popleft()
+            first_symbol = rule.rhs[0]
+            if is_non_terminal(first_symbol) and self.mapping[first_symbol] < number:
+                self.substitute_first(rule, queue, seen)
+                self.rewrites["sort"] += 1
 
-    def remove_left_recursion(self):
-        while True:
-            for index, rule in enumerate(self.grammar.rules):
-                if is_non_terminal(rule.rhs[0]) and rule.lhs == rule.rhs[0]:
-                    new_non_terminal = self.grammar.get_unused_non_terminal()
-                    self.grammar.rules.append(Rule(new_non_terminal, rule.rhs[1:]))
-                    self.grammar.rules.append(Rule(new_non_terminal, rule.rhs[1:]+new_non_terminal))
+    def remove_left_recursion(self, non_terminal):
+        rules = self.grammar[non_terminal]
+        recursive_rules = [rule for rule in rules if rule.rhs[0] == non_terminal]
+        if not recursive_rules:
+            return
 
-                    indices = self.grammar.find_rules_by_lhs(rule.lhs)
-                    for idx in indices:
-                        if idx != index:
-                            self.grammar.rules.append(Rule(rule.lhs, self.grammar.rules[idx].rhs + new_non_terminal))
-                    self.grammar.rules.remove(rule)
-                    break
+        new_non_terminal = self.grammar.get_unused_non_terminal()
+        self.new_non_terminals.append(new_non_terminal)
+        for rule in rules:
+            if rule.rhs[0] == non_terminal:
+                rest = rule.rhs[1:]
+                if rest:
+                    self.grammar.rules.append(Rule(new_non_terminal, rest))
+                    self.grammar.rules.append(Rule(new_non_terminal, rest + new_non_terminal))
             else:
-                break
+                self.grammar.rules.append(Rule(non_terminal, rule.rhs + new_non_terminal))
+
+        for rule in recursive_rules:
+            self.grammar.rules.remove(rule)
+            self.rewrites["left_recursion"] += 1
 
     def make_rhs_first_symbol_terminal(self):
-        while True:
-            for index, rule in enumerate(self.grammar.rules):
+        # the last non-terminal in the mapping already starts with terminals only, so going
+        # backwards every substituted non-terminal is in Greibach form by the time it is used;
+        # the new non-terminals only start with original ones or with earlier new ones
+        order = [self.reverse_mapping[number] for number in reversed(range(len(self.reverse_mapping)))]
+        order.extend(self.new_non_terminals)
+
+        for non_terminal in order:
+            queue = deque(self.grammar[non_terminal])
+            seen = {rule.rhs for rule in queue}
+            while queue:
+                rule = queue.popleft()
                 if is_non_terminal(rule.rhs[0]):
-                    indices = self.grammar.find_rules_by_lhs(rule.rhs[0])
-                    for idx in indices:
-                        self.grammar.rules.append(Rule(rule.lhs, self.grammar.rules[idx].rhs + rule.rhs[1:]))
-                    self.grammar.rules.remove(rule)
-                    break
-            else:
-                break
+                    self.substitute_first(rule, queue, seen)
+                    self.rewrites["terminal_first"] += 1
+
+    def substitute_first(self, rule, queue, seen):
+        """
+        Replaces rule with one rule per production of its first symbol. Right-hand sides
+        already in seen are skipped, the new ones are added to seen and queued.
+        """
+        for next_rule in self.grammar[rule.rhs[0]]:
+            rhs = next_rule.rhs + rule.rhs[1:]
+            if rhs not in seen:
+                seen.add(rhs)
+                new_rule = Rule(rule.lhs, rhs)
+                self.grammar.rules.append(new_rule)
+                queue.append(new_rule)
+        self.grammar.rules.remove(rule)
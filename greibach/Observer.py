@@ -0,0 +1,71 @@
+import time
+
+
+class PhaseEvent:
+    """What one phase of a conversion did to the grammar."""
+    __slots__ = ("phase", "non_terminal", "wall_time", "rules_before", "rules_after",
+                 "new_non_terminals", "iterations")
+
+    def __init__(self, phase, non_terminal, wall_time, rules_before, rules_after, new_non_terminals, iterations):
+        self.phase = phase
+        # set for phases that run once per non-terminal (sort, left_recursion)
+        self.non_terminal = non_terminal
+        self.wall_time = wall_time
+        self.rules_before = rules_before
+        self.rules_after = rules_after
+        self.new_non_terminals = new_non_terminals
+        self.iterations = iterations
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return "PhaseEvent(" + ", ".join(name + "=" + repr(getattr(self, name)) for name in self.__slots__) + ")"
+
+
+class Observable:
+    """
+    Base of Simplifier and Converter. Observers are callables taking a PhaseEvent;
+    without them a phase is a plain method call.
+    """
+
+    def attach(self, observer):
+        self.observers.append(observer)
+        return observer
+
+    def run_phase(self, phase, method, *args, non_terminal=None):
+        if not self.observers:
+            return method(*args)
+
+        rules_before = len(self.grammar.rules)
+        non_terminals_before = set(self.grammar.non_terminals)
+        iterations_before = self.rewrites[phase]
+        start = time.perf_counter()
+        result = method(*args)
+        wall_time = time.perf_counter() - start
+
+        event = PhaseEvent(phase, non_terminal, wall_time, rules_before, len(self.grammar.rules),
+                           sorted(self.grammar.non_terminals - non_terminals_before),
+                           self.rewrites[phase] - iterations_before)
+        for observer in self.observers:
+            observer(event)
+        return result
+
+
+class PhaseLog(list):
+    """Observer that keeps every event, e.g. converter.attach(PhaseLog())."""
+
+    def __call__(self, event):
+        self.append(event)
+
+    def totals(self):
+        """Events of the same phase merged into one dict per phase, in first-seen order."""
+        totals = dict()
+        for event in self:
+            total = totals.setdefault(event.phase, {"wall_time": 0.0, "rules_before": event.rules_before,
+                                                    "rules_after": 0, "new_non_terminals": [], "iterations": 0})
+            total["wall_time"] += event.wall_time
+            total["rules_after"] = event.rules_after
+            total["new_non_terminals"].extend(event.new_non_terminals)
+            total["iterations"] += event.iterations
+        return totals
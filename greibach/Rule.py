@@ -1,4 +1,4 @@
-from util import *
+from .util import *
 
 
 class Rule:
@@ -7,8 +7,32 @@ class Rule:
         RHS = right-hand side
         LHS = left-hand side
         """
-        self.lhs = lhs
-        self.rhs = rhs
+        # RuleStore that indexes this rule; notified whenever lhs or rhs changes
+        self.store = None
+        self._lhs = lhs
+        self._rhs = rhs
+
+    @property
+    def lhs(self):
+        return self._lhs
+
+    @lhs.setter
+    def lhs(self, value):
+        old_value = self._lhs
+        self._lhs = value
+        if self.store is not None:
+            self.store.reindex_lhs(self, old_value)
+
+    @property
+    def rhs(self):
+        return self._rhs
+
+    @rhs.setter
+    def rhs(self, value):
+        old_value = self._rhs
+        self._rhs = value
+        if self.store is not None:
+            self.store.reindex_rhs(self, old_value)
 
     def get_all_rule_symbols(self):
         return list(self.lhs + self.rhs)
@@ -0,0 +1,159 @@
+# rules per chunk of a RuleStore (a chunk is split when it grows past twice this)
+CHUNK_SIZE = 512
+
+
+class RuleStore:
+    """
+    Ordered collection of rules with hash indexes from LHS and from RHS to the rules.
+
+    Behaves like the plain list of rules it replaces (iteration, len, indexing, append,
+    insert, remove), but lookups by LHS or RHS cost O(matches) instead of a scan over all rules.
+    Rules report changes of their lhs/rhs back to the store, so the indexes stay
+    current when a rule is rewritten in place. A rule belongs to one store at a time.
+    """
+
+    def __init__(self, rules=()):
+        # rules in order, split into chunks: a position is found by skipping whole chunks,
+        # and insert or remove shifts only the rules of one chunk.
+        # Rules are keyed by identity: Rule defines __eq__, so it is not hashable
+        self._chunks = []
+        self._chunk_of = dict()
+        self._length = 0
+        self._by_lhs = dict()
+        self._by_rhs = dict()
+        self.extend(rules)
+
+    def __iter__(self):
+        return (rule for chunk in self._chunks for rule in chunk)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("RuleStore index out of range")
+        for chunk in self._chunks:
+            if index < len(chunk):
+                return chunk[index]
+            index -= len(chunk)
+
+    def __contains__(self, rule):
+        return self._find_equal(rule) is not None
+
+    def __repr__(self):
+        return "RuleStore([" + ", ".join(str(rule) for rule in self) + "])"
+
+    def append(self, rule):
+        if not self._chunks or len(self._chunks[-1]) >= CHUNK_SIZE:
+            self._chunks.append([])
+        self._chunks[-1].append(rule)
+        self._add(rule, self._chunks[-1])
+
+    def extend(self, rules):
+        for rule in rules:
+            self.append(rule)
+
+    def insert(self, index, rule):
+        self.insert_many(index, [rule])
+
+    def insert_many(self, index, rules):
+        """Inserts rules one after another starting at index, like list.insert for each of them."""
+        rules = list(rules)
+        if index < 0:
+            index = max(0, index + self._length)
+        if index >= self._length:
+            self.extend(rules)
+            return
+        for position, chunk in enumerate(self._chunks):
+            if index < len(chunk):
+                break
+            index -= len(chunk)
+        chunk[index:index] = rules
+        for rule in rules:
+            self._add(rule, chunk)
+        if len(chunk) > 2 * CHUNK_SIZE:
+            pieces = [chunk[start:start + CHUNK_SIZE] for start in range(0, len(chunk), CHUNK_SIZE)]
+            self._chunks[position:position + 1] = pieces
+            for piece in pieces:
+                for rule in piece:
+                    self._chunk_of[id(rule)] = piece
+
+    def remove(self, rule):
+        chunk = self._chunk_of.get(id(rule))
+        position = None if chunk is None else self._position(chunk, rule)
+        if position is None:
+            rule = self._find_equal(rule)
+            if rule is None:
+                raise ValueError("RuleStore.remove(rule): rule not in store")
+            chunk = self._chunk_of[id(rule)]
+            position = self._position(chunk, rule)
+        del chunk[position]
+        del self._chunk_of[id(rule)]
+        self._length -= 1
+        if not chunk:
+            del self._chunks[self._position(self._chunks, chunk)]
+        self._remove_from_index(self._by_lhs, rule.lhs, rule)
+        self._remove_from_index(self._by_rhs, rule.rhs, rule)
+        rule.store = None
+
+    def find_by_lhs(self, lhs):
+        return list(self._by_lhs.get(lhs, {}).values())
+
+    def find_by_rhs(self, rhs):
+        return list(self._by_rhs.get(rhs, {}).values())
+
+    def positions(self, rules):
+        """Indices of the given rules of this store, in ascending order."""
+        starts = dict()
+        start = 0
+        for chunk in self._chunks:
+            starts[id(chunk)] = start
+            start += len(chunk)
+        return sorted(starts[id(self._chunk_of[id(rule)])] + self._position(self._chunk_of[id(rule)], rule)
+                      for rule in rules)
+
+    def lhs_symbols(self):
+        return self._by_lhs.keys()
+
+    def reindex_lhs(self, rule, old_lhs):
+        self._remove_from_index(self._by_lhs, old_lhs, rule)
+        self._add_to_index(self._by_lhs, rule.lhs, rule)
+
+    def reindex_rhs(self, rule, old_rhs):
+        self._remove_from_index(self._by_rhs, old_rhs, rule)
+        self._add_to_index(self._by_rhs, rule.rhs, rule)
+
+    def _add(self, rule, chunk):
+        self._chunk_of[id(rule)] = chunk
+        self._length += 1
+        self._add_to_index(self._by_lhs, rule.lhs, rule)
+        self._add_to_index(self._by_rhs, rule.rhs, rule)
+        rule.store = self
+
+    @staticmethod
+    def _position(items, item):
+        for position, candidate in enumerate(items):
+            if candidate is item:
+                return position
+        return None
+
+    def _find_equal(self, rule):
+        for candidate in self._by_lhs.get(rule.lhs, {}).values():
+            if candidate == rule:
+                return candidate
+        return None
+
+    @staticmethod
+    def _add_to_index(index, key, rule):
+        index.setdefault(key, dict())[id(rule)] = rule
+
+    @staticmethod
+    def _remove_from_index(index, key, rule):
+        bucket = index[key]
+        del bucket[id(rule)]
+        if not bucket:
+            del index[key]
@@ -1,17 +1,27 @@
-from util import *
+from .Observer import Observable
+from .Rule import Rule
+from .util import *
 
 EPSILON = "ε"
 
+# upper bound on the number of rules null production removal may create
+MAX_NULL_EXPANSION = 10000
 
-class Simplifier:
-    def __init__(self, grammar):
+
+class Simplifier(Observable):
+    def __init__(self, grammar, max_null_expansion=MAX_NULL_EXPANSION, observers=None):
         self.grammar = grammar
         self.messages = []
+        self.max_null_expansion = max_null_expansion
+        self.observers = observers if observers is not None else []
+        # fixpoint passes, rules created by null removal and unit productions removed
+        self.rewrites = {"redundant_rules": 0, "null": 0, "unit": 0}
 
     def simplify(self):
-        self.remove_redundant_rules()
-        self.remove_unit_production()
-        # self.remove_null_production()
+        self.run_phase("redundant_rules", self.remove_redundant_rules)
+        # removing null productions creates unit productions (A -> BC with C nullable gives A -> B)
+        self.run_phase("null", self.remove_null_production)
+        self.run_phase("unit", self.remove_unit_production)
         return self.grammar
 
     def remove_redundant_rules(self):
@@ -20,6 +30,7 @@ class Simplifier:
         current_set = self.grammar.terminals.copy()
         while prev_set != current_set:
             prev_set = current_set.copy()
+            self.rewrites["redundant_rules"] += 1
             for rule in self.grammar.rules:
                 rhs_current_set_intersection = [symbol for symbol in rule.get_rhs_symbols() if symbol in current_set]
                 if len(rhs_current_set_intersection) > 0:
@@ -32,6 +43,7 @@ class Simplifier:
         current_set = {self.grammar.start_symbol}
         while prev_set != current_set:
             prev_set = current_set.copy()
+            self.rewrites["redundant_rules"] += 1
             for rule in self.grammar.rules:
                 if rule.lhs in current_set:
                     new_visited_non_terminals = rule.get_rhs_non_terminals()
@@ -61,19 +73,48 @@ class Simplifier:
             self.messages.append(redundant_rules_str + " were redundant.")
 
     def remove_unit_production(self):
-        unit_productions = []
-        while True:
-            for rule in self.grammar.rules:
-                if self.check_is_unit_production(rule) and \
-                        len((next_indices := self.grammar.find_rules_by_lhs(rule.rhs))):
-                    unit_productions.append(str(rule))
-                    for index in next_indices:
-                        self.grammar.rules[index].lhs = rule.lhs
-                    self.grammar.rules.remove(rule)
-                    break
-            else:
-                break
-        self.generate_unit_production_message(unit_productions)
+        """
+        Every unit production A -> B is dropped and A gets copies of the non-unit rules of
+        every non-terminal reachable from A through unit productions. The rules of B stay
+        where they are, since B may still be used on other right-hand sides.
+        """
+        unit_rules = [rule for rule in self.grammar.rules if self.check_is_unit_production(rule)]
+        unit_targets = dict()
+        for rule in unit_rules:
+            unit_targets.setdefault(rule.lhs, []).append(rule.rhs)
+
+        known_rhs = dict()
+        for rule in self.grammar.rules:
+            if not self.check_is_unit_production(rule):
+                known_rhs.setdefault(rule.lhs, set()).add(rule.rhs)
+
+        new_rules = []
+        for lhs in unit_targets:
+            for target in self.unit_closure(lhs, unit_targets):
+                for rule in self.grammar.rules_by_lhs(target):
+                    if not self.check_is_unit_production(rule) and rule.rhs not in known_rhs.setdefault(lhs, set()):
+                        known_rhs[lhs].add(rule.rhs)
+                        new_rules.append(Rule(lhs, rule.rhs))
+
+        for rule in unit_rules:
+            self.grammar.rules.remove(rule)
+        self.grammar.rules.extend(new_rules)
+        self.rewrites["unit"] += len(unit_rules)
+        self.generate_unit_production_message([str(rule) for rule in unit_rules])
+
+    @staticmethod
+    def unit_closure(non_terminal, unit_targets):
+        """Non-terminals derivable from non_terminal through unit productions, without itself."""
+        visited = {non_terminal}
+        closure = []
+        stack = [non_terminal]
+        while stack:
+            for target in unit_targets.get(stack.pop(), ()):
+                if target not in visited:
+                    visited.add(target)
+                    closure.append(target)
+                    stack.append(target)
+        return closure
 
     def check_is_unit_production(self, rule):
         return len(rule.rhs) == 1 and len(rule.lhs) == 1 and is_non_terminal(rule.rhs) and is_non_terminal(rule.lhs)
@@ -88,16 +129,96 @@ class Simplifier:
             self.messages.append(unit_productions_str + " were unit productions.")
 
     def remove_null_production(self):
-        null_productions = []
-        while True:
-            for rule in self.grammar.rules:
-                if rule["rhs"] == EPSILON:
-                    prev_element = rule["lhs"]
-                    while len(prev_element) != 1:
-                        next_null_rules = self.grammar.find_rules_by_rhs(prev_element)
-            else:
-                break
-        self.generate_null_production_message(null_productions)
+        null_rules = self.grammar.rules_by_rhs(EPSILON)
+        if not null_rules:
+            self.generate_null_production_message([])
+            return
+
+        nullable = self.find_nullable_non_terminals()
+        estimate = self.estimate_null_expansion(nullable)
+        if estimate > self.max_null_expansion:
+            raise ValueError("Removing null productions would create up to " + str(estimate) +
+                             " rules, more than the limit of " + str(self.max_null_expansion) + ".")
+
+        for rule in null_rules:
+            self.grammar.rules.remove(rule)
+
+        # every rule is expanded over its nullable positions; a set per lhs drops duplicates
+        # both between the variants of one rule and against rules that already exist
+        known_rhs = dict()
+        for rule in self.grammar.rules:
+            known_rhs.setdefault(rule.lhs, set()).add(rule.rhs)
+        new_rules = []
+        for rule in self.grammar.rules:
+            for rhs in self.expand_nullable_positions(rule.rhs, nullable):
+                if rhs and rhs not in known_rhs[rule.lhs]:
+                    known_rhs[rule.lhs].add(rhs)
+                    new_rules.append(Rule(rule.lhs, rhs))
+        self.grammar.rules.extend(new_rules)
+        self.rewrites["null"] += len(new_rules)
+
+        start_symbol = self.grammar.start_symbol
+        if start_symbol in nullable:
+            # the empty word stays in the language, but only through a start symbol
+            # that never appears on a right-hand side; the new start symbol copies the
+            # rules of the old one instead of adding a unit production to it
+            if any(start_symbol in rule.rhs for rule in self.grammar.rules):
+                new_start_symbol = "$" if "$" not in self.grammar.non_terminals \
+                    else self.grammar.get_unused_non_terminal()
+                start_rhs = list(dict.fromkeys(rule.rhs for rule in self.grammar.rules_by_lhs(start_symbol)))
+                self.grammar.rules.insert_many(0, [Rule(new_start_symbol, rhs) for rhs in start_rhs])
+                self.grammar.non_terminals.add(new_start_symbol)
+                self.grammar.start_symbol = new_start_symbol
+                self.messages.append("'" + new_start_symbol + "' is now the start symbol.")
+            self.grammar.rules.append(Rule(self.grammar.start_symbol, EPSILON))
+        else:
+            self.grammar.terminals.discard(EPSILON)
+
+        self.generate_null_production_message([str(rule) for rule in null_rules])
+
+    def find_nullable_non_terminals(self):
+        """
+        Worklist over rules: every rule counts its symbols that are not yet known to be
+        nullable, and a rule whose counter drops to zero makes its lhs nullable.
+        """
+        nullable = set()
+        queue = []
+        pending = dict()
+        waiting = dict()
+        for rule in self.grammar.rules:
+            if rule.rhs == EPSILON:
+                if rule.lhs not in nullable:
+                    nullable.add(rule.lhs)
+                    queue.append(rule.lhs)
+                continue
+            # a rule with a terminal can never derive the empty word
+            if not all(is_non_terminal(symbol) for symbol in rule.rhs):
+                continue
+            pending[id(rule)] = len(rule.rhs)
+            for symbol in rule.rhs:
+                waiting.setdefault(symbol, []).append(rule)
+
+        while queue:
+            symbol = queue.pop()
+            for rule in waiting.get(symbol, ()):
+                pending[id(rule)] -= 1
+                if pending[id(rule)] == 0 and rule.lhs not in nullable:
+                    nullable.add(rule.lhs)
+                    queue.append(rule.lhs)
+        return nullable
+
+    def estimate_null_expansion(self, nullable):
+        """Upper bound on the rules after expansion: a rule with k nullable positions gives at most 2^k."""
+        return sum(2 ** sum(symbol in nullable for symbol in rule.rhs)
+                   for rule in self.grammar.rules if rule.rhs != EPSILON)
+
+    @staticmethod
+    def expand_nullable_positions(rhs, nullable):
+        variants = {""}
+        for symbol in rhs:
+            extended = {variant + symbol for variant in variants}
+            variants = extended | variants if symbol in nullable else extended
+        return sorted(variants, key=lambda variant: (-len(variant), variant))
 
     def generate_null_production_message(self, null_productions):
         if len(null_productions) == 0:
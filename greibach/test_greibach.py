@@ -1,7 +1,32 @@
+import copy
 import unittest
 
 from greibach.Grammar import Grammar
+from greibach.Chomsky import Chomsky
 from greibach.Greibach import Greibach
+from greibach.Observer import PhaseLog
+from greibach.Rule import Rule
+from greibach.Simplifier import Simplifier
+from greibach.util import FreshSymbols, is_non_terminal, is_terminal, single_char_non_terminals
+
+
+def derived_words(grammar, max_length):
+    """Words of length at most max_length derived from the start symbol, by fixpoint over the rules."""
+    words = dict()
+    changed = True
+    while changed:
+        changed = False
+        for rule in grammar.rules:
+            prefixes = {""}
+            for symbol in ("" if rule.rhs == "ε" else rule.rhs):
+                options = words.get(symbol, set()) if is_non_terminal(symbol) else {symbol}
+                prefixes = {prefix + option for prefix in prefixes for option in options
+                            if len(prefix) + len(option) <= max_length}
+            new_words = prefixes - words.setdefault(rule.lhs, set())
+            if new_words:
+                words[rule.lhs] |= new_words
+                changed = True
+    return words.get(grammar.start_symbol, set())
 
 
 class TestGreibach(unittest.TestCase):
@@ -13,3 +38,209 @@ class TestGreibach(unittest.TestCase):
         self.assertRaises(Exception, lambda: Grammar(
             Greibach( {'E': ['TE', 'T'], 'T': ['FT', 'F'], 'F': ['(E)', 'a']}
             )))
+
+    def test_greibach_left_recursive_grammar(self):
+        converter = Greibach(Grammar([{"lhs": "S", "rhs": ["SaB", "b", "C"]},
+                                      {"lhs": "B", "rhs": ["bB", "c"]},
+                                      {"lhs": "C", "rhs": ["cC", "d", "SS"]}]))
+        grammar = converter.convert()
+        for rule in grammar.rules:
+            self.assertTrue(is_terminal(rule.rhs[0]), str(rule))
+            self.assertTrue(all(is_non_terminal(symbol) for symbol in rule.rhs[1:]), str(rule))
+        self.assertGreater(converter.rewrites["left_recursion"], 0)
+        self.assertGreater(converter.rewrites["terminal_first"], 0)
+
+    def test_greibach_no_duplicate_rules(self):
+        # S -> aB is reached through both A and C
+        grammar = Greibach(Grammar([{"lhs": "S", "rhs": ["AB", "CB"]}, {"lhs": "A", "rhs": ["a"]},
+                                    {"lhs": "B", "rhs": ["b"]}, {"lhs": "C", "rhs": ["a"]}])).convert()
+        rules = [(rule.lhs, rule.rhs) for rule in grammar.rules]
+        self.assertEqual(len(rules), len(set(rules)))
+        self.assertIn(("S", "aB"), rules)
+
+    def test_greibach_keeps_language(self):
+        for rules in ([{"lhs": "S", "rhs": ["AB"]}, {"lhs": "A", "rhs": ["a"]}, {"lhs": "B", "rhs": ["b", "ε"]}],
+                      [{"lhs": "S", "rhs": ["A", "Bc"]}, {"lhs": "A", "rhs": ["B", "a"]}, {"lhs": "B", "rhs": ["b"]}],
+                      [{"lhs": "S", "rhs": ["SaB", "b", "C"]}, {"lhs": "B", "rhs": ["bB", "c"]},
+                       {"lhs": "C", "rhs": ["cC", "d", "SS"]}]):
+            # Grammar splits the rule dicts in place, so each grammar gets its own copy
+            expected = derived_words(Grammar(copy.deepcopy(rules)), 6)
+            self.assertEqual(derived_words(Greibach(Grammar(copy.deepcopy(rules))).convert(), 6), expected, rules)
+
+
+class TestObserver(unittest.TestCase):
+
+    def test_phase_events(self):
+        converter = Greibach(Grammar([{"lhs": "S", "rhs": ["SaB", "b", "C"]},
+                                      {"lhs": "B", "rhs": ["bB", "c", "ε"]},
+                                      {"lhs": "C", "rhs": ["cC", "d", "SS"]},
+                                      {"lhs": "D", "rhs": ["d"]}]))
+        log = converter.attach(PhaseLog())
+        grammar = converter.convert()
+
+        phases = list(log.totals())
+        self.assertEqual(phases, ["redundant_rules", "null", "unit", "cnf", "sort", "left_recursion",
+                                  "terminal_first"])
+        self.assertEqual(log[-1].rules_after, len(grammar.rules))
+        for previous, event in zip(log, log[1:]):
+            self.assertEqual(previous.rules_after, event.rules_before)
+        totals = log.totals()
+        self.assertEqual(totals["redundant_rules"]["rules_after"], totals["redundant_rules"]["rules_before"] - 1)
+        self.assertEqual(totals["left_recursion"]["iterations"], converter.rewrites["left_recursion"])
+        self.assertEqual(len(totals["left_recursion"]["new_non_terminals"]), len(converter.new_non_terminals))
+        self.assertTrue(all(event.non_terminal for event in log if event.phase in ("sort", "left_recursion")))
+        self.assertGreater(totals["cnf"]["iterations"], 0)
+
+    def test_no_observer(self):
+        converter = Greibach(Grammar([{"lhs": "S", "rhs": ["Sa", "b"]}]))
+        converter.convert()
+        self.assertEqual(converter.observers, [])
+
+
+class TestChomsky(unittest.TestCase):
+
+    def test_chomsky_long_rhs(self):
+        grammar = Chomsky(Grammar([{"lhs": "S", "rhs": ["abcdS", "ab"]}])).convert()
+        for rule in grammar.rules:
+            if len(rule.rhs) == 1:
+                self.assertTrue(is_terminal(rule.rhs) or rule.lhs == "$", str(rule))
+            else:
+                self.assertEqual(len(rule.rhs), 2, str(rule))
+                self.assertTrue(is_non_terminal(rule.rhs[0]) and is_non_terminal(rule.rhs[1]), str(rule))
+        # $ -> S, both S rules, one proxy per terminal and three chain rules for abcdS
+        self.assertEqual(len(grammar.rules), 10)
+
+    def test_chomsky_shares_equal_tails(self):
+        grammar = Chomsky(Grammar([{"lhs": "S", "rhs": ["aAS", "bAS", "cbAS", "c"]},
+                                   {"lhs": "A", "rhs": ["a"]}])).convert()
+        # aAS, bAS and the bAS inside cbAS all end with the one helper for AS
+        self.assertEqual(len(grammar.rules_by_rhs("AS")), 1)
+        helper = grammar.rules_by_rhs("AS")[0].lhs
+        self.assertEqual(len([rule for rule in grammar.rules if rule.rhs.endswith(helper)]), 3)
+
+
+class TestSimplifier(unittest.TestCase):
+
+    def test_nullable_non_terminals(self):
+        grammar = Grammar([{"lhs": "S", "rhs": ["AB", "a"]},
+                           {"lhs": "A", "rhs": ["BB", "a"]},
+                           {"lhs": "B", "rhs": ["ε", "b"]},
+                           {"lhs": "C", "rhs": ["Ca"]}])
+        self.assertEqual(Simplifier(grammar).find_nullable_non_terminals(), {"S", "A", "B"})
+
+    def test_remove_null_production(self):
+        grammar = Grammar([{"lhs": "S", "rhs": ["aAA", "b"]},
+                           {"lhs": "A", "rhs": ["ε", "a"]}])
+        Simplifier(grammar).remove_null_production()
+        self.assertEqual(sorted(rule.rhs for rule in grammar["S"]), ["a", "aA", "aAA", "b"])
+        self.assertEqual([rule.rhs for rule in grammar["A"]], ["a"])
+        self.assertNotIn("ε", grammar.terminals)
+
+    def test_remove_null_production_keeps_empty_word(self):
+        grammar = Grammar([{"lhs": "S", "rhs": ["aSb", "ε"]}])
+        Simplifier(grammar).remove_null_production()
+        self.assertEqual(grammar.start_symbol, "$")
+        self.assertEqual(sorted(rule.rhs for rule in grammar["$"]), ["aSb", "ab", "ε"])
+        self.assertEqual(sorted(rule.rhs for rule in grammar["S"]), ["aSb", "ab"])
+
+    def test_remove_null_production_limit(self):
+        grammar = Grammar([{"lhs": "S", "rhs": ["AAAAAAAAAAAA", "a"]},
+                           {"lhs": "A", "rhs": ["ε", "a"]}])
+        self.assertRaises(ValueError, lambda: Simplifier(grammar, max_null_expansion=1000).remove_null_production())
+        self.assertEqual(len(grammar["A"]), 2)
+
+    def test_remove_unit_production_copies_rules(self):
+        grammar = Grammar([{"lhs": "S", "rhs": ["A", "Bc"]},
+                           {"lhs": "A", "rhs": ["B", "a"]},
+                           {"lhs": "B", "rhs": ["b"]}])
+        expected = derived_words(grammar, 4)
+        Simplifier(grammar).remove_unit_production()
+        self.assertEqual(sorted(rule.rhs for rule in grammar["S"]), ["Bc", "a", "b"])
+        self.assertEqual(sorted(rule.rhs for rule in grammar["A"]), ["a", "b"])
+        self.assertEqual([rule.rhs for rule in grammar["B"]], ["b"])
+        self.assertEqual(derived_words(grammar, 4), expected)
+
+    def test_chomsky_with_lambda(self):
+        grammar = Chomsky(Grammar([{"lhs": "S", "rhs": ["ASA", "a"]},
+                                   {"lhs": "A", "rhs": ["ε", "b"]}])).convert()
+        for rule in grammar.rules:
+            self.assertNotEqual(rule.rhs, "ε", str(rule))
+            self.assertLessEqual(len(rule.rhs), 2, str(rule))
+
+
+class TestRuleStore(unittest.TestCase):
+
+    def setUp(self):
+        self.grammar = Grammar([{"lhs": "S", "rhs": ["AB", "a"]}, {"lhs": "A", "rhs": ["a"]}, {"lhs": "B", "rhs": ["b"]}])
+
+    def test_find_rules_by_lhs_and_rhs(self):
+        self.assertEqual([str(rule) for rule in self.grammar["S"]], ["S  ->  AB", "S  ->  a"])
+        self.assertEqual([rule.lhs for rule in self.grammar.rules_by_rhs("a")], ["A", "S"])
+        self.assertEqual(self.grammar.rules_by_lhs("C"), [])
+        # the old lookups return indices of the rules S -> AB, A -> a, B -> b, S -> a
+        self.assertEqual(self.grammar.find_rules_by_lhs("S"), [0, 3])
+        self.assertEqual(self.grammar.find_rules_by_rhs("a"), [1, 3])
+        self.assertEqual(self.grammar.find_rules_by_lhs("C"), [])
+
+    def test_indexes_follow_in_place_mutation(self):
+        rule = self.grammar["A"][0]
+        rule.lhs = "C"
+        rule.rhs = "c"
+        self.assertEqual(self.grammar["A"], [])
+        self.assertEqual(self.grammar["C"], [rule])
+        self.assertEqual(self.grammar.rules_by_rhs("c"), [rule])
+        self.assertEqual([r.lhs for r in self.grammar.rules_by_rhs("a")], ["S"])
+        self.assertEqual(self.grammar.find_rules_by_rhs("c"), [1])
+
+    def test_indexes_follow_remove(self):
+        rule = self.grammar["B"][0]
+        self.grammar.rules.remove(rule)
+        self.assertEqual(self.grammar["B"], [])
+        self.assertEqual(len(self.grammar.rules), 3)
+        self.assertNotIn(rule, self.grammar.rules)
+
+    def test_positions_after_remove_and_insert(self):
+        rules = self.grammar.rules
+        # the rules are S -> AB, A -> a, B -> b, S -> a
+        rules.remove(rules[1])
+        rules.insert(1, Rule("C", "c"))
+        rules.insert_many(0, [Rule("$", "S"), Rule("$", "a")])
+        self.assertEqual([str(rule) for rule in rules],
+                         ["$  ->  S", "$  ->  a", "S  ->  AB", "C  ->  c", "B  ->  b", "S  ->  a"])
+        self.assertEqual(rules[3].lhs, "C")
+        self.assertEqual([rule.lhs for rule in rules[-2:]], ["B", "S"])
+        removed = rules[0]
+        rules.remove(removed)
+        rules.append(removed)
+        self.assertEqual([rule.lhs for rule in rules], ["$", "S", "C", "B", "S", "$"])
+        self.assertEqual(len(rules), 6)
+        self.assertEqual(self.grammar.find_rules_by_lhs("$"), [0, 5])
+
+    def test_indices_across_chunks(self):
+        rules = [{"lhs": "S", "rhs": ["a" * (length + 1) for length in range(1500)]}]
+        grammar = Grammar(rules)
+        for rule in grammar.rules[100:1400:3]:
+            grammar.rules.remove(rule)
+        grammar.rules.insert(700, Rule("S", "b"))
+        expected = [index for index, rule in enumerate(grammar.rules) if len(rule.rhs) % 2 == 0]
+        self.assertEqual(grammar.rules.positions(rule for rule in grammar.rules_by_lhs("S") if len(rule.rhs) % 2 == 0),
+                         expected)
+        self.assertEqual(grammar.find_rules_by_rhs("b"), [700])
+
+
+class TestFreshSymbols(unittest.TestCase):
+
+    def test_allocates_past_ascii_letters(self):
+        used = {"S", "A"}
+        fresh_symbols = FreshSymbols(single_char_non_terminals())
+        symbols = [fresh_symbols.allocate(used) for _ in range(100)]
+        self.assertEqual(symbols[:3], ["B", "C", "D"])
+        self.assertEqual(len(set(symbols)), 100)
+        self.assertNotIn("S", symbols)
+        self.assertTrue(all(len(symbol) == 1 and is_non_terminal(symbol) for symbol in symbols))
+
+    def test_exhausted_allocator_raises(self):
+        fresh_symbols = FreshSymbols("AB")
+        used = {"A"}
+        self.assertEqual(fresh_symbols.allocate(used), "B")
+        self.assertRaises(ValueError, lambda: fresh_symbols.allocate(used))
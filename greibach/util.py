@@ -1,6 +1,55 @@
+import string
+import sys
+from itertools import count
+
+
 def is_terminal(char):
     return char.islower()
 
 
 def is_non_terminal(char):
     return char.isupper() or char == '$'
+
+
+def single_char_non_terminals():
+    """ASCII capitals first, then every other single Unicode character that is_non_terminal accepts."""
+    yield from string.ascii_uppercase
+    for code in range(128, sys.maxunicode + 1):
+        if chr(code).isupper():
+            yield chr(code)
+
+
+def single_char_terminals():
+    """ASCII lowercase letters first, then every other single Unicode character that is_terminal accepts."""
+    yield from string.ascii_lowercase
+    for code in range(128, sys.maxunicode + 1):
+        if chr(code).islower() and chr(code) != "ε":
+            yield chr(code)
+
+
+def indexed_non_terminals(letters=string.ascii_uppercase):
+    """A, B, ..., Z, A1, B1, ..., Z1, A2, ... without end."""
+    yield from letters
+    for index in count(1):
+        for letter in letters:
+            yield letter + str(index)
+
+
+class FreshSymbols:
+    """
+    Deterministic allocator of unused symbols.
+
+    Walks a fixed sequence of candidate names once, skipping the ones already in use,
+    so repeated conversions of the same grammar produce the same names and every call
+    costs amortized O(1).
+    """
+
+    def __init__(self, candidates):
+        self.candidates = iter(candidates)
+
+    def allocate(self, used):
+        for symbol in self.candidates:
+            if symbol not in used:
+                used.add(symbol)
+                return symbol
+        raise ValueError("No unused symbols are left.")
@@ -0,0 +1,361 @@
+""" LR(0)- и LALR(1)-таблицы для CFG (grammar.py) или Grammar (main.py).
+
+Автомат LR(0) строится по ядрам: ядро (отсортированный кортеж пунктов) - ключ словаря
+состояний, поэтому одинаковые множества пунктов создаются один раз. Пункт - одно число:
+номер первого пункта правила плюс позиция точки.
+
+Предпросмотры LALR(1) считаются методом ДеРемера-Пеннелло по отношениям reads, includes и
+lookback. Операция digraph выполняется через компоненты сильной связности (analysis.py): все
+вершины одной компоненты получают одно множество, и обход идёт без рекурсии.
+Множества терминалов - битовые маски, бит терминала = номер его столбца в ACTION.
+
+Готовые таблицы (LRTables) сохраняются в компактный двоичный файл, который загружается
+несколькими вызовами array.frombytes - без построения автомата при запуске процесса.
+"""
+import struct
+import sys
+from array import array
+
+from analysis import END_OF_INPUT, strongly_connected_components
+from compact import CompactGrammar
+
+# после точки ничего нет
+COMPLETE = -1
+
+# левая часть дополнительного правила S' -> аксиома
+AUGMENTED = -1
+
+# заголовок файла таблиц: сигнатура, версия формата, числа состояний, терминалов,
+# нетерминалов и правил, номер аксиомы
+FILE_MAGIC = b'LALR'
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct('<4sHIIIII')
+
+
+class LRConflict:
+    __slots__ = ('state', 'terminal', 'kind', 'actions')
+
+    def __init__(self, state, terminal, kind, actions):
+        self.state = state
+        self.terminal = terminal
+        # 'shift/reduce' или 'reduce/reduce'
+        self.kind = kind
+        self.actions = actions
+
+    def __str__(self):
+        return '{kind} conflict in state {state} on {terminal}: {actions}'.format(
+            kind=self.kind, state=self.state, terminal=self.terminal, actions=', '.join(self.actions))
+
+
+def digraph(node_count: int, edges: list, base: list) -> list:
+    """ F(x) = base(x) | объединение F(y) по всем рёбрам x -> y """
+    result = list(base)
+    # компоненты идут начиная с тех, из которых никуда нельзя выйти
+    for component in strongly_connected_components(range(node_count), lambda node: edges[node]):
+        bits = 0
+        for node in component:
+            bits |= result[node]
+            for successor in edges[node]:
+                bits |= result[successor]
+        for node in component:
+            result[node] = bits
+    return result
+
+
+class LALRBuilder:
+    def __init__(self, grammar):
+        compact = CompactGrammar.from_any(grammar)
+        self.grammar = compact
+        self.non_terminal_count = compact.non_terminal_count
+        self.terminal_count = len(compact.symbols) - compact.non_terminal_count
+        # столбец конца входа в ACTION
+        self.end = self.terminal_count
+
+        # правило 0 - дополнительное S' -> аксиома, правило p + 1 - правило p компактной грамматики
+        self.production_lhs = [AUGMENTED] + [non_terminal for non_terminal in range(compact.non_terminal_count)
+                                             for _ in compact.productions_of(non_terminal)]
+        self.production_rhs = [(compact.axiom,)] + [tuple(compact.rhs_of(production))
+                                                    for production in range(compact.production_count())]
+        self.nullable = compact.nullable()
+
+        # пункты: символ после точки и правило
+        self.item_base = []
+        self.item_symbol = array('i')
+        self.item_production = array('i')
+        for production, rule_right_side in enumerate(self.production_rhs):
+            self.item_base.append(len(self.item_symbol))
+            self.item_symbol.extend(rule_right_side)
+            self.item_symbol.append(COMPLETE)
+            self.item_production.extend([production] * (len(rule_right_side) + 1))
+
+        self.prediction = [[] for _ in range(self.non_terminal_count)]
+        for production in range(1, len(self.production_rhs)):
+            self.prediction[self.production_lhs[production]].append(self.item_base[production])
+
+        self.kernels = []
+        self.transitions = []
+        # правила, которые в состоянии разобраны целиком (пункт с точкой в конце)
+        self.completed = []
+        self.build_lr0()
+
+    # ---------- автомат LR(0) ----------
+
+    def closure(self, kernel: tuple) -> list:
+        items = list(kernel)
+        predicted = set()
+        for item in items:
+            symbol = self.item_symbol[item]
+            if 0 <= symbol < self.non_terminal_count and symbol not in predicted:
+                predicted.add(symbol)
+                items.extend(self.prediction[symbol])
+        return items
+
+    def build_lr0(self):
+        state_ids = dict()
+
+        def state_of(kernel):
+            if kernel not in state_ids:
+                state_ids[kernel] = len(self.kernels)
+                self.kernels.append(kernel)
+            return state_ids[kernel]
+
+        state_of((self.item_base[0],))
+        state = 0
+        while state < len(self.kernels):
+            moves = dict()
+            completed = []
+            for item in self.closure(self.kernels[state]):
+                symbol = self.item_symbol[item]
+                if symbol == COMPLETE:
+                    completed.append(self.item_production[item])
+                else:
+                    moves.setdefault(symbol, []).append(item + 1)
+            self.transitions.append({symbol: state_of(tuple(sorted(items))) for symbol, items in moves.items()})
+            self.completed.append(completed)
+            state += 1
+
+    # ---------- предпросмотры ДеРемера-Пеннелло ----------
+
+    def lookaheads(self) -> dict:
+        """ (состояние, правило) -> маска терминалов предпросмотра """
+        non_terminal_count = self.non_terminal_count
+
+        # переходы по нетерминалам - вершины всех отношений
+        transition_ids = dict()
+        for state, moves in enumerate(self.transitions):
+            for symbol in moves:
+                if symbol < non_terminal_count:
+                    transition_ids[(state, symbol)] = len(transition_ids)
+        transitions = list(transition_ids)
+
+        direct_reads = []
+        reads = []
+        for state, symbol in transitions:
+            target = self.transitions[state][symbol]
+            bits = 0
+            edges = []
+            for next_symbol in self.transitions[target]:
+                if next_symbol >= non_terminal_count:
+                    bits |= 1 << (next_symbol - non_terminal_count)
+                elif self.nullable[next_symbol]:
+                    edges.append(transition_ids[(target, next_symbol)])
+            direct_reads.append(bits)
+            reads.append(edges)
+        # после аксиомы в начальном состоянии следует конец входа
+        if (0, self.grammar.axiom) in transition_ids:
+            direct_reads[transition_ids[(0, self.grammar.axiom)]] |= 1 << self.end
+        read = digraph(len(transitions), reads, direct_reads)
+
+        # nullable_suffix[p][i] - обнуляема ли часть правила p после позиции i
+        nullable_suffix = []
+        for rule_right_side in self.production_rhs:
+            suffix = [True] * (len(rule_right_side) + 1)
+            for position in reversed(range(len(rule_right_side))):
+                symbol = rule_right_side[position]
+                suffix[position] = suffix[position + 1] and \
+                    symbol < non_terminal_count and bool(self.nullable[symbol])
+            nullable_suffix.append(suffix)
+
+        includes = [[] for _ in transitions]
+        lookback = dict()
+        for transition, (start, non_terminal) in enumerate(transitions):
+            for production in self.grammar.productions_of(non_terminal):
+                production += 1
+                state = start
+                for position, symbol in enumerate(self.production_rhs[production]):
+                    if symbol < non_terminal_count and nullable_suffix[production][position + 1]:
+                        includes[transition_ids[(state, symbol)]].append(transition)
+                    state = self.transitions[state][symbol]
+                lookback.setdefault((state, production), []).append(transition)
+        follow = digraph(len(transitions), includes, read)
+
+        result = dict()
+        for key, sources in lookback.items():
+            bits = 0
+            for transition in sources:
+                bits |= follow[transition]
+            result[key] = bits
+        return result
+
+    # ---------- таблицы ----------
+
+    def build_tables(self, lalr: bool = True):
+        """ Таблицы ACTION/GOTO и список конфликтов. Конфликты разрешаются как в yacc:
+        перенос важнее свёртки, из двух свёрток выигрывает правило с меньшим номером.
+        При lalr=False свёртка ставится на все терминалы (таблица LR(0)) """
+        width = self.terminal_count + 1
+        action = array('i', [0]) * (len(self.kernels) * width)
+        goto = array('i', [-1]) * (len(self.kernels) * self.non_terminal_count)
+        conflicts = []
+        lookaheads = self.lookaheads() if lalr else None
+        all_terminals = (1 << width) - 1
+
+        for state, moves in enumerate(self.transitions):
+            for symbol, target in moves.items():
+                if symbol < self.non_terminal_count:
+                    goto[state * self.non_terminal_count + symbol] = target
+                else:
+                    action[state * width + symbol - self.non_terminal_count] = target + 1
+
+            for production in self.completed[state]:
+                if production == 0:
+                    bits = 1 << self.end
+                elif lalr:
+                    bits = lookaheads.get((state, production), 0)
+                else:
+                    bits = all_terminals
+                column = 0
+                while bits:
+                    if bits & 1:
+                        self.set_reduce(action, state, column, production, conflicts)
+                    bits >>= 1
+                    column += 1
+
+        tables = LRTables(
+            [self.grammar.name(symbol) for symbol in range(self.non_terminal_count, len(self.grammar.symbols))],
+            [self.grammar.name(symbol) for symbol in range(self.non_terminal_count)],
+            self.grammar.axiom,
+            array('i', self.production_lhs),
+            array('i', [len(rule_right_side) for rule_right_side in self.production_rhs]),
+            action, goto)
+        return tables, conflicts
+
+    def set_reduce(self, action: array, state: int, column: int, production: int, conflicts: list):
+        cell = state * (self.terminal_count + 1) + column
+        current = action[cell]
+        if current == 0:
+            action[cell] = -(production + 1)
+            return
+        terminal = END_OF_INPUT if column == self.end else self.grammar.name(column + self.non_terminal_count)
+        if current > 0:
+            conflicts.append(LRConflict(state, terminal, 'shift/reduce',
+                                        ['shift ' + str(current - 1), 'reduce ' + self.production_str(production)]))
+        else:
+            conflicts.append(LRConflict(state, terminal, 'reduce/reduce',
+                                        ['reduce ' + self.production_str(-current - 1),
+                                         'reduce ' + self.production_str(production)]))
+            action[cell] = -(min(production, -current - 1) + 1)
+
+    def production_str(self, production: int) -> str:
+        lhs = self.production_lhs[production]
+        return (self.grammar.name(lhs) if lhs != AUGMENTED else "S'") + ' -> ' + \
+            (''.join(self.grammar.name(symbol) for symbol in self.production_rhs[production]) or 'ε')
+
+
+class LRTables:
+    """ Таблицы ACTION/GOTO и всё, что нужно для разбора без грамматики.
+    ACTION: 0 - ошибка, k > 0 - перенос и переход в состояние k - 1,
+    k < 0 - свёртка по правилу -k - 1 (свёртка по правилу 0 - допуск) """
+
+    def __init__(self, terminal_names: list, non_terminal_names: list, axiom: int,
+                 production_lhs: array, production_length: array, action: array, goto: array):
+        self.terminal_names = terminal_names
+        self.non_terminal_names = non_terminal_names
+        self.axiom = axiom
+        self.production_lhs = production_lhs
+        self.production_length = production_length
+        self.action = action
+        self.goto = goto
+        self.width = len(terminal_names) + 1
+        self.terminal_ids = {name: column for column, name in enumerate(terminal_names)}
+
+    def state_count(self) -> int:
+        return len(self.action) // self.width
+
+    # ---------- двоичный файл ----------
+
+    def save(self, path: str):
+        names = [name.encode('utf-8') for name in self.terminal_names + self.non_terminal_names]
+        arrays = [self.production_lhs, self.production_length, self.action, self.goto,
+                  array('i', [len(name) for name in names])]
+        with open(path, 'wb') as file:
+            file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, self.state_count(), len(self.terminal_names),
+                                        len(self.non_terminal_names), len(self.production_lhs), self.axiom))
+            for values in arrays:
+                if sys.byteorder == 'big':
+                    values = array('i', values)
+                    values.byteswap()
+                file.write(values.tobytes())
+            file.write(b''.join(names))
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, 'rb') as file:
+            data = file.read()
+        magic, version, states, terminals, non_terminals, productions, axiom = FILE_HEADER.unpack_from(data)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            raise ValueError("Not an LR tables file (or an unsupported version): " + path)
+
+        offset = FILE_HEADER.size
+        arrays = []
+        for length in (productions, productions, states * (terminals + 1), states * non_terminals,
+                       terminals + non_terminals):
+            values = array('i')
+            values.frombytes(data[offset:offset + length * values.itemsize])
+            if sys.byteorder == 'big':
+                values.byteswap()
+            arrays.append(values)
+            offset += length * values.itemsize
+
+        names = []
+        for length in arrays.pop():
+            names.append(data[offset:offset + length].decode('utf-8'))
+            offset += length
+        production_lhs, production_length, action, goto = arrays
+        return cls(names[:terminals], names[terminals:], axiom, production_lhs, production_length, action, goto)
+
+    # ---------- разбор ----------
+
+    def parse(self, word):
+        """ Дерево вывода слова (строки или последовательности терминалов) или None.
+        Узел - пара (имя нетерминала, список детей), лист - имя терминала """
+        end = self.width - 1
+        non_terminal_count = len(self.non_terminal_names)
+        columns = (self.terminal_ids.get(terminal, -1) for terminal in word)
+        states = [0]
+        nodes = []
+        column = next(columns, end)
+        while True:
+            if column == -1:
+                return None
+            entry = self.action[states[-1] * self.width + column]
+            if entry > 0:
+                states.append(entry - 1)
+                nodes.append(self.terminal_names[column])
+                column = next(columns, end)
+            elif entry == -1:
+                return nodes[0]
+            elif entry < 0:
+                production = -entry - 1
+                length = self.production_length[production]
+                children = nodes[len(nodes) - length:]
+                del nodes[len(nodes) - length:]
+                del states[len(states) - length:]
+                lhs = self.production_lhs[production]
+                states.append(self.goto[states[-1] * non_terminal_count + lhs])
+                nodes.append((self.non_terminal_names[lhs], children))
+            else:
+                return None
+
+    def accepts(self, word) -> bool:
+        return self.parse(word) is not None
@@ -0,0 +1,239 @@
+""" Предсказывающий LL(1)-анализатор для CFG (grammar.py).
+
+Грамматика сначала освобождается от бесполезных символов и левой рекурсии (как в
+CFG.remove_left_recursion, но пустые правила сохраняются), а затем проходит через левую
+факторизацию: устранение рекурсии оставляет правила вида A' -> a | aA' с общим началом,
+которые LL(1)-таблица различить не может. Таблица - плоский массив, ячейка
+[нетерминал * ширина + терминал] хранит номер правила (или -1). Разбор идёт по явному стеку,
+без рекурсии Python, за O(длина слова) шагов.
+"""
+from array import array
+
+from analysis import (END_OF_INPUT, left_recursion_plan, productive_non_terminals, reachable_symbols,
+                      strongly_connected_components)
+from grammar import CFG, Token
+
+# пустая правая часть в CFG
+EMPTY = Token('', 'char')
+
+
+class Conflict:
+    __slots__ = ('non_terminal', 'terminal', 'productions')
+
+    def __init__(self, non_terminal, terminal, productions):
+        self.non_terminal = non_terminal
+        self.terminal = terminal
+        self.productions = productions
+
+    def __str__(self):
+        return 'LL(1) conflict in M[{non_terminal}, {terminal}]: {productions}'.format(
+            non_terminal=self.non_terminal, terminal=self.terminal,
+            productions=' | '.join(self.productions))
+
+
+def fresh_non_terminal(grammar: CFG, base: Token) -> Token:
+    """ Новый нетерминал с именем base', base'', ... (как в remove_left_recursion) """
+    lexem = base.lexem + '\''
+    while Token(lexem, 'char') in grammar.non_terminals or Token(lexem, 'char') in grammar.terminals:
+        lexem += '\''
+    return Token(lexem, 'char')
+
+
+def left_factor(grammar: CFG) -> CFG:
+    """ Возвращает грамматику, в которой у правых частей одного нетерминала нет общих начал
+    (при этом нынешнюю грамматику не меняет) """
+    new_grammar = grammar.copy()
+    new_grammar.non_terminals = set(grammar.non_terminals)
+    new_grammar.rules = {non_terminal: [list(rule_output) for rule_output in rule_outputs]
+                         for non_terminal, rule_outputs in grammar.rules.items()}
+
+    queue = list(new_grammar.rules)
+    while queue:
+        non_terminal = queue.pop()
+        # без повторов и без лексемы пустой цепочки внутри правых частей
+        rule_outputs = list(dict.fromkeys(tuple(symbol for symbol in rule_output if symbol != EMPTY)
+                                          for rule_output in new_grammar.rules[non_terminal]))
+        groups = dict()
+        for rule_output in rule_outputs:
+            groups.setdefault(rule_output[:1], []).append(rule_output)
+
+        new_rule_outputs = []
+        for first_symbol, group in groups.items():
+            if len(group) == 1 or not first_symbol:
+                new_rule_outputs.extend(group)
+                continue
+            # общее начало всей группы
+            prefix_length = 1
+            shortest = min(len(rule_output) for rule_output in group)
+            while prefix_length < shortest and \
+                    all(rule_output[prefix_length] == group[0][prefix_length] for rule_output in group):
+                prefix_length += 1
+
+            new_non_terminal = fresh_non_terminal(new_grammar, non_terminal)
+            new_grammar.non_terminals.add(new_non_terminal)
+            new_grammar.rules[new_non_terminal] = [rule_output[prefix_length:] for rule_output in group]
+            queue.append(new_non_terminal)
+            new_rule_outputs.append(group[0][:prefix_length] + (new_non_terminal,))
+
+        new_grammar.rules[non_terminal] = [list(rule_output) if rule_output else [EMPTY]
+                                           for rule_output in new_rule_outputs]
+    return new_grammar
+
+
+def remove_useless_symbols(grammar: CFG) -> CFG:
+    """ CFG.remove_useless_symbols, при котором пустые правила остаются: там пустая цепочка
+    не считается хорошей, и правила A -> ε выбрасываются вместе с языком, который они дают.
+    Для пустого языка у аксиомы не остаётся ни одного правила """
+    productive = productive_non_terminals(grammar.rules, grammar.terminals | {EMPTY})
+    if grammar.axiom not in productive:
+        return grammar.token_constructor({grammar.axiom}, set(), {grammar.axiom: []}, grammar.axiom)
+    rules = {non_terminal: [list(rule_output) for rule_output in rule_outputs
+                            if all(symbol in productive or symbol in grammar.terminals or symbol == EMPTY
+                                   for symbol in rule_output)]
+             for non_terminal, rule_outputs in grammar.rules.items() if non_terminal in productive}
+    reachable_terminals, reachable_non_terminals = reachable_symbols(rules, grammar.axiom, grammar.terminals,
+                                                                     productive)
+    rules = {non_terminal: rule_outputs for non_terminal, rule_outputs in rules.items()
+             if non_terminal in reachable_non_terminals}
+    return grammar.token_constructor(reachable_non_terminals, reachable_terminals, rules, grammar.axiom)
+
+
+def remove_left_recursion(grammar: CFG) -> CFG:
+    """ CFG.remove_left_recursion с сохранением пустых правил """
+    grammar = remove_useless_symbols(grammar)
+    return grammar.eliminate_left_recursion(left_recursion_plan(grammar.rules))
+
+
+def is_left_recursive(grammar: CFG, first_follow) -> bool:
+    """ Есть ли цикл по левым углам с учётом обнуляемых начал (A -> B A при обнуляемом B).
+    Такую скрытую рекурсию remove_left_recursion не видит; грамматика с ней не LL(1),
+    а разбор по её таблице может не закончиться """
+    def left_corners(non_terminal):
+        for rule_output in grammar.rules.get(non_terminal, ()):
+            for symbol in first_follow.first_prefix(rule_output):
+                if symbol in grammar.non_terminals:
+                    yield symbol
+
+    for component in strongly_connected_components(sorted(grammar.non_terminals), left_corners):
+        if len(component) > 1 or component[0] in set(left_corners(component[0])):
+            return True
+    return False
+
+
+class LL1Parser:
+    def __init__(self, grammar: CFG, left_factoring: bool = True):
+        grammar = remove_left_recursion(grammar)
+        if left_factoring:
+            grammar = left_factor(grammar)
+        self.grammar = grammar
+        first_follow = grammar.get_first_follow()
+
+        # нетерминалы - коды 0..N-1, терминалы - N + номер бита в FirstFollow,
+        # последний код - конец входа
+        self.non_terminals = sorted(grammar.non_terminals)
+        self.non_terminal_ids = {non_terminal: index for index, non_terminal in enumerate(self.non_terminals)}
+        self.terminals = first_follow.terminals
+        terminal_index = {terminal: index for index, terminal in enumerate(self.terminals)}
+        self.terminal_ids = {terminal.lexem: index for terminal, index in terminal_index.items()}
+        self.width = len(self.terminals) + 1
+        self.end = len(self.terminals)
+        self.axiom = self.non_terminal_ids[grammar.axiom]
+
+        def code(symbol):
+            if symbol in self.non_terminal_ids:
+                return self.non_terminal_ids[symbol]
+            return len(self.non_terminals) + terminal_index[symbol]
+
+        # правила: левая часть и правая часть в кодах
+        self.production_lhs = []
+        self.production_rhs = []
+        self.table = array('i', [-1]) * (len(self.non_terminals) * self.width)
+        self.conflicts = []
+        conflicting_cells = dict()
+        for non_terminal in grammar.rules:
+            for rule_output in grammar.rules[non_terminal]:
+                symbols = [symbol for symbol in rule_output if symbol != EMPTY]
+                production = len(self.production_rhs)
+                self.production_lhs.append(self.non_terminal_ids[non_terminal])
+                self.production_rhs.append(tuple(code(symbol) for symbol in symbols))
+
+                bits, nullable = first_follow.first_of(symbols)
+                if nullable:
+                    bits |= first_follow.follow[non_terminal]
+                terminal = 0
+                while bits:
+                    if bits & 1:
+                        self.set_cell(self.non_terminal_ids[non_terminal], terminal, production, conflicting_cells)
+                    bits >>= 1
+                    terminal += 1
+
+        for (non_terminal, terminal), productions in conflicting_cells.items():
+            self.conflicts.append(Conflict(self.non_terminals[non_terminal].lexem,
+                                           self.terminal_name(terminal),
+                                           [self.production_str(production) for production in productions]))
+        self.left_recursive = is_left_recursive(grammar, first_follow)
+
+    def set_cell(self, non_terminal: int, terminal: int, production: int, conflicting_cells: dict):
+        """ В ячейке остаётся первое правило, остальные попадают в отчёт о конфликтах """
+        cell = non_terminal * self.width + terminal
+        if self.table[cell] == -1:
+            self.table[cell] = production
+        elif self.table[cell] != production:
+            conflicting_cells.setdefault((non_terminal, terminal), [self.table[cell]]).append(production)
+
+    def is_ll1(self) -> bool:
+        return not self.conflicts
+
+    def symbol_name(self, code: int) -> str:
+        if code < len(self.non_terminals):
+            return self.non_terminals[code].lexem
+        return self.terminal_name(code - len(self.non_terminals))
+
+    def terminal_name(self, terminal: int) -> str:
+        return END_OF_INPUT if terminal == self.end else self.terminals[terminal].lexem
+
+    def production_str(self, production: int) -> str:
+        return self.symbol_name(self.production_lhs[production]) + ' -> ' + \
+            (''.join(self.symbol_name(code) for code in self.production_rhs[production]) or 'ε')
+
+    def parse(self, word):
+        """ Дерево вывода слова (строки или последовательности лексем) или None.
+        Узел - пара (имя нетерминала, список детей), лист - лексема терминала.
+        Для грамматики со скрытой левой рекурсией - ValueError: разбор мог бы не закончиться """
+        if self.left_recursive:
+            raise ValueError("The grammar is left-recursive through nullable symbols, it cannot be parsed by LL(1).")
+        terminals = []
+        for lexem in word:
+            if lexem not in self.terminal_ids:
+                return None
+            terminals.append(self.terminal_ids[lexem])
+        terminals.append(self.end)
+
+        non_terminal_count = len(self.non_terminals)
+        root = (self.non_terminals[self.axiom].lexem, [])
+        # стек: (код символа, список детей узла-родителя)
+        stack = [(self.axiom, None)]
+        position = 0
+        while stack:
+            symbol, children = stack.pop()
+            lookahead = terminals[position]
+            if symbol >= non_terminal_count:
+                if symbol - non_terminal_count != lookahead:
+                    return None
+                children.append(self.terminals[lookahead].lexem)
+                position += 1
+                continue
+
+            production = self.table[symbol * self.width + lookahead]
+            if production == -1:
+                return None
+            node = root if children is None else (self.non_terminals[symbol].lexem, [])
+            if children is not None:
+                children.append(node)
+            for code in reversed(self.production_rhs[production]):
+                stack.append((code, node[1]))
+
+        return root if terminals[position] == self.end else None
+
+    def accepts(self, word) -> bool:
+        return self.parse(word) is not None
@@ -4,6 +4,11 @@ from abc import ABC, abstractmethod
 import string
 from typing import Union
 
+from analysis import (AnalysisCache, FirstFollow, LeftRecursionPlan, chain_closure, eliminate_left_recursion,
+                      is_chain_rule, left_recursion_plan, productive_non_terminals, reachable_symbols)
+from greibach.util import FreshSymbols, indexed_non_terminals
+from watched import Version, WatchedDict, WatchedSet
+
 
 class Grammar:
     term = string.ascii_lowercase
@@ -20,6 +25,10 @@ class Grammar:
                     if symbol not in terminals and symbol not in non_terminals:
                         raise Exception("At least one symbol from the right side of the " +
                                         "rules is not in symbols of grammar.")
+        # счётчик изменений правил и символов и результаты анализов для текущей версии
+        self.changes = Version()
+        self.analysis_cache = AnalysisCache()
+
         # нетерминалы
         self.non_terminals = non_terminals
 
@@ -32,48 +41,57 @@ class Grammar:
         # аксиома (начальный символ грамматики)
         self.axiom = axiom
 
-    def __eq__(self, other):
-        return self.non_terminals == other.non_terminals and self.terminals == other.terminals \
-               and self.rules == other.rules and self.axiom == other.axiom
+        # источник новых нетерминалов (A, ..., Z, A1, ..., Z1, A2, ...)
+        self.fresh_symbols = FreshSymbols(indexed_non_terminals(self.var))
 
-    def remove_unreachable_symbols(self) -> Grammar:
-        """ Возвращает грамматику без недостижимых символов (при этом нынешнюю грамматику не меняет) """
-        # достижимые нетерминалы
-        reachable_non_terminals = {self.axiom}
+    @property
+    def rules(self) -> dict:
+        return self._rules
 
-        # используется, чтобы не проходится по одним и тем же нетерминалам на каждой итерации
-        reachable_non_terminals_original = reachable_non_terminals.copy()
+    @rules.setter
+    def rules(self, rules: dict):
+        self._rules = WatchedDict(self.changes, rules)
+        self.changes.bump()
 
-        # достижимые терминалы
-        reachable_terminals = set()
+    @property
+    def terminals(self) -> set:
+        return self._terminals
 
-        while True:
-            for rule_left_side in self.rules:
+    @terminals.setter
+    def terminals(self, terminals: set):
+        self._terminals = WatchedSet(self.changes, terminals)
+        self.changes.bump()
 
-                # проходимся по правилам и проверяем,
-                # есть ли левая сторона правила в достижимых нетерминалах
-                if rule_left_side in reachable_non_terminals_original:
-                    for rule_output in self.rules[rule_left_side]:
+    @property
+    def non_terminals(self) -> set:
+        return self._non_terminals
 
-                        # проходимся по выводам правила и добавляем символы из этих выводов в достижимые
-                        for symbol in rule_output:
-                            if symbol in self.terminals:
-                                reachable_terminals.add(symbol)
-                            if symbol in self.non_terminals:
-                                reachable_non_terminals_original.add(symbol)
+    @non_terminals.setter
+    def non_terminals(self, non_terminals: set):
+        self._non_terminals = WatchedSet(self.changes, non_terminals)
+        self.changes.bump()
 
-            # убираем все достижимые нетерминалы,
-            # которые уже проходили через верхний цикл (difference - разность множеств)
-            reachable_non_terminals_original = reachable_non_terminals_original.difference(reachable_non_terminals)
+    @property
+    def axiom(self) -> str:
+        return self._axiom
 
-            # проверяем, были ли найдены все достижимые нетерминалы
-            if len(reachable_non_terminals_original) == 0:
-                break
+    @axiom.setter
+    def axiom(self, axiom: str):
+        # от аксиомы зависят достижимость, FOLLOW и план устранения левой рекурсии
+        self._axiom = axiom
+        self.changes.bump()
 
-            # если нет, то добавляем достижимые нетерминалы,
-            # которые были найденны на последней итерации (union - объединение множеств)
-            else:
-                reachable_non_terminals = reachable_non_terminals.union(reachable_non_terminals_original)
+    def cached(self, name: str, compute):
+        """ Результат анализа, посчитанный для текущей версии грамматики (или compute()) """
+        return self.analysis_cache.get(self.changes.value, name, compute)
+
+    def __eq__(self, other):
+        return self.non_terminals == other.non_terminals and self.terminals == other.terminals \
+               and self.rules == other.rules and self.axiom == other.axiom
+
+    def remove_unreachable_symbols(self) -> Grammar:
+        """ Возвращает грамматику без недостижимых символов (при этом нынешнюю грамматику не меняет) """
+        reachable_terminals, reachable_non_terminals = self.get_reachable_symbols()
 
         # если достижимые нетерминалы совпадают с теми,
         # что были изначально определены в грамматике, то возвращаем новую, идентичную этой грамматику
@@ -85,8 +103,8 @@ class Grammar:
         # чья левая сторона не является достижимым нетерминалом
         else:
             new_rules = dict()
-            for non_terminal in reachable_non_terminals:
-                if non_terminal in self.rules:
+            for non_terminal in self.rules:
+                if non_terminal in reachable_non_terminals:
                     new_rules[non_terminal] = self.rules[non_terminal].copy()
 
             # и возвращаем граматику с
@@ -94,6 +112,12 @@ class Grammar:
             # и новыми правилами вывода
             return Grammar(reachable_non_terminals, reachable_terminals, new_rules, self.axiom)
 
+    def get_reachable_symbols(self) -> tuple:
+        """ Возвращает достижимые терминалы и нетерминалы, не копируя грамматику """
+        reachable_terminals, reachable_non_terminals = self.cached(
+            'reachable', lambda: reachable_symbols(self.rules, self.axiom, self.terminals, self.non_terminals))
+        return set(reachable_terminals), set(reachable_non_terminals)
+
     def is_contain_nn(self, string: str, symbols: set) -> bool:
         if not string:
             return False
@@ -104,31 +128,19 @@ class Grammar:
 
     def get_good_non_terminals(self) -> set:
         """ Возвращает все хорошие нетерминалы """
-        non_terminals: set = set()
-        good_non_terminals: set = non_terminals.copy()
-
-        while True:
+        return set(self.cached('productive', lambda: productive_non_terminals(self.rules, self.terminals)))
 
-            # идем по всем правилам
-            for rule in self.rules:
-                for i, rule_item in enumerate(self.rules[rule]):
-
-                    # если правая часть содержит только хорошие символы и терминалы,
-                    # то добавляем нетерминал к хорошим символам
-                    if self.is_contain_nn(self.rules[rule][i], non_terminals):
-                        non_terminals.add(rule)
-                        break
-
-            # условие прерывания алгоритма:
-            # если за проход мы не добавили никакого нового хорошего символа
-            if non_terminals == good_non_terminals:
-                break
+    def is_not_empty(self) -> bool:
+        return self.axiom in self.cached('productive', lambda: productive_non_terminals(self.rules, self.terminals))
 
-            good_non_terminals = non_terminals.copy()
-        return good_non_terminals
+    def get_first_follow(self) -> FirstFollow:
+        """ nullable, FIRST и FOLLOW (см. analysis.FirstFollow) """
+        return self.cached('first_follow',
+                           lambda: FirstFollow(self.rules, self.axiom, self.terminals, self.non_terminals))
 
-    def is_not_empty(self) -> bool:
-        return self.axiom in self.get_good_non_terminals()
+    def get_nullable_non_terminals(self) -> set:
+        """ Нетерминалы, из которых выводится пустая цепочка """
+        return set(self.get_first_follow().nullable)
 
     def remove_bad_non_terminals_and_rules(self):
         good_non_terminals: set = self.get_good_non_terminals()
@@ -165,80 +177,33 @@ class Grammar:
             return None
         return without_useless
 
-    def remove_left_recursion(self):
+    def left_recursion_plan(self) -> LeftRecursionPlan:
+        """ Порядок подстановок и предсказанное число правил результата remove_left_recursion
+        (см. analysis.left_recursion_plan); сами подстановки при этом не выполняются """
+        return self.cached('left_recursion_plan', lambda: left_recursion_plan(self.rules))
+
+    def remove_left_recursion(self, max_rules: int = None):
+        """ Возвращает грамматику без левой рекурсии. Подстановки выполняются только внутри
+        леворекурсивных компонент и в порядке из left_recursion_plan; если max_rules задано
+        и предсказанное число правил больше, грамматика не строится (ValueError) """
+        plan = self.left_recursion_plan()
+        if max_rules is not None and plan.predicted_rules > max_rules:
+            raise ValueError("Removing left recursion would create " + str(plan.predicted_rules) +
+                             " rules, more than the limit of " + str(max_rules) + ".")
+
         new_grammar = self.copy()  # новая грамматика чтобы её вернуть
-        rule_array = tuple(self.rules)  # упорядочил) нетерминалы
-        i = 0  # счетчик (кто мог ожидать?)
-        while True:
-            for o, rule_item in enumerate(new_grammar.rules[rule_array[i]]):  # проверяю каждое правило
-                if rule_item[0] == rule_array[i]:  # если правило вызывает левую рекурсию, то
-                    new_non_terminal = rule_array[i] + '\''  # создаем новый нетерминал
-                    new_non_terminal_rules = []
-                    new_rules = []
-                    for m, temp_rule in enumerate(
-                            new_grammar.rules[rule_array[i]]):  # проходим опять по каждому правилу
-                        if temp_rule[0] == rule_array[i]:  # если вызывается левая рекурсия
-                            k = 0
-                            while k < len(temp_rule):  # скипаем первые k повторений нашего нетерминала
-                                if temp_rule[k] == rule_array[i]:
-                                    k += 1
-                                else:
-                                    break
-                            if k == len(temp_rule):
-                                continue
-                            new_temp_rule = (
-                                temp_rule[k:len(temp_rule)])  # оставляем только правую часть, после k повторений
-                            new_non_terminal_rules.append(
-                                new_temp_rule)  # добавляем это правило в правила нового нетерминала
-                            temp_list = list(new_temp_rule)
-                            temp_list.append(
-                                new_non_terminal)  # создаем массив строк с нашего правила (чтобы туда можно было добавить правило со штрихом (то есть состоящее из 2 символов))
-                            new_non_terminal_rules.append(temp_list)  # добавляем его в правило нового нетерминала
-                        else:  # если правило не вызывает левую рекурсию, то добавляем его как есть
-                            new_rules.append(
-                                temp_rule)  # (раньше тут был опять массив строк, но я убрал и вроде не ломается)
-                            temp_list = list(temp_rule).copy()
-                            temp_list.append(new_non_terminal)  # добавляем правило с нетерминалом со штрихом в конце
-                            new_rules.append(temp_list)
-                    new_grammar.rules[rule_array[i]] = new_rules  # обновляем правила у изначального нетерминала
-                    new_grammar.non_terminals.add(new_non_terminal)
-                    new_grammar.rules.update(
-                        {new_non_terminal: new_non_terminal_rules})  # добавляем новый нетерминал с его правилами
-                    break
-                else:
-                    pass
-            if i == len(rule_array) - 1:  # выход из алгоритма
-                break
-            j = 0
-            i += 1
-            while True:
-                temp_rule = {rule_array[i]: []}  # временные правила
-                for o, rule_item in enumerate(new_grammar.rules[rule_array[i]]):
-                    if rule_item[0] == rule_array[j]:  # если в нашем правиле в начале стоит нетерминал,
-                        # который имеет индекс меньше, то заменяем его на правые части правил из НЕГО
-                        for n, rule_item_temp in enumerate(new_grammar.rules[rule_array[j]]):
-                            if type(rule_item_temp) == type('abc'):
-                                temp_right_side = rule_item_temp
-                            else:
-                                temp_right_side = rule_item_temp.copy()
-                            k = 0
-                            while k < len(rule_item):  # скипаем первые k повторений нашего нетерминала
-                                # (не проверил, может ли тут быть пустота по итогу)
-                                if rule_item[k] == rule_array[j]:
-                                    k += 1
-                                else:
-                                    break
-                            for k in range(k, len(rule_item)):
-                                temp_right_side += rule_item[k]
-                            temp_rule[rule_array[i]].append(temp_right_side)
-                    else:  # если не стоит нетерминал, то добавляем правило как есть без изменений
-                        temp_rule[rule_array[i]].append(rule_item)
-                new_grammar.rules.update(temp_rule)  # обновляем
-                if j == i - 1:
-                    break  #
-                else:
-                    j += 1
 
+        def new_non_terminal(non_terminal):
+            name = non_terminal + '\''
+            while name in new_grammar.non_terminals or name in new_grammar.terminals:
+                name += '\''
+            new_grammar.non_terminals.add(name)
+            return name
+
+        for non_terminal, rule_outputs in eliminate_left_recursion(self.rules, plan, new_non_terminal).items():
+            # многосимвольные имена (A', A1) бывают только в правых частях-списках
+            new_grammar.rules[non_terminal] = [''.join(rule_output) if all(len(symbol) == 1 for symbol in rule_output)
+                                               else list(rule_output) for rule_output in rule_outputs]
         return new_grammar
 
     # классы эквивалентности для тестов: 
@@ -250,40 +215,24 @@ class Grammar:
     # правил вывода(т.е. например, A -> Ba; B -> C, и из C нету вывода)
     def remove_chain_rules(self):
         """ Возвращает грамматику без цепных правил (при этом нынешнюю грамматику не меняет) """
-        chain_non_terminals = dict()  # тут будут хранится все множества из цепных нетерминалов (т.е. NA, NB, ... по обозначениям из видео по этому алгосу)
-
-        # здесь заполняем chain_non_terminals
-        for non_terminal in self.non_terminals:
-            chain_non_terminals_key = non_terminal  # с этого нетерминала начинается множество цепных нетерминалов (мцн)
-            chain_non_terminals_value = set()  # здесь будут все цепные нетерминалы исходящие из chain_non_terminals_key
-            self.fill_chain_non_terminals_value(chain_non_terminals_key, chain_non_terminals_value,
-                                                non_terminal)  # заполняем chain_non_terminals_value (т.е. ищем все цепные нетерминалы исходящие из chain_non_terminals_key)
-            chain_non_terminals[
-                chain_non_terminals_key] = chain_non_terminals_value  # "объединяем" chain_non_terminals_key и chain_non_terminals_value
+        chain_non_terminals = self.get_chain_non_terminals()
 
         new_rules = dict()
-        for first_chain_non_terminal in chain_non_terminals:  # проходимся по первым
-            # нетерминалам из всех множеств цепных нетерминалов
-            rule_outputs = list()  # здесь будут правые части правила в новой
-            # грамматике исходящие из first_chain_non_terminal
-            if first_chain_non_terminal in self.rules:
-                for rule_output in self.rules[first_chain_non_terminal]:  # сначала проходимся по правым
-                    # частям правил исходящих из first_chain_non_terminal
-                    if not (len(rule_output) == 1 and rule_output[0] in self.non_terminals):
-                        rule_outputs.append(
-                            rule_output)  # и добавляем в rule_outputs правые части,
-                        # которые не состоят из одного нетерминала
-
-                for non_terminal in chain_non_terminals[first_chain_non_terminal]:
-                    # затем проходимся по правым частям правил исходящих из всех
-                    # остальных цепных нетерминалов из множества с первым нетерминалом first_chain_non_terminal
-                    if non_terminal in self.rules:
-                        for rule_output in self.rules[non_terminal]:
-                            if not (len(rule_output) == 1 and rule_output[0] in self.non_terminals):
-                                rule_outputs.append(rule_output)  # и делаем тоже самое
-
-                if rule_outputs:  # если не пуст, то добавляем в правила новой грамматики
-                    new_rules[first_chain_non_terminal] = rule_outputs
+        # у нетерминалов одной компоненты сильной связности общее множество цепных нетерминалов,
+        # поэтому и список новых правых частей для них собирается один раз
+        shared_rule_outputs = dict()
+        for first_chain_non_terminal, chain in chain_non_terminals.items():
+            if first_chain_non_terminal not in self.rules:
+                continue
+            rule_outputs = shared_rule_outputs.get(chain)
+            if rule_outputs is None:
+                # все не цепные правые части всех нетерминалов, выводимых цепными правилами
+                rule_outputs = [rule_output for non_terminal in sorted(chain)
+                                for rule_output in self.rules.get(non_terminal, ())
+                                if not is_chain_rule(rule_output, self.non_terminals)]
+                shared_rule_outputs[chain] = rule_outputs
+            if rule_outputs:  # если не пуст, то добавляем в правила новой грамматики
+                new_rules[first_chain_non_terminal] = rule_outputs
 
         new_grammar = self.copy()
         new_grammar.rules = new_rules
@@ -291,30 +240,20 @@ class Grammar:
         new_grammar.terminals = self.terminals.copy()  # в возваращаемой грамматике изменяются только нетерминалы и правила вывода
         return new_grammar
 
-    def fill_chain_non_terminals_value(self, key: str, value: set,
-                                       non_terminal: str) -> set:  # рот шатал в вайл тру это делать, поэтому рекурсия
-        if non_terminal in self.rules:
-            for rule_output in self.rules[non_terminal]:
-                # проходимся по правым частям правил исходящих из non_terminal
-                # и проверяем состоят ли они из одного нетерминала
-                if len(rule_output) == 1 and rule_output[0] in self.non_terminals:
-                    if rule_output[0] not in value and rule_output[0] != key:  # проверка на зацикленность рекурсии
-                        value.add(rule_output[0])  # и если состоят, то добавляем этот нетерминал
-                        # в множество цепных нетерминалов (мцн)
-                        self.fill_chain_non_terminals_value(key, value, rule_output[
-                            0])  # и далее ищем цепные нетерминалы исходящие из добавленного в мцн нетерминала
+    def get_chain_non_terminals(self) -> dict:
+        """ Для каждого нетерминала - frozenset нетерминалов, выводимых из него цепными правилами,
+        включая его самого (у нетерминалов одной компоненты сильной связности - один общий объект).
+        Словарь - копия закешированного, чтобы вызывающий не мог испортить кеш; множества неизменяемы
+        и остаются общими """
+        return dict(self.cached('chain', self.compute_chain_non_terminals))
+
+    def compute_chain_non_terminals(self) -> dict:
+        # множества NA, NB, ... (по обозначениям из видео по этому алгосу): нетерминал и все нетерминалы,
+        # выводимые из него цепными правилами; считаются по компонентам сильной связности графа цепных правил
+        return chain_closure(self.rules, self.non_terminals, self.non_terminals)
 
     def get_new_var(self):
-        for v in self.var:
-            if v not in self.non_terminals:
-                self.non_terminals.add(v)
-                return v
-        for i in range(1, 100000):
-            for v in self.var:
-                vi = v + str(i)
-                if vi not in self.non_terminals:
-                    self.non_terminals.add(vi)
-                    return vi
+        return self.fresh_symbols.allocate(self.non_terminals)
 
     def tokenize(self, s):
         tokens = []
@@ -344,74 +283,81 @@ class Grammar:
         return tokens
 
     def algorithm_chomsky(self):
-        """ Возвращает грамматику в НФХ """
+        """ Приводит грамматику к НФХ (меняет её саму): правила вида A -> BC и A -> a, а пустое правило -
+        только у аксиомы, которая не встречается в правых частях (при необходимости вводится новая аксиома) """
+        rules = dict()
         for f, t in self.rules.items():
-            new_rules = []
-            for r in t:
-                new_rules.append(self.tokenize(r))
-            self.rules[f] = new_rules
+            rules[f] = [self.tokenize(r) if isinstance(r, str) and r else list(r) for r in t]
 
-        new_start = self.get_new_var()
-
-        for t in self.rules.values():
-            for r in t:
-                for i in range(len(r)):
-                    if r[i] == 'S':
-                        r[i] = new_start
+        # новая аксиома, если старая встречается в правых частях
+        if any(self.axiom in r for t in rules.values() for r in t):
+            new_start = self.get_new_var()
+            rules[new_start] = [r.copy() for r in rules.get(self.axiom, ())]
+            self.axiom = new_start
 
+        # терминалы в правых частях длины больше 1 заменяются нетерминалами-заместителями
         term_vars = {}
-        for f, t in self.rules.items():
-            new_rules = []
+        for t in rules.values():
             for r in t:
-                if len(r) == 1 and r[0] in self.term:
-                    new_rules.append([r[0]])
+                if len(r) < 2:
                     continue
-                new_r = []
-                for symbol in r:
-                    if symbol in self.term:
+                for i, symbol in enumerate(r):
+                    if symbol not in self.non_terminals:
                         if symbol not in term_vars:
                             term_vars[symbol] = self.get_new_var()
-                        new_r.append(term_vars[symbol])
-                    else:
-                        new_r.append(symbol)
-                new_rules.append(new_r)
-            self.rules[f] = new_rules.copy()
-        var_terms = {}
-
+                        r[i] = term_vars[symbol]
         for t, v in term_vars.items():
-            var_terms[v] = [[t]]
-        self.rules = {**self.rules, **var_terms}
-
-        has_long_rule = False
-        while True:
-            cut_var = {}
-            for f, t in self.rules.items():
-                new_rules = []
-                for r in t:
-                    rp = r.copy()
-                    if len(rp) > 2:
-                        has_long_rule = True
-                        new_var = self.get_new_var()
-                        cut_var[new_var] = [rp[1:]]
-                        rp = [r[0], new_var]
-                    new_rules.append(rp)
-                self.rules[f] = new_rules.copy()
-            self.rules = {**self.rules, **cut_var}
-            if not has_long_rule:
-                break
-            has_long_rule = False
+            rules[v] = [[t]]
 
-        for f, t in self.rules.items():
+        # длинные правила режутся цепочкой новых нетерминалов: A -> X1 N1, N1 -> X2 N2, ...
+        cut_var = {}
+        for t in rules.values():
+            for i, r in enumerate(t):
+                if len(r) <= 2:
+                    continue
+                new_var = self.get_new_var()
+                t[i] = [r[0], new_var]
+                for symbol in r[1:-2]:
+                    next_var = self.get_new_var()
+                    cut_var[new_var] = [[symbol, next_var]]
+                    new_var = next_var
+                cut_var[new_var] = [r[-2:]]
+        rules.update(cut_var)
+
+        # пустые правила: у каждого правила (длины не больше 2) - все варианты без обнуляемых символов
+        self.rules = rules
+        nullable = self.get_nullable_non_terminals()
+        for f, t in rules.items():
             new_rules = []
             for r in t:
-                new_r = ''
-                for symbol in r:
-                    new_r += symbol
-                new_rules.append(new_r)
-            self.rules[f] = new_rules
+                variants = [r]
+                if len(r) == 2:
+                    if r[0] in nullable:
+                        variants.append([r[1]])
+                    if r[1] in nullable:
+                        variants.append([r[0]])
+                for variant in variants:
+                    if variant and variant not in new_rules:
+                        new_rules.append(variant)
+            rules[f] = new_rules
+        self.rules = rules
+
+        # цепные правила и недостижимые символы
+        new_grammar = self.remove_chain_rules()
+        self.non_terminals = new_grammar.non_terminals
+        rules = {f: list(t) for f, t in new_grammar.rules.items()}
+        if self.axiom in nullable:
+            rules.setdefault(self.axiom, []).append([])
+
+        # правые части из односимвольных имён снова записываются строками
+        for f, t in rules.items():
+            rules[f] = [''.join(r) if all(len(symbol) == 1 for symbol in r) else r for r in t]
+        self.rules = rules
 
     def copy(self):
         new_grammar = Grammar(self.non_terminals.copy(), self.terminals.copy(), self.rules.copy(), self.axiom)
+        # у копии то же содержимое, поэтому уже посчитанные анализы ей подходят
+        new_grammar.analysis_cache.inherit(self.analysis_cache, self.changes.value, new_grammar.changes.value)
         return new_grammar
 
     def print(self):
@@ -0,0 +1,40 @@
+import unittest
+
+from batch import BatchRecognizer, accepts_all, compile_grammar
+from cyk import CYKRecognizer
+from earley import EarleyParser
+from grammar import CFG
+from main import Grammar
+
+
+class test_batch(unittest.TestCase):
+    def test_batch_chomsky_grammar(self):
+        grammar: Grammar = Grammar({'P'}, {'a', 'b'}, {'P': ['aPb', 'PP', 'ab']}, 'P')
+        grammar.algorithm_chomsky()
+        self.assertIsInstance(compile_grammar(grammar), CYKRecognizer)
+
+        words = ['ab', 'ba', 'aabb', '', 'abab', 'abb', 'aababb'] * 5
+        expected = [word in ('ab', 'aabb', 'abab', 'aababb') for word in words]
+        with BatchRecognizer(grammar, workers=2, chunk_size=3) as batch:
+            self.assertEqual(list(batch.accepts(iter(words))), expected)
+
+    def test_batch_cfg(self):
+        grammar: CFG = CFG({'S'}, {'(', ')'}, {'S': ['(S)S', '']}, 'S')
+        self.assertIsInstance(compile_grammar(grammar), EarleyParser)
+
+        words = ['', '()', '(()', '(()())', ')(']
+        self.assertEqual(list(accepts_all(grammar, words, workers=2, chunk_size=2)),
+                         [True, True, False, True, False])
+
+    def test_batch_not_chomsky_grammar(self):
+        grammar: Grammar = Grammar({'S'}, {'a'}, {'S': ['aS', '']}, 'S')
+        self.assertIsInstance(compile_grammar(grammar), EarleyParser)
+        self.assertEqual(list(accepts_all(grammar, ['', 'a', 'aa', 'b'], workers=1)), [True, True, True, False])
+
+    def test_batch_bad_chunk_size(self):
+        grammar: CFG = CFG({'S'}, {'a'}, {'S': ['a']}, 'S')
+        self.assertRaises(ValueError, lambda: BatchRecognizer(grammar, chunk_size=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import io
+import itertools
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import bnf
+import grammar_file
+from batch_convert import SUMMARY_FILE, convert_all, convert_file, main
+from conversion_cache import TRANSFORMATIONS
+from earley import recognize
+from main import Grammar
+
+EXPRESSIONS = 'E ::= E "+" T | T\nT ::= T "*" F | F\nF ::= "(" E ")" | "a"\n'
+
+
+def short_words(terminals, max_length: int):
+    for length in range(max_length + 1):
+        yield from itertools.product(sorted(terminals), repeat=length)
+
+
+class test_batch_convert(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.inputs = os.path.join(self.directory.name, 'in')
+        self.output = os.path.join(self.directory.name, 'out')
+        os.makedirs(os.path.join(self.inputs, 'nested'))
+        with open(os.path.join(self.inputs, 'expressions.bnf'), 'w') as file:
+            file.write(EXPRESSIONS)
+        with open(os.path.join(self.inputs, 'nested', 'broken.bnf'), 'w') as file:
+            file.write('S ::= ( "a"\n')
+        grammar_file.save(Grammar({'S', 'A'}, {'a'}, {'S': ['A'], 'A': ['aA']}, 'S'),
+                          os.path.join(self.inputs, 'nested', 'empty.grm'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read_output(self, name: str) -> Grammar:
+        with open(os.path.join(self.output, name)) as file:
+            return bnf.read_grammar(file)
+
+    def assertSameLanguage(self, converted: Grammar, original: Grammar, max_length: int = 4):
+        self.assertEqual(converted.terminals, original.terminals)
+        for word in short_words(original.terminals, max_length):
+            self.assertEqual(recognize(converted, word), recognize(original, word), word)
+
+    def right_sides(self, grammar: Grammar):
+        for rule_left_side, rule_outputs in grammar.rules.items():
+            for rule_output in rule_outputs:
+                yield rule_left_side, grammar.tokenize(rule_output) if isinstance(rule_output, str) and rule_output \
+                    else list(rule_output)
+
+    def test_convert_directory(self):
+        summary = convert_all([self.inputs], self.output, 'cnf', workers=2)
+        with open(os.path.join(self.output, SUMMARY_FILE)) as file:
+            self.assertEqual(json.load(file)['statuses'], summary['statuses'])
+        statuses = {os.path.relpath(result['input'], self.inputs): result['status'] for result in summary['files']}
+        self.assertEqual(statuses, {'expressions.bnf': 'ok', os.path.join('nested', 'broken.bnf'): 'error',
+                                    os.path.join('nested', 'empty.grm'): 'ok'})
+
+        converted = self.read_output('expressions.bnf')
+        for rule_left_side, symbols in self.right_sides(converted):
+            if len(symbols) == 2:
+                self.assertTrue(set(symbols) <= converted.non_terminals, (rule_left_side, symbols))
+            else:
+                self.assertEqual(len(symbols), 1, (rule_left_side, symbols))
+                self.assertIn(symbols[0], converted.terminals)
+        self.assertSameLanguage(converted, bnf.read_grammar(io.StringIO(EXPRESSIONS)))
+        self.assertTrue(os.path.exists(os.path.join(self.output, 'nested', 'empty.bnf')))
+
+        summary = convert_all([self.inputs], self.output, 'useless-free', workers=1, output_format='binary')
+        self.assertEqual(summary['statuses'], {'ok': 1, 'error': 1, 'empty': 1})
+        expressions = grammar_file.load_grammar(os.path.join(self.output, 'expressions.grm'))
+        self.assertEqual(len(expressions.rules), 3)
+
+    def test_same_output_name(self):
+        other = os.path.join(self.directory.name, 'other')
+        os.makedirs(other)
+        with open(os.path.join(other, 'expressions.bnf'), 'w') as file:
+            file.write('S ::= "a"\n')
+        first, second = os.path.join(self.inputs, 'expressions.bnf'), os.path.join(other, 'expressions.bnf')
+        summary = convert_all([first, second], self.output, 'useless-free', workers=1)
+        results = {result['input']: result for result in summary['files']}
+        self.assertEqual(results[first]['status'], 'ok')
+        self.assertEqual(results[second]['status'], 'error')
+        self.assertIn(first, results[second]['error'])
+        # результат первого входа не перезаписан
+        self.assertEqual(self.read_output('expressions.bnf').axiom, 'E')
+
+    def test_timeout(self):
+        path = os.path.join(self.inputs, 'expressions.bnf')
+        # преобразование, которое заведомо не успеет за отведённое время
+        with mock.patch.dict(TRANSFORMATIONS, {'sleep': lambda grammar: time.sleep(30)}):
+            result = convert_file(path, os.path.join(self.output, 'hard.bnf'), 'sleep', timeout=0.2)
+        self.assertEqual(result['status'], 'timeout')
+        self.assertLess(result['wall_time'], 5)
+        self.assertIsNone(result['output'])
+
+    def test_main(self):
+        code = main(['gnf', os.path.join(self.inputs, 'expressions.bnf'), '-o', self.output, '--workers', '1',
+                     '--timeout', '30', '--cache', os.path.join(self.directory.name, 'cache')])
+        self.assertEqual(code, 0)
+        with open(os.path.join(self.output, SUMMARY_FILE)) as file:
+            summary = json.load(file)
+        self.assertEqual(summary['transformation'], 'greibach')
+
+        converted = self.read_output('expressions.bnf')
+        self.assertEqual(summary['files'][0]['rules_after'], sum(map(len, converted.rules.values())))
+        self.assertEqual(converted.axiom, 'E')
+        self.assertTrue({'E', 'T', 'F'} <= converted.non_terminals)
+        for rule_left_side, symbols in self.right_sides(converted):
+            self.assertIn(symbols[0], converted.terminals, (rule_left_side, symbols))
+            self.assertTrue(set(symbols[1:]) <= converted.non_terminals, (rule_left_side, symbols))
+        self.assertSameLanguage(converted, bnf.read_grammar(io.StringIO(EXPRESSIONS)))
+        self.assertEqual(main(['chain-free', self.inputs, '-o', self.output]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
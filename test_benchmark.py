@@ -0,0 +1,45 @@
+import json
+import unittest
+
+from benchmark import BENCHMARKED, random_grammar, rule_count, run_benchmark, single_char_grammar, tokens
+
+
+class test_benchmark(unittest.TestCase):
+    def test_random_grammar_is_seeded(self):
+        first = random_grammar(7, 10, left_recursion_density=0.5, unit_rule_density=0.3)
+        second = random_grammar(7, 10, left_recursion_density=0.5, unit_rule_density=0.3)
+        self.assertEqual(first.rules, second.rules)
+        self.assertEqual(len(first.non_terminals), 10)
+        self.assertEqual(first.axiom, 'S')
+
+    def test_densities(self):
+        recursive = random_grammar(1, 8, rules_per_non_terminal=6, left_recursion_density=1.0)
+        self.assertTrue(any(tokens(recursive, rule_output)[0] == non_terminal
+                            for non_terminal, rule_outputs in recursive.rules.items() for rule_output in rule_outputs))
+        chains = random_grammar(1, 8, rules_per_non_terminal=6, unit_rule_density=1.0)
+        for rule_outputs in chains.rules.values():
+            # кроме первого правила с терминалом в начале
+            self.assertTrue(all(len(tokens(chains, rule_output)) == 1 and tokens(chains, rule_output)[0] in chains.non_terminals
+                                for rule_output in rule_outputs[1:]))
+
+    def test_single_char_grammar(self):
+        grammar = random_grammar(3, 30)
+        self.assertTrue(any(isinstance(rule_output, list)
+                            for rule_outputs in grammar.rules.values() for rule_output in rule_outputs))
+        renamed = single_char_grammar(grammar)
+        self.assertEqual(rule_count(renamed), rule_count(grammar))
+        self.assertTrue(all(len(non_terminal) == 1 for non_terminal in renamed.non_terminals))
+
+    def test_report(self):
+        report = run_benchmark([3, 5], seed=2, left_recursion_density=0.3, unit_rule_density=0.2)
+        json.dumps(report)
+        self.assertEqual(len(report['results']), 2 * len(BENCHMARKED))
+        for result in report['results']:
+            self.assertNotIn('error', result)
+            self.assertGreater(result['rules_after'], 0)
+            self.assertGreaterEqual(result['wall_time'], 0)
+            self.assertGreater(result['peak_memory'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import io
+import os
+import tracemalloc
+import unittest
+
+import bnf
+from bnf import BNFReader, BNFSyntaxError
+from grammar import CFG, Token
+from greibach.Grammar import Grammar as GreibachGrammar
+from main import Grammar
+
+EXPRESSIONS = '''
+# арифметические выражения
+expr ::= expr "+" term | term
+term ::= <term item> { "*" <term item> }
+<term item> ::= "(" expr ")"
+              | 'a'
+'''
+
+
+class test_bnf(unittest.TestCase):
+    def test_reader(self):
+        reader = BNFReader(io.StringIO(EXPRESSIONS))
+        productions = list(reader)
+        self.assertEqual(productions[:2], [('expr', ('expr', '+', 'term')), ('expr', ('term',))])
+        self.assertIn(("term'", ('*', 'term item', "term'")), productions)
+        self.assertIn(("term'", ()), productions)
+        self.assertIn(('term', ('term item', "term'")), productions)
+        self.assertEqual(reader.axiom, 'expr')
+        self.assertEqual(reader.non_terminals, {'expr', 'term', "term'", 'term item'})
+        self.assertEqual(reader.terminals, {'+', '*', '(', ')', 'a'})
+
+    def test_ebnf_groups(self):
+        productions = list(BNFReader(io.StringIO('S ::= [ "x" ( "y" | "z" ) ] ε\n')))
+        self.assertEqual(productions, [("S''", ('y',)), ("S''", ('z',)),
+                                       ("S'", ('x', "S''")), ("S'", ()), ('S', ("S'",))])
+
+    def test_syntax_errors(self):
+        for text in ('"a" ::= "b"\n', 'S ::= ( "a" \n', 'S ::= "a" ]\n', 'S ::= "a" ::= "b"\n', 'S ::= @\n',
+                     "S ::= [ 'a' ]\nS' ::= 'b'\n"):
+            self.assertRaises(BNFSyntaxError, lambda: list(BNFReader(io.StringIO(text))))
+        self.assertRaises(ValueError, bnf.read_grammar, io.StringIO('# nothing\n'))
+
+    def test_grammar_round_trip(self):
+        grammar: Grammar = Grammar({'S', 'A'}, {'a', 'b'}, {'A': ['a', ''], 'S': ['aSb', 'A']}, 'S')
+        text = io.StringIO()
+        bnf.write_bnf(grammar, text)
+        self.assertEqual(text.getvalue(), 'S ::= "a" S "b"\n'
+                                          '    | A\n'
+                                          'A ::= "a"\n'
+                                          '    | ""\n')
+        self.assertEqual(bnf.read_grammar(io.StringIO(text.getvalue())), grammar)
+
+    def test_cfg_and_greibach(self):
+        cfg = bnf.read_cfg(io.StringIO(EXPRESSIONS))
+        self.assertEqual(cfg.axiom, Token('expr', 'char'))
+        self.assertEqual(cfg.rules[Token("term'", 'char')][1], [Token('', 'char')])
+        text = io.StringIO()
+        bnf.write_bnf(cfg, text)
+        again: CFG = bnf.read_cfg(io.StringIO(text.getvalue()))
+        self.assertEqual(again.rules, cfg.rules)
+
+        greibach = bnf.read_greibach(io.StringIO('S ::= "a" S "b" | ""\n'))
+        self.assertEqual(sorted(str(rule) for rule in greibach.rules),
+                         sorted(str(rule) for rule in GreibachGrammar(
+                             [{"lhs": "S", "rhs": ["aSb", "ε"]}]).rules))
+
+    def test_terminal_named_like_non_terminal(self):
+        text = 'S ::= "S" "x" | "x"\n'
+        reader = BNFReader(io.StringIO(text))
+        self.assertEqual(list(reader.symbols()), [('S', (('terminal', 'S'), ('terminal', 'x'))),
+                                                  ('S', (('terminal', 'x'),))])
+        self.assertEqual((reader.non_terminals, reader.terminals), ({'S'}, {'S', 'x'}))
+
+        compact = bnf.read_compact(io.StringIO(text))
+        self.assertEqual(compact.non_terminal_count, 1)
+        self.assertTrue(all(compact.is_terminal(symbol) for symbol in compact.rhs_of(0)))
+        written = io.StringIO()
+        bnf.write_bnf(compact, written)
+        self.assertEqual(written.getvalue(), 'S ::= "S" "x"\n    | "x"\n')
+        self.assertRaises(ValueError, bnf.read_grammar, io.StringIO(text))
+
+    def test_bounded_memory(self):
+        # много правил над двумя нетерминалами: память не должна расти с длиной текста
+        lines = ['S ::= "a" A\n'] + ['    | ' + ' '.join('A' if bit == '1' else '"a"' for bit in format(index, '016b')) + '\n'
+                                     for index in range(5000)] + ['A ::= "b"\n']
+        text_size = sum(map(len, lines))
+        tracemalloc.start()
+        try:
+            # файлом может быть любой итератор строк
+            count = sum(1 for _ in BNFReader(iter(lines)))
+            reading_peak = tracemalloc.get_traced_memory()[1]
+            compact = bnf.read_compact(iter(lines))
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            with open(os.devnull, 'w') as file:
+                bnf.write_bnf(compact, file)
+            writing_peak = tracemalloc.get_traced_memory()[1] - before
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(count, 5002)
+        self.assertEqual(compact.production_count(), 5002)
+        self.assertLess(reading_peak, text_size // 4)
+        self.assertLess(writing_peak, text_size // 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+from compact import CompactGrammar
+from grammar import CFG
+from main import Grammar
+
+
+class test_compact(unittest.TestCase):
+    def test_compact_layout(self):
+        grammar: Grammar = Grammar(
+            {'S', 'A', 'B'},
+            {'a', 'b'},
+            {'S': ['aA', ['A', 'b'], ''], 'A': ['a']},
+            'S'
+        )
+        compact = CompactGrammar.from_grammar(grammar)
+        self.assertEqual(compact.symbols, ['S', 'A', 'B', 'a', 'b'])
+        self.assertEqual(compact.non_terminal_count, 3)
+        self.assertEqual(list(compact.rule_offsets), [0, 3, 4, 4])
+        self.assertEqual(list(compact.rhs_offsets), [0, 2, 4, 4, 5])
+        self.assertEqual(list(compact.rhs), [3, 1, 1, 4, 3])
+        self.assertEqual(list(compact.productions_of(compact.symbols.index('A'))), [3])
+        self.assertEqual(list(compact.rhs_of(1)), [1, 4])
+        self.assertEqual([compact.lhs_of(production) for production in range(4)], [0, 0, 0, 1])
+
+    def test_compact_round_trip(self):
+        grammar: Grammar = Grammar(
+            {'E', 'T', 'F'},
+            {'+', '(', ')', '*', 'a'},
+            {'E': ['E+T', 'T'], 'T': ['T*F', 'F'], 'F': ['(E)', 'a']},
+            'E'
+        )
+        self.assertEqual(CompactGrammar.from_grammar(grammar).to_grammar(), grammar)
+
+        cfg: CFG = CFG(
+            {'E', 'T', 'F'},
+            {'+', '(', ')', '*', 'a'},
+            {'E': ['E+T', 'T', ''], 'T': ['T*F', 'F'], 'F': ['(E)', 'a']},
+            'E'
+        )
+        self.assertEqual(CompactGrammar.from_cfg(cfg).to_cfg(), cfg)
+
+        multi_char: Grammar = Grammar(
+            {'Expr', 'Term'},
+            {'id', '+'},
+            {'Expr': [['Expr', '+', 'Term'], ['Term']], 'Term': [['id']]},
+            'Expr'
+        )
+        self.assertEqual(CompactGrammar.from_grammar(multi_char).to_grammar(), multi_char)
+        self.assertRaises(ValueError, lambda: CompactGrammar.from_grammar(multi_char).to_greibach())
+        operators: Grammar = Grammar({'S'}, {'+', 'a'}, {'S': ['S+a', 'a']}, 'S')
+        self.assertRaises(ValueError, lambda: CompactGrammar.from_grammar(operators).to_greibach())
+
+    def test_compact_greibach_round_trip(self):
+        grammar: Grammar = Grammar(
+            {'S', 'A'},
+            {'a', 'b'},
+            {'S': ['aA', ''], 'A': ['b', 'SA']},
+            'S'
+        )
+        greibach_grammar = CompactGrammar.from_grammar(grammar).to_greibach()
+        self.assertEqual(sorted(str(rule) for rule in greibach_grammar.rules),
+                         ['A  ->  SA', 'A  ->  b', 'S  ->  aA', 'S  ->  ε'])
+        self.assertEqual(CompactGrammar.from_greibach(greibach_grammar).to_grammar(), grammar)
+
+        # в greibach начальный символ - S, поэтому аксиома E меняется именами с S
+        swapped: Grammar = Grammar({'E', 'S'}, {'a'}, {'E': ['aS'], 'S': ['a', 'SE']}, 'E')
+        self.assertEqual(sorted(str(rule) for rule in CompactGrammar.from_grammar(swapped).to_greibach().rules),
+                         ['E  ->  ES', 'E  ->  a', 'S  ->  aE'])
+
+    def test_compact_analyses(self):
+        grammar: Grammar = Grammar(
+            {'S', 'A', 'B', 'C'},
+            {'a', 'b', 'c'},
+            {'S': ['aA', 'B'], 'A': ['a'], 'B': ['bB'], 'C': ['c']},
+            'S'
+        )
+        compact = CompactGrammar.from_grammar(grammar)
+        productive = {compact.name(symbol) for symbol in range(compact.non_terminal_count) if compact.productive()[symbol]}
+        reachable = {compact.name(symbol) for symbol in range(len(compact.symbols)) if compact.reachable()[symbol]}
+        self.assertEqual(productive, grammar.get_good_non_terminals())
+        self.assertEqual(reachable, {'S', 'A', 'B', 'a', 'b'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+
+from conversion_cache import TRANSFORMATIONS, ConversionCache, fingerprint
+from earley import recognize
+from grammar import CFG
+from greibach.Grammar import Grammar as GreibachGrammar
+from main import Grammar
+
+
+class test_conversion_cache(unittest.TestCase):
+    def test_fingerprint_is_order_independent(self):
+        first: Grammar = Grammar({'S', 'A'}, {'a', 'b'}, {'S': ['aA', 'b'], 'A': ['a']}, 'S')
+        second: Grammar = Grammar({'A', 'S'}, {'b', 'a'}, {'A': ['a'], 'S': ['b', 'aA']}, 'S')
+        third: Grammar = Grammar({'S', 'A'}, {'a', 'b'}, {'S': ['aA', 'b'], 'A': ['b']}, 'S')
+        self.assertEqual(fingerprint(first), fingerprint(second))
+        self.assertNotEqual(fingerprint(first), fingerprint(third))
+
+        cfg: CFG = CFG({'S', 'A'}, {'a', 'b'}, {'S': ['aA', 'b'], 'A': ['a']}, 'S')
+        self.assertNotEqual(fingerprint(first), fingerprint(cfg))
+
+    def test_conversion_cache_hit(self):
+        grammar: Grammar = Grammar(
+            {'E', 'T', 'F'},
+            {'+', '(', ')', '*', 'a'},
+            {'E': ['E+T', 'T'], 'T': ['T*F', 'F'], 'F': ['(E)', 'a']},
+            'E'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ConversionCache(directory)
+            cold = cache.convert(grammar, 'algorithm_chomsky')
+            warm = ConversionCache(directory).convert(grammar.copy(), 'algorithm_chomsky')
+            self.assertEqual(warm, cold)
+            self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+            cfg: CFG = CFG({'S'}, {'a', 'b'}, {'S': ['aSb', '']}, 'S')
+            self.assertEqual(cache.convert(cfg, 'remove_chain_rules'), cache.convert(cfg, 'remove_chain_rules'))
+            self.assertEqual(cache.hits, 1)
+
+            greibach = cache.convert(grammar, 'greibach')
+            self.assertEqual(sorted(str(rule) for rule in cache.convert(grammar, 'greibach').rules),
+                             sorted(str(rule) for rule in greibach.rules))
+
+    def test_chomsky_cfg(self):
+        cfg: CFG = CFG({'E', 'T', 'F'}, {'+', '(', ')', '*', 'a'},
+                       {'E': ['E+T', 'T'], 'T': ['T*F', 'F'], 'F': ['(E)', 'a']}, 'E')
+        with tempfile.TemporaryDirectory() as directory:
+            chomsky = ConversionCache(directory).convert(cfg, 'algorithm_chomsky')
+            self.assertEqual(ConversionCache(directory).convert(cfg, 'algorithm_chomsky'), chomsky)
+        self.assertIsInstance(chomsky, CFG)
+        for rule_outputs in chomsky.rules.values():
+            for rule_output in rule_outputs:
+                self.assertTrue(len(rule_output) == 1 and rule_output[0] in chomsky.terminals
+                                or len(rule_output) == 2 and set(rule_output) <= chomsky.non_terminals)
+        for word in ('a', 'a+a', 'a*(a+a)', '', '(a', 'a+*a'):
+            self.assertEqual(recognize(chomsky, word), recognize(cfg, word), word)
+
+        greibach = GreibachGrammar([{"lhs": "S", "rhs": ["aSb", "ab"]}])
+        self.assertRaises(ValueError, lambda: TRANSFORMATIONS['algorithm_chomsky'](greibach))
+
+    def test_greibach_keeps_names(self):
+        cfg: CFG = CFG({'E', 'T', 'F'}, {'+', '(', ')', '*', 'a'},
+                       {'E': ['E+T', 'T'], 'T': ['T*F', 'F'], 'F': ['(E)', 'a']}, 'E')
+        greibach = TRANSFORMATIONS['greibach'](cfg)
+        self.assertIsInstance(greibach, CFG)
+        self.assertEqual(greibach.axiom, cfg.axiom)
+        self.assertTrue(cfg.non_terminals <= greibach.non_terminals)
+        self.assertEqual(greibach.terminals, cfg.terminals)
+        for rule_outputs in greibach.rules.values():
+            for rule_output in rule_outputs:
+                self.assertIn(rule_output[0], greibach.terminals)
+                self.assertTrue(set(rule_output[1:]) <= greibach.non_terminals)
+        for word in ('a', 'a+a', 'a*(a+a)', '((a))*a+a', '', '(a', 'a+*a'):
+            self.assertEqual(recognize(greibach, word), recognize(cfg, word), word)
+
+    def test_conversion_cache_eviction(self):
+        grammars = [Grammar({'S'}, {'a', 'b'}, {'S': ['a' * length, 'b']}, 'S') for length in range(1, 6)]
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ConversionCache(directory)
+            for grammar in grammars:
+                cache.convert(grammar, 'remove_useless_symbols')
+            entry_size = max(entry.stat().st_size for entry in cache.entries())
+            self.assertEqual(len(cache.entries()), 5)
+
+            # первая грамматика использовалась последней и переживёт вытеснение
+            cache.get(grammars[0], 'remove_useless_symbols')
+            os.utime(cache.path(grammars[0], 'remove_useless_symbols'), (2 ** 31, 2 ** 31))
+            cache.max_bytes = 2 * entry_size
+            cache.evict()
+            self.assertLessEqual(cache.size(), 2 * entry_size)
+            self.assertIsNotNone(cache.get(grammars[0], 'remove_useless_symbols'))
+
+
+if __name__ == '__main__':
+    unittest.main()
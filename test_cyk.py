@@ -0,0 +1,61 @@
+import unittest
+
+from cyk import CYKRecognizer
+from main import Grammar
+
+
+class test_cyk(unittest.TestCase):
+    def test_cyk_balanced(self):
+        grammar: Grammar = Grammar({'P'}, {'a', 'b'}, {'P': ['aPb', 'PP', 'ab']}, 'P')
+        grammar.algorithm_chomsky()
+        recognizer = CYKRecognizer(grammar)
+        for word in ('ab', 'aabb', 'abab', 'aababb'):
+            self.assertTrue(recognizer.accepts(word), word)
+        for word in ('', 'a', 'ba', 'abb', 'aabbb', 'abc'):
+            self.assertFalse(recognizer.accepts(word), word)
+
+    def test_cyk_long_word(self):
+        grammar: Grammar = Grammar({'P'}, {'a', 'b'}, {'P': ['aPb', 'PP', 'ab']}, 'P')
+        grammar.algorithm_chomsky()
+        recognizer = CYKRecognizer(grammar)
+        self.assertTrue(recognizer.accepts('a' * 300 + 'b' * 300 + 'ab' * 200))
+        self.assertFalse(recognizer.accepts('a' * 300 + 'b' * 299 + 'ab' * 200))
+
+    def test_cyk_chain_rules_and_non_letter_terminals(self):
+        grammar: Grammar = Grammar(
+            {'E', 'T', 'F'},
+            {'+', '(', ')', '*', 'a'},
+            {'E': ['E+T', 'T'], 'T': ['T*F', 'F'], 'F': ['(E)', 'a']},
+            'E'
+        )
+        grammar.algorithm_chomsky()
+        recognizer = CYKRecognizer(grammar)
+        for word in ('a', 'a+a', 'a*(a+a)', '((a))*a+a'):
+            self.assertTrue(recognizer.accepts(word), word)
+        for word in ('', '+', 'a+', '(a', 'a*+a'):
+            self.assertFalse(recognizer.accepts(word), word)
+
+    def test_cyk_not_in_normal_form(self):
+        grammar: Grammar = Grammar({'S'}, {'a', 'b'}, {'S': ['aSb', 'ab']}, 'S')
+        self.assertRaises(ValueError, lambda: CYKRecognizer(grammar))
+
+    def test_cyk_rejects_unit_rules_and_terminal_pairs(self):
+        for rules in ({'S': ['A', 'a'], 'A': ['a']}, {'S': ['aS', 'a']}, {'S': ['Sa', 'a']}):
+            grammar: Grammar = Grammar({'S', 'A'}, {'a'}, rules, 'S')
+            self.assertRaises(ValueError, lambda: CYKRecognizer(grammar))
+
+    def test_cyk_rejects_empty_axiom_on_right_side(self):
+        grammar: Grammar = Grammar({'S', 'A'}, {'a'}, {'S': ['AS', ''], 'A': ['a']}, 'S')
+        self.assertRaises(ValueError, lambda: CYKRecognizer(grammar))
+
+    def test_cyk_empty_word(self):
+        grammar: Grammar = Grammar({'S'}, {'a'}, {'S': ['aS', '']}, 'S')
+        grammar.algorithm_chomsky()
+        recognizer = CYKRecognizer(grammar)
+        for word in ('', 'a', 'aaaa'):
+            self.assertTrue(recognizer.accepts(word), word)
+        self.assertFalse(recognizer.accepts('ab'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+
+from earley import EarleyParser, IncrementalRecognizer
+from grammar import CFG
+from main import Grammar
+
+
+def leaves(tree):
+    stack = [tree]
+    result = []
+    while stack:
+        node = stack.pop()
+        if isinstance(node, tuple):
+            stack.extend(reversed(node[1]))
+        else:
+            result.append(node)
+    return ''.join(result)
+
+
+class test_earley(unittest.TestCase):
+    def test_earley_left_recursion(self):
+        grammar: Grammar = Grammar(
+            {'E', 'T', 'F'},
+            {'+', '(', ')', '*', 'a'},
+            {'E': ['E+T', 'T'], 'T': ['T*F', 'F'], 'F': ['(E)', 'a']},
+            'E'
+        )
+        parser = EarleyParser(grammar)
+        for word in ('a', 'a+a', 'a*(a+a)', '((a))*a+a'):
+            self.assertTrue(parser.recognize(word), word)
+        for word in ('', '+', 'a+', '(a', 'a*+a', 'b'):
+            self.assertFalse(parser.recognize(word), word)
+
+        self.assertEqual(parser.parse('a+a'),
+                         ('E', [('E', [('T', [('F', ['a'])])]), '+', ('T', [('F', ['a'])])]))
+        self.assertIsNone(parser.parse('a+'))
+
+    def test_earley_empty_rules(self):
+        grammar: Grammar = Grammar(
+            {'S', 'A', 'B'},
+            {'a', 'b'},
+            {'S': ['ASB'], 'A': ['a', ''], 'B': ['b', '']},
+            'S'
+        )
+        grammar.rules['S'].append('')
+        parser = EarleyParser(grammar)
+        for word in ('', 'a', 'b', 'ab', 'aab', 'abb', 'aaabbb'):
+            self.assertTrue(parser.recognize(word), word)
+        self.assertFalse(parser.recognize('ba'))
+        self.assertEqual(leaves(parser.parse('aab')), 'aab')
+        self.assertEqual(parser.parse(''), ('S', []))
+
+    def test_earley_cfg(self):
+        grammar: CFG = CFG(
+            {'S'},
+            {'(', ')'},
+            {'S': ['(S)S', '']},
+            'S'
+        )
+        parser = EarleyParser(grammar)
+        self.assertTrue(parser.recognize(''))
+        self.assertTrue(parser.recognize('(()())()'))
+        self.assertFalse(parser.recognize('(()'))
+
+    def test_earley_deep_tree(self):
+        grammar: Grammar = Grammar({'S'}, {'a', 'b'}, {'S': ['aSb', 'ab']}, 'S')
+        parser = EarleyParser(grammar)
+        word = 'a' * 2000 + 'b' * 2000
+        self.assertEqual(leaves(parser.parse(word)), word)
+        self.assertFalse(parser.recognize(word + 'b'))
+
+    def test_incremental_recognizer(self):
+        grammar: CFG = CFG(
+            {'E', 'T', 'F'},
+            {'+', '(', ')', '*', 'a'},
+            {'E': ['E+T', 'T'], 'T': ['T*F', 'F'], 'F': ['(E)', 'a']},
+            'E'
+        )
+        recognizer = IncrementalRecognizer(grammar)
+        self.assertTrue(recognizer.is_viable_prefix())
+        self.assertFalse(recognizer.accepts())
+        recognizer.feed('(a+')
+        self.assertTrue(recognizer.is_viable_prefix())
+        self.assertFalse(recognizer.accepts())
+        recognizer.feed('a)*a')
+        self.assertTrue(recognizer.accepts())
+        recognizer.feed(')')
+        self.assertFalse(recognizer.is_viable_prefix())
+        recognizer.feed('a')
+        self.assertFalse(recognizer.accepts())
+
+    def test_incremental_recognizer_unproductive_rules(self):
+        grammar: CFG = CFG(
+            {'S', 'A'},
+            {'a', 'b'},
+            {'S': ['a', 'bA'], 'A': ['bA']},
+            'S'
+        )
+        recognizer = IncrementalRecognizer(grammar)
+        recognizer.feed('b')
+        self.assertFalse(recognizer.is_viable_prefix())
+
+    def test_incremental_recognizer_bounded_chart(self):
+        grammar: CFG = CFG({'S'}, {'a', ';'}, {'S': ['Sa;', '']}, 'S')
+        recognizer = IncrementalRecognizer(grammar)
+        for _ in range(1000):
+            recognizer.feed('a;')
+            self.assertTrue(recognizer.accepts())
+        self.assertLess(len(recognizer.chart), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
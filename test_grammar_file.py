@@ -0,0 +1,90 @@
+import io
+import os
+import tempfile
+import unittest
+
+import bnf
+import grammar_file
+from grammar import CFG
+from grammar_file import GrammarFile
+from greibach.Grammar import Grammar as GreibachGrammar
+from main import Grammar
+
+
+class test_grammar_file(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'grammar.bin')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_grammar_round_trip(self):
+        grammar: Grammar = Grammar(
+            {'S', 'A', 'B1'},
+            {'a', 'b'},
+            {'S': ['aA', ['B1', 'b'], ''], 'A': ['a', 'AS'], 'B1': [['b']]},
+            'S'
+        )
+        grammar_file.save(grammar, self.path)
+        loaded = grammar_file.load(self.path)
+        self.assertIsInstance(loaded, Grammar)
+        self.assertEqual(loaded, grammar)
+        self.assertEqual(loaded.rules, grammar.rules)
+
+    def test_compact_round_trip(self):
+        compact = bnf.read_compact(io.StringIO('expr ::= expr "+" term | term\nterm ::= "id" | "(" expr ")"\n'))
+        grammar_file.save(compact, self.path)
+        loaded = grammar_file.load(self.path)
+        self.assertEqual(loaded.rules, compact.to_grammar().rules)
+        self.assertEqual(loaded.rules['term'], [['id'], ['(', 'expr', ')']])
+
+    def test_cfg_round_trip(self):
+        cfg: CFG = CFG({'E', 'T'}, {'+', 'a'}, {'E': ['E+T', 'T'], 'T': ['a', '']}, 'E')
+        grammar_file.save(cfg, self.path)
+        loaded = grammar_file.load_cfg(self.path)
+        self.assertEqual(loaded.rules, cfg.rules)
+        self.assertEqual(loaded.terminals, cfg.terminals)
+        self.assertEqual(loaded.axiom, cfg.axiom)
+
+    def test_greibach_round_trip(self):
+        greibach = GreibachGrammar([{"lhs": "S", "rhs": ["aSb", "ε"]}, {"lhs": "A", "rhs": ["a"]}])
+        grammar_file.save(greibach, self.path)
+        loaded = grammar_file.load(self.path)
+        self.assertEqual(sorted(map(str, loaded.rules)), sorted(map(str, greibach.rules)))
+
+    def test_lazy_queries(self):
+        rules = {'S': [['N0']]}
+        non_terminals = {'S'}
+        for index in range(500):
+            non_terminals.add('N' + str(index))
+            rules['N' + str(index)] = [['a', 'N' + str(index + 1)], ['b']] if index < 499 else [['a']]
+        grammar: Grammar = Grammar(non_terminals, {'a', 'b'}, rules, 'S')
+        grammar_file.save(grammar, self.path)
+
+        with GrammarFile(self.path) as file:
+            self.assertEqual(file.kind, 'grammar')
+            self.assertEqual(file.production_count(), 1000)
+            self.assertEqual(file.name(file.axiom), 'S')
+            self.assertEqual(file.rules_of('N41'), [['a', 'N42'], ['b']])
+            self.assertEqual(file.rules_of(file.symbol_id('S')), [['N0']])
+            self.assertTrue(file.is_terminal(file.symbol_id('b')))
+            self.assertRaises(KeyError, file.symbol_id, 'N500')
+            self.assertRaises(KeyError, file.rules_of, 'a')
+            self.assertEqual(file.to_grammar(), grammar)
+
+    def test_bad_files(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'not a grammar')
+        self.assertRaises(ValueError, GrammarFile, self.path)
+
+        grammar_file.save(Grammar({'S'}, {'a'}, {'S': ['aS', 'a']}, 'S'), self.path)
+        with open(self.path, 'rb') as file:
+            data = file.read()
+        with open(self.path, 'wb') as file:
+            file.write(data[:-3])
+        self.assertRaises(ValueError, GrammarFile, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
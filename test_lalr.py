@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+from grammar import CFG
+from lalr import LALRBuilder, LRTables
+from main import Grammar
+
+
+class test_lalr(unittest.TestCase):
+    def test_lalr_expression_grammar(self):
+        grammar: Grammar = Grammar(
+            {'E', 'T', 'F'},
+            {'+', '(', ')', '*', 'a'},
+            {'E': ['E+T', 'T'], 'T': ['T*F', 'F'], 'F': ['(E)', 'a']},
+            'E'
+        )
+        builder = LALRBuilder(grammar)
+        tables, conflicts = builder.build_tables()
+        self.assertEqual(conflicts, [])
+        for word in ('a', 'a+a', 'a*(a+a)', '((a))*a+a'):
+            self.assertTrue(tables.accepts(word), word)
+        for word in ('', '+', 'a+', '(a', 'a*+a', 'b'):
+            self.assertFalse(tables.accepts(word), word)
+        self.assertEqual(tables.parse('a*a'),
+                         ('E', [('T', [('T', [('F', ['a'])]), '*', ('F', ['a'])])]))
+
+        # без предпросмотра свёртка E -> T конфликтует с переносом '*'
+        _, lr0_conflicts = builder.build_tables(lalr=False)
+        self.assertTrue(any(conflict.kind == 'shift/reduce' for conflict in lr0_conflicts))
+
+    def test_lalr_not_slr_grammar(self):
+        grammar: CFG = CFG(
+            {'S', 'L', 'R'},
+            {'=', '*', 'i'},
+            {'S': ['L=R', 'R'], 'L': ['*R', 'i'], 'R': ['L']},
+            'S'
+        )
+        tables, conflicts = LALRBuilder(grammar).build_tables()
+        self.assertEqual(conflicts, [])
+        self.assertTrue(tables.accepts('*i=**i'))
+        self.assertFalse(tables.accepts('i=i=i'))
+
+    def test_lalr_empty_rules_and_conflicts(self):
+        grammar: Grammar = Grammar({'S', 'A'}, {'a', 'b', 'c'}, {'S': ['aSb', 'Ac'], 'A': ['', 'b']}, 'S')
+        tables, conflicts = LALRBuilder(grammar).build_tables()
+        self.assertEqual(conflicts, [])
+        for word in ('c', 'bc', 'acb', 'aabcbb'):
+            self.assertTrue(tables.accepts(word), word)
+        for word in ('', 'ab', 'acbb'):
+            self.assertFalse(tables.accepts(word), word)
+
+        ambiguous: Grammar = Grammar({'E'}, {'+', 'a'}, {'E': ['E+E', 'a']}, 'E')
+        tables, conflicts = LALRBuilder(ambiguous).build_tables()
+        self.assertEqual([conflict.kind for conflict in conflicts], ['shift/reduce'])
+        self.assertTrue(tables.accepts('a+a+a'))
+
+    def test_lr_tables_file(self):
+        grammar: CFG = CFG({'S'}, {'(', ')'}, {'S': ['(S)S', '']}, 'S')
+        tables, _ = LALRBuilder(grammar).build_tables()
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            tables.save(path)
+            loaded = LRTables.load(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(loaded.action, tables.action)
+        self.assertEqual(loaded.goto, tables.goto)
+        self.assertEqual(loaded.terminal_names, tables.terminal_names)
+        self.assertEqual(loaded.parse('(())()'), tables.parse('(())()'))
+        self.assertFalse(loaded.accepts('(()'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import itertools
+import unittest
+
+import earley
+from grammar import CFG
+from ll1 import LL1Parser, left_factor
+
+
+class test_ll1(unittest.TestCase):
+    def test_ll1_left_recursive_grammar(self):
+        grammar: CFG = CFG({'E'}, {'+', 'a'}, {'E': ['E+a', 'a']}, 'E')
+        parser = LL1Parser(grammar)
+        self.assertTrue(parser.is_ll1())
+        for word in ('a', 'a+a', 'a+a+a'):
+            self.assertTrue(parser.accepts(word), word)
+        for word in ('', '+', 'a+', 'aa', 'b'):
+            self.assertFalse(parser.accepts(word), word)
+        self.assertEqual(parser.parse('a')[0], 'E')
+
+    def test_ll1_expressions(self):
+        grammar: CFG = CFG({'E', 'T', 'F'}, {'+', '*', '(', ')', 'a'},
+                           {'E': ['E+T', 'T'], 'T': ['T*F', 'F'], 'F': ['(E)', 'a']}, 'E')
+        parser = LL1Parser(grammar)
+        self.assertTrue(parser.is_ll1())
+        for word in ('a', 'a+a*a', '(a+a)*a', 'a*(a+(a))'):
+            self.assertTrue(parser.accepts(word), word)
+        for word in ('a+', '(a', 'a*+a', '()'):
+            self.assertFalse(parser.accepts(word), word)
+
+    def test_ll1_conflicts(self):
+        grammar: CFG = CFG({'S'}, {'a'}, {'S': ['SS', 'a']}, 'S')
+        parser = LL1Parser(grammar)
+        self.assertFalse(parser.is_ll1())
+        self.assertTrue(all(conflict.terminal == 'a' for conflict in parser.conflicts))
+        self.assertIn('ε', str(parser.conflicts[0]))
+
+    def test_ll1_deep_nesting(self):
+        grammar: CFG = CFG({'S'}, {'(', ')', 'a'}, {'S': ['(S)', 'a']}, 'S')
+        parser = LL1Parser(grammar)
+        self.assertTrue(parser.is_ll1())
+        self.assertTrue(parser.accepts('(' * 20000 + 'a' + ')' * 20000))
+        self.assertFalse(parser.accepts('(' * 20000 + 'a' + ')' * 19999))
+
+    def test_ll1_empty_rules(self):
+        grammars = [CFG({'S'}, {'a', 'b'}, {'S': ['a', 'Sb', '']}, 'S'),
+                    CFG({'E', 'X', 'T', 'F'}, {'+', '*', 'a'},
+                        {'E': ['TX'], 'X': ['+TX', ''], 'T': ['aF'], 'F': ['*aF', '']}, 'E'),
+                    CFG({'S', 'A', 'B'}, {'a', 'b'}, {'S': ['AB'], 'A': ['aA', ''], 'B': ['bB', '']}, 'S')]
+        for grammar in grammars:
+            parser = LL1Parser(grammar)
+            self.assertTrue(parser.is_ll1(), grammar.rules)
+            for length in range(5):
+                for word in itertools.product(sorted(terminal.lexem for terminal in grammar.terminals),
+                                              repeat=length):
+                    self.assertEqual(parser.accepts(word), earley.recognize(grammar, word), word)
+
+    def test_ll1_empty_language(self):
+        parser = LL1Parser(CFG({'S'}, {'a'}, {'S': ['Sa']}, 'S'))
+        self.assertFalse(parser.accepts(''))
+        self.assertFalse(parser.accepts('a'))
+
+    def test_ll1_hidden_left_recursion(self):
+        # S -> ASb при обнуляемом A: remove_left_recursion эту рекурсию не устраняет
+        parser = LL1Parser(CFG({'S', 'A'}, {'a', 'b', 'c'}, {'S': ['ASb', 'a'], 'A': ['c', '']}, 'S'))
+        self.assertFalse(parser.is_ll1())
+        self.assertRaises(ValueError, lambda: parser.accepts('ab'))
+
+    def test_left_factor(self):
+        grammar: CFG = CFG({'S'}, {'a', 'b', 'c'}, {'S': ['abc', 'ab', 'c']}, 'S')
+        factored = left_factor(grammar)
+        rules = {non_terminal.lexem: sorted(''.join(symbol.lexem for symbol in rule_output)
+                                            for rule_output in rule_outputs)
+                 for non_terminal, rule_outputs in factored.rules.items()}
+        self.assertEqual(rules, {'S': ["abS'", 'c'], "S'": ['', 'c']})
+        self.assertEqual(len(grammar.rules[grammar.axiom]), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 from re import M
+import itertools
 import unittest
 
+import earley
+from benchmark import random_grammar
 from main import Grammar
 
 
@@ -253,6 +256,157 @@ class MyTestCase(unittest.TestCase):
         test_case1 = test_case1.remove_bad_non_terminals_and_rules()
         self.assertEqual(test_case1, test_case1_answer)
 
+    def test_grammar_is_not_empty_long_chain(self):
+        # цепочка A0 -> aA1, A1 -> aA2, ..., хорошим становится только через последний нетерминал
+        size = 2000
+        non_terminals = {'A' + str(i) for i in range(size)}
+        rules = {'A' + str(i): [['a', 'A' + str(i + 1)]] for i in range(size - 1)}
+        rules['A' + str(size - 1)] = [['a']]
+        long_chain: Grammar = Grammar(non_terminals, {'a'}, rules, 'A0')
+        self.assertTrue(long_chain.is_not_empty())
+        self.assertEqual(len(long_chain.get_good_non_terminals()), size)
+
+    def test_grammar_remove_chain_rules_long_chain(self):
+        # цепные правила A0 -> A1 -> ... длиннее предела рекурсии Python
+        size = 1500
+        non_terminals = {'A' + str(i) for i in range(size)}
+        rules = {'A' + str(i): [['A' + str(i + 1)], 'a'] for i in range(size - 1)}
+        rules['A' + str(size - 1)] = ['b']
+        long_chain: Grammar = Grammar(non_terminals, {'a', 'b'}, rules, 'A0')
+        self.assertEqual(len(long_chain.get_chain_non_terminals()['A0']), size)
+        new_grammar = long_chain.remove_chain_rules()
+        self.assertEqual(sorted(new_grammar.rules['A0']), ['a'] * (size - 1) + ['b'])
+
+    def test_grammar_chain_rules_cycle(self):
+        grammar: Grammar = Grammar({'S', 'A', 'B', 'C'}, {'a', 'b', 'c'},
+                                   {'S': ['A', 'cB'], 'A': ['B', 'a'], 'B': ['A', 'C', 'b'], 'C': ['c']}, 'S')
+        chains = grammar.get_chain_non_terminals()
+        # у A и B - одна компонента сильной связности и один общий объект
+        self.assertIs(chains['A'], chains['B'])
+        self.assertEqual(chains['A'], {'A', 'B', 'C'})
+        self.assertEqual(chains['S'], {'S', 'A', 'B', 'C'})
+        new_grammar = grammar.remove_chain_rules()
+        self.assertEqual(sorted(new_grammar.rules['S']), ['a', 'b', 'c', 'cB'])
+        self.assertEqual(sorted(new_grammar.rules['B']), ['a', 'b', 'c'])
+
+        # результат - копия кеша: её изменение не портит следующие вызовы
+        chains['S'] = frozenset()
+        del chains['A']
+        self.assertEqual(grammar.get_chain_non_terminals()['S'], {'S', 'A', 'B', 'C'})
+        self.assertIn('A', grammar.get_chain_non_terminals())
+
+    def test_grammar_get_new_var(self):
+        grammar: Grammar = Grammar(set(Grammar.var), {'a'}, {'A': ['a']}, 'A')
+        self.assertEqual([grammar.get_new_var() for _ in range(3)], ['A1', 'B1', 'C1'])
+        self.assertIn('C1', grammar.non_terminals)
+
+    def test_grammar_analysis_cache(self):
+        grammar: Grammar = Grammar({'S', 'A', 'B'}, {'a', 'b'}, {'S': ['aA', 'B'], 'A': ['a'], 'B': ['Bb']}, 'S')
+        self.assertEqual(grammar.get_good_non_terminals(), {'S', 'A'})
+        version = grammar.changes.value
+        productive = grammar.analysis_cache.results['productive']
+        grammar.get_good_non_terminals().add('B')
+        self.assertIs(grammar.cached('productive', None), productive)
+        self.assertEqual(grammar.changes.value, version)
+
+        # запись во вложенный список правил тоже меняет версию
+        grammar.rules['B'].append('b')
+        self.assertGreater(grammar.changes.value, version)
+        self.assertEqual(grammar.get_good_non_terminals(), {'S', 'A', 'B'})
+        self.assertEqual(grammar.get_chain_non_terminals()['S'], {'S', 'B'})
+
+        # копия получает уже посчитанные анализы, но меняется независимо
+        copy = grammar.copy()
+        self.assertIs(copy.cached('chain', None), grammar.cached('chain', None))
+        copy.rules['S'].remove('B')
+        self.assertEqual(copy.get_chain_non_terminals()['S'], {'S'})
+        self.assertEqual(grammar.rules['S'], ['aA', 'B'])
+
+    def test_grammar_axiom_change(self):
+        grammar: Grammar = Grammar({'S', 'A', 'B'}, {'a', 'b'}, {'S': ['aA'], 'A': ['a'], 'B': ['bB', 'b']}, 'S')
+        self.assertEqual(grammar.get_reachable_symbols(), ({'a'}, {'S', 'A'}))
+        self.assertEqual(grammar.get_first_follow().follow_set('B'), set())
+        grammar.axiom = 'B'
+        self.assertEqual(grammar.get_reachable_symbols(), ({'b'}, {'B'}))
+        self.assertEqual(grammar.get_first_follow().follow_set('B'), {'$'})
+        self.assertEqual(grammar.remove_unreachable_symbols().rules, {'B': ['bB', 'b']})
+
+    def test_grammar_remove_left_recursion(self):
+        grammar: Grammar = Grammar({'S', 'A', 'B'}, {'a', 'b', 'c'},
+                                   {'S': ['Aa', 'b'], 'A': ['Sc', 'Ab', 'c', 'B'], 'B': ['c']}, 'S')
+        plan = grammar.left_recursion_plan()
+        self.assertEqual(plan.components, [['S', 'A']])
+        without_left_recursion = grammar.remove_left_recursion()
+        # B не лежит на цикле левой рекурсии, поэтому в A не подставляется
+        self.assertEqual(without_left_recursion.rules, {
+            'S': ['Aa', 'b'],
+            'A': ['bc', ['b', 'c', "A'"], 'c', ['c', "A'"], 'B', ['B', "A'"]],
+            'B': ['c'],
+            "A'": ['ac', ['a', 'c', "A'"], 'b', ['b', "A'"]]
+        })
+        self.assertEqual(without_left_recursion.non_terminals, {'S', 'A', 'B', "A'"})
+        self.assertEqual(sum(len(rule_outputs) for rule_outputs in without_left_recursion.rules.values()),
+                         plan.predicted_rules)
+        self.assertRaises(ValueError, lambda: grammar.remove_left_recursion(max_rules=plan.predicted_rules - 1))
+        self.assertEqual(grammar.rules['A'], ['Sc', 'Ab', 'c', 'B'])
+
+    def test_grammar_remove_left_recursion_new_name(self):
+        grammar: Grammar = Grammar({'S', "S'"}, {'a', 'b'}, {'S': ['Sa', 'b', ["S'"]], "S'": ['a']}, 'S')
+        without_left_recursion = grammar.remove_left_recursion()
+        self.assertEqual(without_left_recursion.rules['S'], ['b', ['b', "S''"], ["S'"], ["S'", "S''"]])
+        self.assertEqual(without_left_recursion.rules["S''"], ['a', ['a', "S''"]])
+
+    def test_grammar_left_recursion_plan_is_exact(self):
+        # цикл из цепных правил: S -> A, A -> S даёт правило S -> S, которое выбрасывается
+        cycle: Grammar = Grammar({'S', 'A'}, {'a', 'b', 'c'}, {'S': ['A', 'Sa', 'b'], 'A': ['S', 'Ac', 'c']}, 'S')
+        grammars = [cycle] + [random_grammar(seed, 5, left_recursion_density=0.5, unit_rule_density=0.3)
+                              for seed in range(40)]
+        for grammar in grammars:
+            predicted = grammar.left_recursion_plan().predicted_rules
+            without_left_recursion = grammar.remove_left_recursion(max_rules=predicted)
+            self.assertEqual(sum(len(rule_outputs) for rule_outputs in without_left_recursion.rules.values()),
+                             predicted, grammar.rules)
+
+    def assertChomskyNormalForm(self, grammar: Grammar):
+        axiom_on_right_side = any(grammar.axiom in grammar.tokenize(rule) if isinstance(rule, str) else
+                                  grammar.axiom in rule
+                                  for rule_outputs in grammar.rules.values() for rule in rule_outputs)
+        for rule_left_side, rule_outputs in grammar.rules.items():
+            for rule in rule_outputs:
+                symbols = grammar.tokenize(rule) if isinstance(rule, str) and rule else list(rule)
+                if not symbols:
+                    self.assertEqual(rule_left_side, grammar.axiom)
+                    self.assertFalse(axiom_on_right_side)
+                elif len(symbols) == 1:
+                    self.assertIn(symbols[0], grammar.terminals, (rule_left_side, rule))
+                else:
+                    self.assertEqual(len(symbols), 2, (rule_left_side, rule))
+                    self.assertTrue(grammar.non_terminals.issuperset(symbols), (rule_left_side, rule))
+
+    def assertSameLanguage(self, grammar: Grammar, other: Grammar, max_length: int):
+        for length in range(max_length + 1):
+            for word in itertools.product(sorted(grammar.terminals), repeat=length):
+                self.assertEqual(earley.recognize(other, word), earley.recognize(grammar, word), word)
+
+    def test_grammar_algorithm_chomsky(self):
+        # аксиома в правой части, пустые, цепные и длинные правила
+        grammar: Grammar = Grammar({'S', 'A', 'B'}, {'a', 'b'},
+                                   {'S': ['aSb', 'AB', ''], 'A': ['aA', 'B'], 'B': ['b', '']}, 'S')
+        chomsky = grammar.copy()
+        chomsky.algorithm_chomsky()
+        self.assertNotEqual(chomsky.axiom, 'S')
+        self.assertIn('', chomsky.rules[chomsky.axiom])
+        self.assertChomskyNormalForm(chomsky)
+        self.assertSameLanguage(grammar, chomsky, 6)
+
+    def test_grammar_algorithm_chomsky_random(self):
+        for seed in range(30):
+            grammar = random_grammar(seed, 4, rhs_length=4, left_recursion_density=0.3, unit_rule_density=0.3)
+            chomsky = grammar.copy()
+            chomsky.algorithm_chomsky()
+            self.assertChomskyNormalForm(chomsky)
+            self.assertSameLanguage(grammar, chomsky, 4)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,9 @@
 import unittest
 
-from grammar import CFG
+import copy
+import pickle
+
+from grammar import CFG, Token
 
 
 class test_class(unittest.TestCase):
@@ -353,11 +356,12 @@ class test_class(unittest.TestCase):
             'A'
         )
 
+        # B не лежит на цикле с A, поэтому в A не подставляется
         test_case3_answer: CFG = CFG(
             {'A\'', 'A', 'B'},
             {'c', 'd'},
             {
-                'A': ['cc', ['c','c','A\''], 'dc', ['d','c','A\'']],
+                'A': ['Bc', ['B','c','A\'']],
                 'B': ['c', 'd'],
                 'A\'': ['cd', ['c', 'd', 'A\'']]
             },
@@ -405,6 +409,18 @@ class test_class(unittest.TestCase):
             'A'
         )
         self.assertEqual(test_case5.remove_left_recursion(), test_case5_answer)
+        # при порядке A, B получилось бы 10 правил вместо 8
+        plan = test_case5.left_recursion_plan()
+        self.assertEqual([[non_terminal.lexem for non_terminal in component] for component in plan.components],
+                         [['B', 'A']])
+        self.assertEqual(plan.predicted_rules, 8)
+        self.assertRaises(ValueError, lambda: test_case5.remove_left_recursion(max_rules=7))
+
+        # правило A -> A, получившееся из цикла цепных правил, выбрасывается и в предсказании
+        unit_cycle: CFG = CFG({'A', 'B'}, {'c', 'd'}, {'A': ['B', 'Ac', 'd'], 'B': ['A', 'Bd', 'c']}, 'A')
+        without_left_recursion = unit_cycle.remove_left_recursion()
+        self.assertEqual(sum(len(rule_outputs) for rule_outputs in without_left_recursion.rules.values()),
+                         unit_cycle.left_recursion_plan().predicted_rules)
 
         test_case6: CFG = CFG(
             {'A', 'B'},
@@ -426,5 +442,84 @@ class test_class(unittest.TestCase):
         )
         self.assertEqual(test_case6.remove_left_recursion(), test_case6_answer)
 
+    def test_CFG_get_reachable_symbols(self):
+        test_case: CFG = CFG(
+            {'S', 'A', 'B', 'C'},
+            {'a', 'b', 'c'},
+            {
+                'S': ['aA'],
+                'A': ['bA', 'b'],
+                'B': ['cC'],
+                'C': ['c']
+            },
+            'S'
+        )
+        reachable_terminals, reachable_non_terminals = test_case.get_reachable_symbols()
+        self.assertEqual(reachable_terminals, CFG({'S'}, {'a', 'b'}, {}, 'S').terminals)
+        self.assertEqual(reachable_non_terminals, CFG({'S', 'A'}, set(), {}, 'S').non_terminals)
+        self.assertEqual(len(test_case.rules), 4)
+
+    def test_token_interning(self):
+        token = Token('a', 'char')
+        self.assertIs(token, Token('a', 'char'))
+        self.assertIsNot(token, Token('a', 'other'))
+        self.assertIs(Token.from_id(token.id), token)
+        self.assertIs(pickle.loads(pickle.dumps(token)), token)
+        self.assertIs(copy.deepcopy(token), token)
+        self.assertNotEqual(hash(Token('ab', 'char')), hash(Token('ba', 'char')))
+
+    def test_CFG_first_follow(self):
+        test_case: CFG = CFG(
+            {'E', 'X', 'T', 'Y', 'F'},
+            {'+', '*', '(', ')', 'a'},
+            {
+                'E': ['TX'],
+                'X': ['+TX', ''],
+                'T': ['FY'],
+                'Y': ['*FY', ''],
+                'F': ['(E)', 'a']
+            },
+            'E'
+        )
+        first_follow = test_case.get_first_follow()
+
+        def lexems(symbols):
+            return {symbol if isinstance(symbol, str) else symbol.lexem for symbol in symbols}
+
+        self.assertEqual(lexems(first_follow.nullable), {'X', 'Y'})
+        self.assertEqual(lexems(first_follow.first_set(Token('E', 'char'))), {'(', 'a'})
+        self.assertEqual(lexems(first_follow.first_set(Token('Y', 'char'))), {'*'})
+        self.assertEqual(lexems(first_follow.follow_set(Token('X', 'char'))), {')', '$'})
+        self.assertEqual(lexems(first_follow.follow_set(Token('F', 'char'))), {'+', '*', ')', '$'})
+
+        # результат кешируется, пока правила не меняются
+        self.assertIs(test_case.get_first_follow(), first_follow)
+        test_case.rules[Token('F', 'char')].append([Token('b', 'char')])
+        test_case.terminals.add(Token('b', 'char'))
+        self.assertIsNot(test_case.get_first_follow(), first_follow)
+        self.assertIn('b', lexems(test_case.get_first_follow().first_set(Token('E', 'char'))))
+
+    def test_CFG_pickle_keeps_change_tracking(self):
+        test_case: CFG = CFG({'S', 'A'}, {'a'}, {'S': ['A', 'a'], 'A': ['a']}, 'S')
+        restored: CFG = pickle.loads(pickle.dumps(test_case))
+        self.assertEqual(restored, test_case)
+        reachable = restored.get_reachable_symbols()
+        version = restored.changes.value
+        restored.rules[Token('A', 'char')].append([Token('S', 'char')])
+        restored.non_terminals.discard(Token('B', 'char'))
+        self.assertGreater(restored.changes.value, version)
+        self.assertEqual(restored.get_reachable_symbols(), reachable)
+
+    def test_CFG_axiom_change(self):
+        test_case: CFG = CFG({'S', 'A', 'B'}, {'a', 'b'}, {'S': ['aA'], 'A': ['Aa', 'a'], 'B': ['b']}, 'S')
+        self.assertEqual(test_case.get_reachable_symbols()[1], {Token('S', 'char'), Token('A', 'char')})
+        self.assertEqual(len(test_case.left_recursion_plan().components), 1)
+        test_case.axiom = Token('B', 'char')
+        self.assertEqual(test_case.get_reachable_symbols(), ({Token('b', 'char')}, {Token('B', 'char')}))
+        self.assertEqual(test_case.get_first_follow().follow_set(Token('B', 'char')), {'$'})
+        self.assertEqual(test_case.left_recursion_plan().components, [])
+        self.assertEqual(test_case.remove_unreachable_symbols().rules, {Token('B', 'char'): [[Token('b', 'char')]]})
+
+
 if __name__ == '__main__':
     unittest.main()
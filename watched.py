@@ -0,0 +1,105 @@
+""" Контейнеры, которые сообщают грамматике о своих изменениях.
+
+Grammar (main.py) и CFG (grammar.py) хранят rules, terminals и non_terminals в этих
+контейнерах. Все контейнеры одной грамматики делят один счётчик Version: любая запись
+(в словарь правил, в список правых частей нетерминала или в множество символов) увеличивает
+его, и закешированные анализы грамматики (AnalysisCache) становятся устаревшими.
+Сами правые части (строки, списки Token) считаются неизменяемыми.
+
+Чтение не переопределяется, поэтому идёт с обычной скоростью dict/list/set.
+"""
+
+
+class Version:
+    """ Счётчик изменений, общий для всех контейнеров одной грамматики """
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def bump(self):
+        self.value += 1
+
+
+def watch_methods(cls, base, names):
+    """ Переопределяет изменяющие методы base так, чтобы после вызова увеличивался счётчик """
+    for name in names:
+        def method(self, *args, base_method=getattr(base, name), **kwargs):
+            result = base_method(self, *args, **kwargs)
+            self.version.bump()
+            return result
+        method.__name__ = name
+        setattr(cls, name, method)
+    return cls
+
+
+class WatchedSet(set):
+    __slots__ = ('version',)
+
+    def __init__(self, version: Version, items=()):
+        super().__init__(items)
+        self.version = version
+
+    def __reduce__(self):
+        return WatchedSet, (self.version, list(self))
+
+
+watch_methods(WatchedSet, set, ('add', 'discard', 'remove', 'pop', 'clear', 'update', 'difference_update',
+                                'intersection_update', 'symmetric_difference_update',
+                                '__ior__', '__iand__', '__isub__', '__ixor__'))
+
+
+class WatchedList(list):
+    __slots__ = ('version',)
+
+    def __init__(self, version: Version, items=()):
+        super().__init__(items)
+        self.version = version
+
+    def __reduce__(self):
+        return WatchedList, (self.version, list(self))
+
+
+watch_methods(WatchedList, list, ('append', 'extend', 'insert', 'pop', 'remove', 'clear', 'sort', 'reverse',
+                                  '__setitem__', '__delitem__', '__iadd__', '__imul__'))
+
+
+class WatchedDict(dict):
+    """ Словарь правил: списки правых частей при записи тоже оборачиваются в WatchedList
+    (копируются, если принадлежат другой грамматике) """
+    __slots__ = ('version',)
+
+    def __init__(self, version: Version, items=()):
+        super().__init__()
+        self.version = version
+        for key, value in dict(items).items():
+            dict.__setitem__(self, key, self.watch(value))
+
+    def __reduce__(self):
+        return WatchedDict, (self.version, dict(self))
+
+    def watch(self, value):
+        if isinstance(value, list) and not (isinstance(value, WatchedList) and value.version is self.version):
+            return WatchedList(self.version, value)
+        return value
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, self.watch(value))
+        self.version.bump()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            dict.__setitem__(self, key, self.watch(value))
+        self.version.bump()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+
+watch_methods(WatchedDict, dict, ('__delitem__', 'pop', 'popitem', 'clear'))